@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+from utils import X, Y, W, H, FRAME
+
+
+TIERS = ("low", "high")
+
+
+class AdaptiveResolution:
+    """Runs the model at a low input size while play is away from the hoop and a high one around shots
+
+    Each frame is shrunk to the tier's long side as soon as it's decoded, with the same linear
+    resize the model's letterbox uses, and the model runs with imgsz to match - its letterbox and
+    the copy into the input tensor only see the small frame. The high tier is used while an attempt is
+    open, and for hold frames after the ball was last seen in the detect_up zone widened by
+    margin hoop sizes plus the space under the rim - the ball is smallest there, and up, down
+    and make/miss are decided there. At least every probe-th frame runs high too, so a ball too
+    small to be found at the low size still switches it up. Boxes are scaled back to full-frame
+    pixels, so the shot logic's thresholds and the drawing are unchanged.
+    """
+
+    def __init__(self, low=640, high=1280, hold=15, probe=10, margin=1.0, recent=5, x_factor=4, y_factor=2,
+                 stride=32):
+        self.sizes = {"low": low, "high": high}
+        self.hold = hold
+        self.probe = probe
+        self.margin = margin
+        self.recent = recent
+        self.x_factor = x_factor
+        self.y_factor = y_factor
+        self.stride = stride
+
+        self.until = -1
+        self.last_high = -1
+        self.tier = "low"
+        self.frames = dict.fromkeys(TIERS, 0)
+        self.switches = 0
+
+    def near_hoop(self, ball_pos, hoop_pos, frame_count):
+        # Latest ball, if seen in the last `recent` frames, inside the widened shot zone
+        if len(ball_pos) == 0 or len(hoop_pos) == 0 or frame_count - ball_pos[-1, FRAME] > self.recent:
+            return False
+        x, y, w, h = (hoop_pos[-1, c] for c in (X, Y, W, H))
+        return (abs(ball_pos[-1, X] - x) < (self.x_factor + self.margin) * w
+                and y - (self.y_factor + self.margin) * h < ball_pos[-1, Y] < y + 2 * h)
+
+    def choose(self, ball_pos, hoop_pos, frame_count, in_shot):
+        if in_shot or self.near_hoop(ball_pos, hoop_pos, frame_count):
+            self.until = frame_count + self.hold
+        probe = self.probe and frame_count - self.last_high >= self.probe
+        tier = "high" if frame_count <= self.until or probe else "low"
+        if tier != self.tier:
+            self.switches += 1
+            self.tier = tier
+        return tier
+
+    def shrink(self, frame, size):
+        # Frame with its long side at most size, and the factors that map its boxes back
+        height, width = frame.shape[:2]
+        if max(height, width) <= size:
+            return frame, 1.0, 1.0
+        scale = size / max(height, width)
+        small_w, small_h = max(1, round(width * scale)), max(1, round(height * scale))
+        small = cv2.resize(frame, (small_w, small_h), interpolation=cv2.INTER_LINEAR)
+        return small, width / small_w, height / small_h
+
+    def detect(self, model, frames, device, ball_pos, hoop_pos, frame_count, in_shot):
+        # (boxes.data in full-frame pixels, True) per frame - the tier is picked from the shot
+        # state at the start of the batch
+        tier = self.choose(ball_pos, hoop_pos, frame_count, in_shot)
+        shrunk = [self.shrink(frame, self.sizes[tier]) for frame in frames]
+
+        # Never letterboxed up past the frame itself
+        long_side = max(shrunk[0][0].shape[:2])
+        imgsz = int(np.ceil(min(self.sizes[tier], long_side) / self.stride)) * self.stride
+        results = model([small for small, _, _ in shrunk], stream=True, device=device, imgsz=imgsz)
+
+        detections = []
+        for r, (_, sx, sy) in zip(results, shrunk):
+            data = r.boxes.data.cpu().numpy()
+            if sx != 1.0 or sy != 1.0:
+                data = data.copy()
+                data[:, [0, 2]] *= sx
+                data[:, [1, 3]] *= sy
+            detections.append((data, True))
+        self.frames[tier] += len(frames)
+        if tier == "high":
+            self.last_high = frame_count + len(frames) - 1
+        return detections
+
+    def report(self):
+        return dict(self.frames, switches=self.switches)
@@ -0,0 +1,166 @@
+import copy
+import os
+import shutil
+import subprocess
+import cv2
+import cvzone
+import numpy as np
+from utils import unpack_boxes
+from shot_state import ShotState, CLASS_NAMES
+from person_tracker import PersonTracker
+from frame_pool import FramePool
+from video_writer import VideoWriter
+
+
+# The detectors' drawing, and redrawing stored detections over a stretch of the video -
+# segment_processor.py's --annotate segments and highlights.py's clips with overlays
+
+
+def draw_boxes(frame, x1, y1, w, h, balls, hoops, people, tracks=None):
+    # Corner boxes for balls and hoops, players also get their track ID and zone when tracked
+    for i in np.flatnonzero(balls | hoops | people).tolist():
+        box = (int(x1[i]), int(y1[i]), int(w[i]), int(h[i]))
+
+        if not people[i]:
+            cvzone.cornerRect(frame, box)
+            continue
+
+        cvzone.cornerRect(frame, box, colorC=(255, 255, 0))
+        if tracks is None:
+            continue
+
+        track_id, position = tracks[i]
+        cv2.putText(frame, f"{position} #{track_id}", (box[0], box[1] - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 0), 2)
+
+
+def draw_hoop(frame, hoop_pos):
+    cv2.circle(frame, hoop_pos.center(), 2, (128, 128, 0), 2)
+
+
+def shot_overlay(made):
+    # Overlay text and color shown after a shot
+    return ("basket made", (0, 255, 0)) if made else ("basket miss", (255, 0, 0))
+
+
+def draw_score(frame, makes, attempts, overlay_text, overlay_color):
+    text = f"{makes} / {attempts}"
+    cv2.putText(frame, text, (50, 125), cv2.FONT_HERSHEY_SIMPLEX, 3, (255, 255, 255), 6)
+    cv2.putText(frame, text, (50, 125), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 3)
+
+    font_scale = 1.2
+    thickness = 2
+    (text_width, _), _ = cv2.getTextSize(overlay_text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+    text_x = (frame.shape[1] - text_width) // 2
+    text_y = 50
+    cv2.putText(frame, overlay_text, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, font_scale, overlay_color, thickness)
+
+
+def track_people(people, x1, y1, w, h, mask, frame_count, frame_width):
+    # {box index: (track ID, zone)} for the boxes in mask
+    idx = np.flatnonzero(mask)
+    boxes = np.column_stack([x1, y1, x1 + w, y1 + h])[idx]
+    return dict(zip(idx.tolist(), people.update(boxes, frame_count, frame_width)))
+
+
+def open_at(video, start):
+    cap = cv2.VideoCapture(video)
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    return cap
+
+
+def stitch(segments, frame_width, frame_height, params=None):
+    # Runs the shot logic and the player tracker over every segment's detections in order, keeping
+    # a copy of both at each segment's first frame for ReplayAnnotator
+    state = ShotState("extended", params)
+    people = PersonTracker()
+    snapshots = []
+    for _, detections in segments:
+        snapshots.append(copy.deepcopy((state, people)))
+        for data in detections:
+            x1, y1, w, h, _, conf, cls = unpack_boxes(data)
+            keep = (cls == CLASS_NAMES.index("Person")) & (conf > state.params["person_conf"])
+            people.update(np.column_stack([x1, y1, x1 + w, y1 + h])[keep], state.frame_count, frame_width)
+            state.step(data, frame_height)
+    return state, snapshots
+
+
+class ReplayAnnotator:
+    """Draws stored detections over their frames the way shot_detector_2.py does
+
+    Starts from a stitch() snapshot - the shot state and player tracks a full run had at the
+    first frame - so the score, the last shot's overlay and the player IDs carry on from there.
+    """
+
+    def __init__(self, video_path, start, detections, snapshot, out_path, writer="opencv"):
+        self.video_path = video_path
+        self.start = start
+        self.detections = detections
+        self.state, self.people = snapshot
+        self.out_path = out_path
+        self.writer = writer
+
+        self.overlay_text = "Waiting..."
+        self.overlay_color = (0, 0, 0)
+        if self.state.events:
+            self.overlay_text, self.overlay_color = shot_overlay(self.state.events[-1]["made"])
+
+    def run(self):
+        cap = open_at(self.video_path, self.start)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        out = VideoWriter(self.out_path, cap.get(cv2.CAP_PROP_FPS), (width, height), self.writer)
+        pool = FramePool((height, width, 3), out.queue.maxsize + 3)
+
+        state = self.state
+        for data in self.detections:
+            ret, frame = pool.read(cap)
+            if not ret:
+                break
+
+            x1, y1, w, h, _, _, balls, hoops, people = state.add_detections(data, height)
+            tracks = track_people(self.people, x1, y1, w, h, people, state.frame_count, width)
+            draw_boxes(frame, x1, y1, w, h, balls, hoops, people, tracks)
+
+            state.clean_motion()
+            if len(state.hoop_pos) > 0:
+                draw_hoop(frame, state.hoop_pos)
+            event = state.shot_detection()
+            if event is not None:
+                self.overlay_text, self.overlay_color = shot_overlay(event["made"])
+            draw_score(frame, state.makes, state.attempts, self.overlay_text, self.overlay_color)
+            state.frame_count += 1
+
+            out.write(frame, pool.release)
+
+        cap.release()
+        out.release()
+        return self.out_path
+
+
+def concat_videos(paths, out_path):
+    # Stream copy with ffmpeg when it's installed, otherwise re-encode frame by frame
+    if shutil.which("ffmpeg"):
+        list_path = out_path + ".txt"
+        with open(list_path, "w") as f:
+            f.writelines(f"file '{os.path.abspath(p)}'\n" for p in paths)
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                        "-i", list_path, "-c", "copy", out_path], check=True)
+        os.remove(list_path)
+        return
+
+    out = None
+    for path in paths:
+        cap = cv2.VideoCapture(path)
+        if out is None:
+            size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            out = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*'mp4v'), cap.get(cv2.CAP_PROP_FPS), size)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            out.write(frame)
+        cap.release()
+    if out is not None:
+        out.release()
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import time
+import cv2
+from ultralytics import YOLO
+from detection_cache import file_hash
+from pipeline import Pipeline, END
+from utils import get_device
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Bump when the label format changes - every image is then labeled again
+MANIFEST_VERSION = 1
+
+# COCO person (yolov8n.pt) is class 2 in our dataset, best.pt's Basketball 0 and Basketball Hoop 1 stay
+PERSON_CLASSES = {0: 2}
+OBJECT_CLASSES = {0: 0, 1: 1}
+
+
+def label_lines(result, classes):
+    # YOLO format: class x_center y_center width height, normalized to the image size
+    lines = []
+    for (x, y, w, h), cls in zip(result.boxes.xywhn.tolist(), result.boxes.cls.tolist()):
+        if int(cls) in classes:
+            lines.append(f"{classes[int(cls)]} {x:.6f} {y:.6f} {w:.6f} {h:.6f}")
+    return lines
+
+
+def write_atomic(path, text):
+    # Renamed into place, so a killed run never leaves a half-written label file
+    with open(path + ".tmp", "w") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+def signature(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime]
+
+
+def load_manifest(path, models):
+    # Entries only count if they were labeled with the same weights and settings
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION and manifest.get("models") == models:
+            return manifest
+    return {"version": MANIFEST_VERSION, "models": models, "images": {}}
+
+
+def save_manifest(path, manifest):
+    write_atomic(path, json.dumps(manifest))
+
+
+def load_stage(pipe, image_dir, names, batch_size, out_q):
+    # Prefetch - the next batches are read from disk while the models run on this one
+    for i in range(0, len(names), batch_size):
+        batch = names[i:i + batch_size]
+        with pipe.metrics.time("load"):
+            images = [cv2.imread(os.path.join(image_dir, name)) for name in batch]
+        if not pipe.put(out_q, list(zip(batch, images))):
+            return
+    pipe.put(out_q, END)
+
+
+def label_images(image_dir="auto_dataset/images/train", label_dir="auto_dataset/labels/train",
+                 manifest_path="auto_dataset/label_manifest.json", person_weights="yolov8n.pt",
+                 object_weights="best.pt", batch_size=16, conf=0.25, queue_size=4, save_every=20, force=False):
+    """Labels persons with the COCO model and ball / hoop with ours, in one pass over image_dir
+
+    Each batch goes through both models, the class-remapped boxes are merged and every label file
+    is written once. The manifest remembers each image's size and mtime, so reruns only label new
+    or changed images (all of them when the weights or conf change, or with force).
+    """
+    start = time.perf_counter()
+    os.makedirs(label_dir, exist_ok=True)
+
+    models = {"person": [person_weights, file_hash(person_weights)],
+              "objects": [object_weights, file_hash(object_weights)], "conf": conf}
+    manifest = load_manifest(manifest_path, models)
+    if force:
+        manifest["images"] = {}
+    done = manifest["images"]
+
+    # Keyed by image path, so one manifest can cover several image directories
+    names = sorted(name for name in os.listdir(image_dir) if name.lower().endswith(IMAGE_EXTENSIONS))
+    todo = [name for name in names
+            if done.get(os.path.join(image_dir, name)) != signature(os.path.join(image_dir, name))]
+    stats = {"images": len(names), "labeled": 0, "skipped": len(names) - len(todo), "unreadable": 0,
+             "boxes": 0, "seconds": 0.0}
+    if not todo:
+        return stats
+
+    device = get_device()
+    person_model = YOLO(person_weights)
+    object_model = YOLO(object_weights)
+
+    pipe = Pipeline(queue_size)
+    loaded = pipe.queue()
+    pipe.start(load_stage, image_dir, todo, batch_size, loaded)
+    try:
+        for batches, batch in enumerate(pipe.drain(loaded), 1):
+            readable = [(name, image) for name, image in batch if image is not None]
+            stats["unreadable"] += len(batch) - len(readable)
+            if not readable:
+                continue
+            images = [image for _, image in readable]
+
+            persons = person_model(images, stream=True, device=device, conf=conf, verbose=False)
+            objects = object_model(images, stream=True, device=device, conf=conf, verbose=False)
+            for (name, _), p, o in zip(readable, persons, objects):
+                lines = label_lines(p, PERSON_CLASSES) + label_lines(o, OBJECT_CLASSES)
+                write_atomic(os.path.join(label_dir, os.path.splitext(name)[0] + ".txt"), "\n".join(lines))
+
+                image_path = os.path.join(image_dir, name)
+                done[image_path] = signature(image_path)
+                stats["labeled"] += 1
+                stats["boxes"] += len(lines)
+
+            # Progress survives an interrupted run
+            if batches % save_every == 0:
+                save_manifest(manifest_path, manifest)
+    finally:
+        pipe.close()
+        save_manifest(manifest_path, manifest)
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", default="auto_dataset/images/train")
+    parser.add_argument("--labels", default="auto_dataset/labels/train")
+    parser.add_argument("--manifest", default="auto_dataset/label_manifest.json")
+    parser.add_argument("--person-weights", default="yolov8n.pt", help="COCO model for the Person class")
+    parser.add_argument("--weights", default="best.pt", help="our model for Basketball and Basketball Hoop")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--force", action="store_true", help="label every image again")
+    args = parser.parse_args()
+
+    print("Auto-labeling persons, balls and hoops...")
+    stats = label_images(args.images, args.labels, args.manifest, args.person_weights, args.weights,
+                         args.batch_size, args.conf, force=args.force)
+    if stats["unreadable"]:
+        print(f"Could not read {stats['unreadable']} images")
+    print(f"Labeled {stats['labeled']} images ({stats['boxes']} boxes, {stats['skipped']} unchanged) "
+          f"in {stats['seconds']:.1f} s. Labels saved to {args.labels}/")
@@ -0,0 +1,98 @@
+import os
+import numpy as np
+import torch
+from ultralytics import YOLO
+
+
+# Where ultralytics' exporter puts each format, next to the weights
+EXPORTS = {
+    "onnx": ".onnx",
+    "openvino": "_openvino_model",
+    "torchscript": ".torchscript",
+}
+
+BACKENDS = ["torch"] + list(EXPORTS)
+
+
+def export_path(weights, backend):
+    return os.path.splitext(weights)[0] + EXPORTS[backend]
+
+
+def ensure_exported(weights, backend, imgsz=640):
+    # Exports once - the artifact is reused until the weights file is newer than it
+    path = export_path(weights, backend)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(weights):
+        return path
+
+    print(f"Exporting {weights} to {backend}...")
+    YOLO(weights).export(format=backend, imgsz=imgsz)
+    if not os.path.exists(path):
+        raise RuntimeError(f"Export to {backend} did not produce {path}")
+    return path
+
+
+class Backend:
+    """YOLO on the PyTorch weights or on an exported copy of them, called like the YOLO model
+
+    Exported models run on the CPU one frame at a time (they are exported with a fixed batch of 1).
+    threads caps the intra-op thread pool - torch's, or the ONNX Runtime session's and OpenVINO's,
+    which ultralytics creates without options, so they are rebuilt after the first warm-up call.
+    """
+
+    def __init__(self, weights="best.pt", backend="torch", threads=None, warmup=2, warmup_shape=(640, 640, 3),
+                 imgsz=640):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend} - expected one of {', '.join(BACKENDS)}")
+        self.backend = backend
+        self.threads = threads
+        # Input size of exports - PyTorch runs at the weights' own size unless a call passes imgsz
+        self.imgsz = imgsz
+        self.path = weights if backend == "torch" else ensure_exported(weights, backend, imgsz)
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = YOLO(self.path)
+
+        # First calls build the predictor and allocate buffers - keep them out of the first real frames
+        blank = np.zeros(warmup_shape, dtype=np.uint8)
+        for i in range(max(1, warmup)):
+            list(self([blank]))
+            if i == 0 and threads and backend in ("onnx", "openvino"):
+                self.limit_threads()
+
+    def __call__(self, frames, stream=True, device=None, imgsz=None):
+        # imgsz overrides the input size per call - exports keep the size they were exported at
+        if self.backend == "torch":
+            if imgsz is not None:
+                return self.model(frames, stream=True, device=device, imgsz=imgsz)
+            return self.model(frames, stream=True, device=device)
+        return (r for frame in frames for r in self.model(frame, stream=True, device="cpu"))
+
+    def limit_threads(self):
+        runtime = self.model.predictor.model
+        if self.backend == "onnx":
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.threads
+            runtime.session = onnxruntime.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        elif self.backend == "openvino":
+            runtime.executable_network = runtime.ie.compile_model(
+                runtime.network, device_name="CPU", config={"INFERENCE_NUM_THREADS": str(self.threads)})
+            runtime.output_layer = next(iter(runtime.executable_network.outputs))
+
+
+def match_boxes(a, b, box_tol=2.0, conf_tol=0.02):
+    # True if two frames' boxes.data agree - same classes, and every box of a has one in b
+    # within box_tol pixels and conf_tol confidence
+    if len(a) != len(b):
+        return False
+    used = set()
+    for row in a:
+        candidates = [j for j in range(len(b)) if j not in used and b[j, 5] == row[5]]
+        if not candidates:
+            return False
+        j = min(candidates, key=lambda j: np.abs(b[j, :4] - row[:4]).max())
+        if np.abs(b[j, :4] - row[:4]).max() > box_tol or abs(b[j, 4] - row[4]) > conf_tol:
+            return False
+        used.add(j)
+    return True
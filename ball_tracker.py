@@ -0,0 +1,162 @@
+import copy
+import numpy as np
+from filterpy.kalman import KalmanFilter
+from filterpy.common import Q_discrete_white_noise
+from utils import in_hoop_region
+from shot_state import CLASS_NAMES
+
+
+BALL = CLASS_NAMES.index("Basketball")
+
+
+class BallTracker:
+    """Constant-acceleration Kalman filter on the ball center, used to skip inference in flight
+
+    State is (x, vx, ax, y, vy, ay) per frame. Once the ball has been matched min_hits times in
+    a row the model only runs every `every` frames, or earlier when the predicted position gets
+    more uncertain than max_sigma ball widths or comes near the hoop, where makes and misses are
+    decided. Skipped frames get the predicted ball plus the other boxes of the last inferred frame.
+    Measurement noise and acceleration are in ball widths too, scaled by the ball the track
+    starts from, so the filter behaves the same at any resolution.
+    """
+
+    def __init__(self, every=2, max_sigma=0.5, min_hits=3, max_misses=3, ball_conf=0.3,
+                 noise=0.18, accel=0.036, gate=16.0):
+        self.every = every
+        self.max_sigma = max_sigma
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.ball_conf = ball_conf
+        self.noise = noise
+        self.accel = accel
+        self.gate = gate
+
+        self.kf = None
+        self.hits = 0
+        self.misses = 0
+        self.size = (0.0, 0.0)
+        self.conf = 0.0
+        self.last = np.zeros((0, 6), dtype=np.float32)
+        self.since_inference = 0
+        self.frames = 0
+        self.skipped = 0
+
+    def start(self, x, y, size):
+        # size is the ball's width in pixels - every standard deviation below is a share of it
+        kf = KalmanFilter(dim_x=6, dim_z=2)
+        step = np.array([[1, 1, 0.5], [0, 1, 1], [0, 0, 1]])
+        kf.F = np.kron(np.eye(2), step)
+        kf.H = np.array([[1, 0, 0, 0, 0, 0], [0, 0, 0, 1, 0, 0]])
+        kf.R *= (self.noise * size) ** 2
+        kf.Q = Q_discrete_white_noise(dim=3, dt=1.0, var=(self.accel * size) ** 2, block_size=2)
+        kf.P = np.diag(np.array([self.noise, 0.7, 0.35] * 2) ** 2) * size ** 2
+        kf.x = np.array([[x], [0.0], [0.0], [y], [0.0], [0.0]])
+        self.kf = kf
+        self.hits = 1
+        self.misses = 0
+
+    def position(self, kf=None):
+        kf = kf or self.kf
+        return float(kf.x[0, 0]), float(kf.x[3, 0])
+
+    def sigma(self, kf=None):
+        # Positional standard deviation in pixels
+        kf = kf or self.kf
+        return float(np.sqrt(max(kf.P[0, 0], kf.P[3, 3])))
+
+    def flying(self):
+        return self.kf is not None and self.hits >= self.min_hits
+
+    def needs_inference(self, kf, since, hoop_pos):
+        if since >= self.every or self.sigma(kf) > self.max_sigma * max(self.size):
+            return True
+        return in_hoop_region(self.position(kf), hoop_pos)
+
+    def plan(self, count, hoop_pos):
+        # Decides up front which frames of a batch run the model, on a copy of the filter that only
+        # predicts - later frames can't see the batch's own detections, which errs towards inferring
+        if not self.flying():
+            return [True] * count
+
+        kf = copy.deepcopy(self.kf)
+        since = self.since_inference
+        run = []
+        for _ in range(count):
+            kf.predict()
+            since += 1
+            run.append(self.needs_inference(kf, since, hoop_pos))
+            if run[-1]:
+                since = 0
+        return run
+
+    def detect(self, infer, frames, hoop_pos):
+        # Same (boxes.data, ran on the full frame) pairs as infer, which only sees the frames that need it
+        run = self.plan(len(frames), hoop_pos)
+        idx = [i for i, r in enumerate(run) if r]
+        results = dict(zip(idx, infer([frames[i] for i in idx]))) if idx else {}
+
+        detections = []
+        for i in range(len(frames)):
+            if self.kf is not None:
+                self.kf.predict()
+
+            if i in results:
+                self.update(results[i][0])
+                self.since_inference = 0
+                detections.append(results[i])
+            else:
+                self.since_inference += 1
+                detections.append((self.predicted(), False))
+
+        self.frames += len(frames)
+        self.skipped += len(frames) - len(idx)
+        return detections
+
+    def update(self, data):
+        self.last = data
+        balls = data[(data[:, 5] == BALL) & (data[:, 4] > self.ball_conf)]
+
+        if self.kf is None:
+            if len(balls) > 0:
+                best = balls[np.argmax(balls[:, 4])]
+                self.size, self.conf = (best[2] - best[0], best[3] - best[1]), float(best[4])
+                self.start((best[0] + best[2]) / 2, (best[1] + best[3]) / 2, max(max(self.size), 1.0))
+            return
+
+        # Match the ball closest to the prediction in Mahalanobis distance, ignore far-off ones
+        best = None
+        if len(balls) > 0:
+            centers = np.column_stack([(balls[:, 0] + balls[:, 2]) / 2, (balls[:, 1] + balls[:, 3]) / 2])
+            residuals = centers - self.position()
+            S = self.kf.H @ self.kf.P @ self.kf.H.T + self.kf.R
+            d2 = np.einsum("ij,jk,ik->i", residuals, np.linalg.inv(S), residuals)
+            if d2.min() <= self.gate:
+                best = int(np.argmin(d2))
+
+        if best is None:
+            self.misses += 1
+            if self.misses >= self.max_misses:
+                self.kf = None
+                self.hits = 0
+            return
+
+        ball = balls[best]
+        self.kf.update(centers[best])
+        self.hits += 1
+        self.misses = 0
+        self.size, self.conf = (ball[2] - ball[0], ball[3] - ball[1]), float(ball[4])
+
+    def predicted(self):
+        # Last inferred frame's boxes with its balls replaced by the predicted one
+        rows = self.last[self.last[:, 5] != BALL]
+        if self.kf is None:
+            return rows
+
+        x, y = self.position()
+        w, h = self.size
+        ball = np.array([[x - w / 2, y - h / 2, x + w / 2, y + h / 2, self.conf, BALL]], dtype=rows.dtype)
+        return np.vstack([ball, rows])
+
+    def report(self):
+        return {"frames": self.frames, "inferred": self.frames - self.skipped, "skipped": self.skipped,
+                "skipped_ratio": round(self.skipped / self.frames, 3) if self.frames else 0.0}
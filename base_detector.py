@@ -0,0 +1,473 @@
+import json
+import time
+import cv2
+from utils import get_device
+from shot_state import ShotState
+from detection_cache import DetectionCache
+from backends import Backend, BACKENDS
+from hoop_lock import HoopLock
+from motion_gate import MotionGate
+from ball_tracker import BallTracker
+from adaptive_res import AdaptiveResolution
+from metrics import Metrics, NullMetrics
+from scoreboard import Scoreboard
+from frame_grabber import FrameGrabber, is_file
+from pipeline import Pipeline, decode_stage, infer_stage, encode_stage
+from frame_pool import FramePool
+from annotate import draw_score, shot_overlay
+
+
+class OptionError(ValueError):
+    """Detector options that can't be used together"""
+
+
+class BaseShotDetector(ShotState):
+    """Frame loops, detection cache, live mode and reporting shared by both detectors
+
+    Runs the video from __init__ like the original detectors did. Subclasses set the shot logic
+    variant and the default video, draw the boxes and the hoop (draw_detections, clean_motion)
+    and may open an output video (open_output) - everything else lives here.
+    """
+
+    variant = "basic"
+    default_video = "input/basket.mp4"
+
+    def __init__(self, video_path=None, batch_size=1, pipelined=False, queue_size=8,
+                 headless=False, weights="best.pt", cache=None, params=None, model=None,
+                 hoop_lock=None, motion_gate=None, ball_tracker=None, adaptive_res=None, backend="torch", threads=None,
+                 metrics=None, live=False, max_latency=0.1, frame_pool=True, scoreboard=None):
+        # Tracks, thresholds and the shot state machine live in ShotState - live sources have no end,
+        # so only their latest shot events are kept
+        super().__init__(self.variant, params, max_events=1000 if live else None)
+        video_path = self.default_video if video_path is None else video_path
+        self.check_options(dict(batch_size=batch_size, pipelined=pipelined, cache=cache, live=live,
+                                hoop_lock=hoop_lock, motion_gate=motion_gate, ball_tracker=ball_tracker,
+                                adaptive_res=adaptive_res, backend=getattr(model, "backend", backend)))
+
+        self.overlay_text = "Waiting..."
+        self.overlay_color = (0, 0, 0)
+        self.device = get_device()
+        # Digits select a webcam, like cv2.VideoCapture(0) - use live=True for those
+        self.cap = cv2.VideoCapture(int(video_path) if str(video_path).isdigit() else video_path)
+        self.video_path = video_path
+        self.weights = weights
+
+        # Cached detections skip the model - and the decoding too when headless
+        self.model = model
+        self.backend = backend
+        self.threads = threads
+        self.hoop_lock = hoop_lock
+        self.motion_gate = motion_gate
+        self.ball_tracker = ball_tracker
+        self.adaptive_res = adaptive_res
+        self.metrics = metrics or NullMetrics()
+        self.scoreboard = scoreboard
+        self.live = live
+        self.max_latency = max_latency
+        # Stale frames run_live() dropped - finish() reports it for every live run
+        self.dropped = 0
+        self.load_cache(cache)
+
+        # Number of frames sent to the model per call - 1 keeps the per-frame behaviour
+        self.batch_size = max(1, batch_size)
+
+        # Max frames/batches waiting between pipeline stages
+        self.queue_size = queue_size
+
+        # Headless runs skip all drawing, display and video output and only print shot events and final stats
+        self.headless = headless
+        self.frame = None
+        # Only a run that opened the window closes it - headless OpenCV builds have no GUI
+        self.window = False
+
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.out = self.open_output(width, height)
+
+        # Frames are decoded into recycled buffers, handed back once they've been shown and encoded -
+        # enough for every queue between decoding and the writer to stay full. Live frames come from
+        # the grabber thread and aren't pooled
+        self.pool = None
+        if frame_pool and not live and width and height:
+            in_flight = self.batch_size * (queue_size + 2) + queue_size if pipelined else self.batch_size
+            if self.out is not None:
+                in_flight += (queue_size if pipelined else 0) + self.out.queue.maxsize + 1
+            self.pool = FramePool((height, width, 3), in_flight + 1)
+
+        self.stopped = False
+        with self.metrics.profiled():
+            if self.cached is not None:
+                self.run_cached()
+            elif live:
+                self.run_live()
+            elif pipelined:
+                self.run_pipelined()
+            else:
+                self.run()
+
+    def check_options(self, options):
+        # Raises OptionError before anything is opened. The frame skippers, crops and input sizes
+        # depend on the shot state of the frames before, so they need the sequential loop - and
+        # their detections aren't full-frame model output, so they can't go into the cache either
+        sequential = [name for name in ("hoop_lock", "motion_gate", "ball_tracker", "adaptive_res")
+                      if options[name] is not None]
+        if sequential and (options["pipelined"] or options["cache"] is not None):
+            raise OptionError(f"{', '.join(sequential)} run with the sequential loop and can't be combined "
+                              f"with pipelined or cache")
+        if options["live"] and (options["batch_size"] > 1 or options["pipelined"] or options["cache"] is not None
+                                or sequential):
+            raise OptionError("live runs its own loop and can't be combined with other run options")
+        if options["motion_gate"] is not None and options["ball_tracker"] is not None:
+            raise OptionError("use either motion_gate or ball_tracker")
+        if options["hoop_lock"] is not None and options["adaptive_res"] is not None:
+            raise OptionError("use either hoop_lock or adaptive_res")
+        # Exports keep the input size they were exported at, so the high tier would only add a resize
+        if options["adaptive_res"] is not None and options["backend"] != "torch":
+            raise OptionError(f"adaptive_res needs the torch backend - {options['backend']} ignores imgsz")
+
+    def open_output(self, width, height):
+        # VideoWriter for the annotated frames, or None to only show them
+        return None
+
+    def load_cache(self, cache):
+        self.cached = None
+        self.recorder = None
+        if cache is not None:
+            # A model passed in may be an export even if backend wasn't set
+            backend = getattr(self.model, "backend", self.backend)
+            imgsz = getattr(self.model, "imgsz", 640)
+            key = cache.key(self.video_path, self.weights, backend, imgsz)
+            self.cached = cache.load(key)
+            if self.cached is None:
+                self.recorder = cache.recorder(key, video=self.video_path, weights=self.weights,
+                                               backend=backend, imgsz=imgsz,
+                                               width=int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                               height=int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                               fps=self.cap.get(cv2.CAP_PROP_FPS))
+
+        # Load the YOLO model only when there is something to detect and none was passed in
+        if self.cached is None and self.model is None:
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self.model = Backend(self.weights, self.backend, self.threads, warmup_shape=(height, width, 3))
+
+    def run(self):
+        while True:
+            with self.metrics.time("decode"):
+                frames = self.read_batch()
+
+            if not frames:
+                # eov or error
+                break
+
+            with self.metrics.time("inference"):
+                detections = list(self.detect(frames))
+
+            for frame, (data, full) in zip(frames, detections):
+                self.process_frame(frame, data)
+                if self.hoop_lock is not None:
+                    self.hoop_lock.update(data, full, self.hoop_pos)
+
+                # Shown before it goes to the writer, which recycles the buffer once it's encoded.
+                # Close if 'q' is clicked
+                running = self.show_frame()
+                self.write_frame()
+                if not running:
+                    self.stopped = True
+                    break
+
+            if self.stopped or len(frames) < self.batch_size:
+                break
+
+        self.finish()
+
+    def detect(self, frames):
+        # (boxes.data, ran on the full frame) per frame - one model call per batch, results in frame order
+        # The two frame skippers both need to see consecutive frames, so only one of them runs
+        if self.motion_gate is not None:
+            return self.motion_gate.detect(self.infer, frames, self.hoop_pos, self.up and not self.down)
+        if self.ball_tracker is not None:
+            return self.ball_tracker.detect(self.infer, frames, self.hoop_pos)
+        return self.infer(frames)
+
+    def infer(self, frames):
+        if self.hoop_lock is not None:
+            return self.hoop_lock.detect(self.model, frames, self.device, self.frame_count)
+        if self.adaptive_res is not None:
+            return self.adaptive_res.detect(self.model, frames, self.device, self.ball_pos, self.hoop_pos,
+                                            self.frame_count, self.up)
+        results = self.model(frames, stream=True, device=self.device)
+        return ((r.boxes.data.cpu().numpy(), True) for r in results)
+
+    def run_pipelined(self):
+        # Decode, inference and encoding run on their own threads - the shot logic,
+        # drawing and display stay on this thread and see frames in order
+        pipe = Pipeline(self.queue_size, self.metrics)
+        decoded = pipe.queue("decoded")
+        inferred = pipe.queue("inferred")
+        encoded = pipe.queue("encoded")
+        if self.out is not None:
+            pipe.start(encode_stage, self.out, encoded, self.recycle)
+        pipe.start(decode_stage, self.cap, self.batch_size, decoded, self.pool)
+        pipe.start(infer_stage, self.model, self.device, decoded, inferred)
+
+        try:
+            for frame, r in pipe.drain(inferred):
+                self.process_frame(frame, r.boxes.data.cpu().numpy())
+
+                running = self.show_frame()
+                if self.out is not None:
+                    pipe.put(encoded, self.frame)
+                else:
+                    self.recycle(self.frame)
+                if not running:
+                    self.stopped = True
+                    break
+        finally:
+            pipe.close()
+
+        self.finish()
+
+    def run_cached(self):
+        # Replays stored detections through the shot logic - headless runs never decode the video
+        for data in self.cached:
+            frame = None
+            if not self.headless:
+                with self.metrics.time("decode"):
+                    ret, frame = self.read_frame()
+                if not ret:
+                    break
+
+            self.process_frame(frame, data)
+
+            running = self.show_frame()
+            self.write_frame()
+            if not running:
+                self.stopped = True
+                break
+
+        self.finish()
+
+    def run_live(self):
+        # A grabber thread keeps reading the source - frames that waited longer than max_latency are
+        # dropped, and frame_count follows the source's frame numbers so the frame-gap rules still hold
+        grabber = FrameGrabber(self.cap, self.max_latency, realtime=is_file(self.video_path),
+                               metrics=self.metrics).start()
+        try:
+            while True:
+                item = grabber.get()
+                if item is None:
+                    break
+                index, captured, frame = item
+
+                with self.metrics.time("inference"):
+                    data, _ = next(iter(self.infer([frame])))
+
+                self.frame_count = index
+                self.process_frame(frame, data)
+                self.metrics.observe("latency", time.monotonic() - captured)
+
+                running = self.show_frame()
+                self.write_frame()
+                if not running:
+                    self.stopped = True
+                    break
+        finally:
+            grabber.stop()
+
+        self.dropped = grabber.dropped
+        self.finish()
+
+    def show_frame(self):
+        # Returns False once 'q' is pressed
+        if self.headless:
+            return True
+
+        with self.metrics.time("display"):
+            self.window = True
+            cv2.imshow('Frame', self.frame)
+            return cv2.waitKey(1) & 0xFF != ord('q')  # higher waitKey slows video down, use 1 for webcam
+
+    def finish(self):
+        self.cap.release()
+
+        # Only complete runs are cached
+        if self.recorder is not None and not self.stopped:
+            self.recorder.commit()
+
+        self.metrics.close()
+
+        if self.out is not None:
+            self.out.release()
+
+        report = self.report()
+        if self.headless:
+            print(json.dumps(dict(self.stats(), **report)))
+        else:
+            self.print_report(report)
+            if self.window:
+                cv2.destroyAllWindows()
+
+    def report(self):
+        # How many frames the frame skippers saved the model
+        report = {name: skipper.report() for name, skipper in
+                  (("motion_gate", self.motion_gate), ("ball_tracker", self.ball_tracker)) if skipper is not None}
+
+        # Frames the model ran at each input size
+        if self.adaptive_res is not None:
+            report["adaptive_res"] = self.adaptive_res.report()
+
+        if self.live:
+            report["dropped"] = self.dropped
+        return report
+
+    def print_report(self, report):
+        for name in ("motion_gate", "ball_tracker"):
+            if name in report:
+                print(f"{name} skipped {report[name]['skipped']} of {report[name]['frames']} frames")
+        if "adaptive_res" in report:
+            print(f"adaptive_res ran {report['adaptive_res']['low']} frames at the low and "
+                  f"{report['adaptive_res']['high']} at the high input size")
+        if self.live:
+            print(f"Dropped {self.dropped} stale frames")
+
+    def read_frame(self):
+        return self.pool.read(self.cap) if self.pool is not None else self.cap.read()
+
+    def read_batch(self):
+        # Decode up to batch_size frames, fewer at the end of the video
+        frames = []
+        while len(frames) < self.batch_size:
+            ret, frame = self.read_frame()
+            if not ret:
+                break
+            frames.append(frame)
+        return frames
+
+    def write_frame(self):
+        # The writer recycles the frame's buffer once it's encoded - right away when there's no video
+        if self.out is None:
+            self.recycle(self.frame)
+            return
+        with self.metrics.time("encode"):
+            self.out.write(self.frame, self.recycle)
+
+    def recycle(self, frame):
+        if self.pool is not None:
+            self.pool.release(frame)
+
+    def frame_size(self):
+        # (height, width) of the current frame - headless cached runs have no frame, only the cache's size
+        if self.frame is not None:
+            return self.frame.shape[:2]
+        return self.cached.height, self.cached.width
+
+    def process_frame(self, frame, data):
+        # data is the frame's boxes.data as an array - one (x1, y1, x2, y2, conf, cls) row per box
+        self.frame = frame
+        if self.recorder is not None:
+            self.recorder.add(data)
+
+        with self.metrics.time("boxes"):
+            # Ball and hoop points are filtered and tracked for the whole frame at once
+            x1, y1, w, h, centers, conf, balls, hoops, people = self.add_detections(data, self.frame_size()[0])
+            self.draw_detections(x1, y1, w, h, balls, hoops, people)
+
+        with self.metrics.time("clean_motion"):
+            self.clean_motion()
+        with self.metrics.time("shot_detection"):
+            self.shot_detection()
+        if not self.headless:
+            with self.metrics.time("draw"):
+                self.display_score()
+        self.frame_count += 1
+        self.metrics.frame()
+        if self.scoreboard is not None:
+            self.scoreboard.update(dict(self.stats(), overlay=self.overlay_text))
+
+    def draw_detections(self, x1, y1, w, h, balls, hoops, people):
+        # Boxes of the kept detections - called for headless runs too
+        raise NotImplementedError
+
+    def record_shot(self, made):
+        event = super().record_shot(made)
+        if self.scoreboard is not None:
+            self.scoreboard.shot(event)
+
+        # Green "basket made" or red "basket miss" overlay
+        self.overlay_text, self.overlay_color = shot_overlay(made)
+
+        if self.headless:
+            print(json.dumps(event))
+        return event
+
+    def display_score(self):
+        draw_score(self.frame, self.makes, self.attempts, self.overlay_text, self.overlay_color)
+
+
+def add_arguments(parser, video):
+    # Command line options both detectors share
+    parser.add_argument("--video", default=video)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--pipelined", action="store_true")
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--headless", action="store_true",
+                        help="no drawing, window or output video, print shot events as JSON")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="run the weights in PyTorch or an exported copy (made once, next to the weights)")
+    parser.add_argument("--threads", type=int, help="inference threads (default: the runtime's own choice)")
+    parser.add_argument("--cache", help="detection cache directory - reruns replay stored detections")
+    parser.add_argument("--cache-max-mb", type=int, default=2048)
+    parser.add_argument("--hoop-lock", action="store_true",
+                        help="static camera - freeze the hoop once stable and detect the ball on a crop around it")
+    parser.add_argument("--verify-every", type=int, default=30, help="frames between full-frame hoop checks")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="skip the model on frames without motion and reuse the last detections")
+    parser.add_argument("--ball-tracker", action="store_true",
+                        help="Kalman-track the ball and run the model only every --track-every frames in flight")
+    parser.add_argument("--track-every", type=int, default=2)
+    parser.add_argument("--adaptive-res", action="store_true",
+                        help="infer at --low-res while play is away from the hoop and --high-res around shots")
+    parser.add_argument("--low-res", type=int, default=640, help="model input size away from the hoop")
+    parser.add_argument("--high-res", type=int, default=1280,
+                        help="model input size around shots - --adaptive-res needs --backend torch")
+    parser.add_argument("--live", action="store_true",
+                        help="live source: webcam index, stream URL, or a file replayed in real time")
+    parser.add_argument("--max-latency", type=float, default=0.1,
+                        help="seconds a live frame may wait before it is dropped")
+    parser.add_argument("--no-frame-pool", action="store_true", help="allocate a new buffer for every frame")
+    parser.add_argument("--scoreboard-port", type=int,
+                        help="serve shot events and the score over WebSocket / SSE on this port")
+    parser.add_argument("--scoreboard-host", default="127.0.0.1", help="0.0.0.0 to reach it from other devices")
+    parser.add_argument("--metrics-log", help="append stage latency / fps snapshots to this JSON lines file")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between snapshots")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on localhost:PORT")
+    parser.add_argument("--profile", help="run under cProfile and dump the stats to this file")
+
+
+def run_cli(detector, parser, args, **kwargs):
+    # Builds the shared helpers from add_arguments() options and runs the detector,
+    # kwargs are the detector's own options. Options it rejects become usage errors
+    cache = DetectionCache(args.cache, args.cache_max_mb * 1024 ** 2) if args.cache else None
+    metrics = None
+    if args.metrics_log or args.metrics_port or args.profile:
+        metrics = Metrics(args.metrics_log, args.metrics_interval, args.metrics_port, args.profile)
+    scoreboard = Scoreboard(args.scoreboard_port, args.scoreboard_host) if args.scoreboard_port is not None else None
+
+    try:
+        return detector(args.video, batch_size=args.batch_size, pipelined=args.pipelined,
+                        queue_size=args.queue_size, headless=args.headless,
+                        weights=args.weights, cache=cache,
+                        hoop_lock=HoopLock(verify_every=args.verify_every) if args.hoop_lock else None,
+                        motion_gate=MotionGate() if args.motion_gate else None,
+                        ball_tracker=BallTracker(every=args.track_every) if args.ball_tracker else None,
+                        adaptive_res=AdaptiveResolution(args.low_res, args.high_res) if args.adaptive_res else None,
+                        backend=args.backend, threads=args.threads, metrics=metrics,
+                        live=args.live, max_latency=args.max_latency, frame_pool=not args.no_frame_pool,
+                        scoreboard=scoreboard, **kwargs)
+    except OptionError as e:
+        parser.error(str(e))
+    finally:
+        if scoreboard is not None:
+            scoreboard.close()
@@ -0,0 +1,152 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import time
+from multiprocessing import Pool
+import torch
+import shot_detector
+import shot_detector_2
+from detection_cache import DetectionCache
+from backends import Backend, BACKENDS, ensure_exported
+
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv")
+
+DETECTORS = {
+    "1": shot_detector.ShotDetector,
+    "2": shot_detector_2.ShotDetector,
+}
+
+# Per-worker state, set up once by the pool initializer
+_worker = {}
+
+
+def find_videos(source):
+    # A directory of videos, or a manifest with one video path per line
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if name.lower().endswith(VIDEO_EXTENSIONS))
+
+    base = os.path.dirname(source)
+    with open(source) as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(base, line) for line in lines if line and not line.startswith("#")]
+
+
+def result_path(out_dir, video):
+    # Videos with the same name in different directories (day1/cam1.mp4, day2/cam1.mp4) get
+    # their own result - the suffix is a hash of the absolute path
+    name = os.path.splitext(os.path.basename(video))[0]
+    digest = hashlib.sha1(os.path.abspath(video).encode()).hexdigest()[:8]
+    return os.path.join(out_dir, f"{name}_{digest}.json")
+
+
+def is_done(out_dir, video):
+    # A result only counts if it was made from the same file
+    path = result_path(out_dir, video)
+    if not os.path.exists(path):
+        return False
+    with open(path) as f:
+        result = json.load(f)
+    st = os.stat(video)
+    return result.get("size") == st.st_size and result.get("mtime") == st.st_mtime
+
+
+def init_worker(detector, weights, backend, torch_threads, batch_size, cache_root):
+    # Several workers share the machine - keep each one's torch thread pool small
+    torch.set_num_threads(torch_threads)
+
+    _worker["detector"] = DETECTORS[detector]
+    _worker["weights"] = weights
+    _worker["model"] = Backend(weights, backend, torch_threads)
+    _worker["batch_size"] = batch_size
+    # All workers share one cache root - entries and content hashes are written to a temp file and
+    # renamed into place, so concurrent writers never see each other's half-written files
+    _worker["cache"] = DetectionCache(cache_root) if cache_root else None
+
+
+def process_video(job):
+    video, out_dir = job
+    start = time.perf_counter()
+
+    # Headless events go to stdout - keep worker output quiet, the result file has them.
+    # A broken video shouldn't take the whole night's run down with it
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            detector = _worker["detector"](video, batch_size=_worker["batch_size"], headless=True,
+                                           weights=_worker["weights"], cache=_worker["cache"],
+                                           model=_worker["model"])
+    except Exception as e:
+        return {"video": video, "error": f"{type(e).__name__}: {e}"}
+
+    st = os.stat(video)
+    result = dict(detector.stats(), video=video, size=st.st_size, mtime=st.st_mtime,
+                  seconds=time.perf_counter() - start, events=detector.events)
+
+    path = result_path(out_dir, video)
+    with open(path + ".tmp", "w") as f:
+        json.dump(result, f)
+    os.replace(path + ".tmp", path)
+    return result
+
+
+def write_summary(out_dir, videos):
+    rows = []
+    for video in videos:
+        path = result_path(out_dir, video)
+        if os.path.exists(path):
+            with open(path) as f:
+                result = json.load(f)
+            rows.append({k: result[k] for k in ("video", "frames", "makes", "attempts", "seconds")})
+
+    summary = {
+        "videos": len(rows),
+        "frames": sum(r["frames"] for r in rows),
+        "makes": sum(r["makes"] for r in rows),
+        "attempts": sum(r["attempts"] for r in rows),
+        "results": rows,
+    }
+    with open(os.path.join(out_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", help="directory of videos or manifest file (one path per line)")
+    parser.add_argument("--out", default="output/batch")
+    parser.add_argument("--detector", choices=DETECTORS, default="2")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4))
+    parser.add_argument("--torch-threads", type=int, default=4, help="inference threads per worker")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--cache", help="detection cache directory")
+    parser.add_argument("--force", action="store_true", help="reprocess videos that already have results")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    videos = find_videos(args.source)
+    todo = [v for v in videos if args.force or not is_done(args.out, v)]
+    print(f"{len(videos)} videos, {len(videos) - len(todo)} already done, processing {len(todo)} "
+          f"on {args.workers} workers...")
+
+    # Export once up front rather than racing in every worker
+    if args.backend != "torch":
+        ensure_exported(args.weights, args.backend)
+
+    initargs = (args.detector, args.weights, args.backend, args.torch_threads, args.batch_size, args.cache)
+    with Pool(args.workers, initializer=init_worker, initargs=initargs) as pool:
+        for result in pool.imap_unordered(process_video, [(v, args.out) for v in todo]):
+            if "error" in result:
+                print(f"{result['video']}: FAILED {result['error']}")
+                continue
+            print(f"{result['video']}: {result['makes']} / {result['attempts']} "
+                  f"({result['frames']} frames, {result['seconds']:.1f} s)")
+
+    summary = write_summary(args.out, videos)
+    print(f"Summary: {summary['makes']} / {summary['attempts']} over {summary['videos']} videos, "
+          f"saved to {os.path.join(args.out, 'summary.json')}")
@@ -0,0 +1,849 @@
+import argparse
+import asyncio
+import base64
+import contextlib
+import datetime
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import cv2
+import numpy as np
+from metrics import Metrics
+
+
+# Feature modules are imported by the subcommands that use them, so e.g. `extract` or `scoreboard`
+# runs without torch, ultralytics, lap or filterpy installed
+DETECTORS = {
+    "1": "shot_detector",
+    "2": "shot_detector_2",
+}
+
+
+def detector_class(name):
+    return importlib.import_module(DETECTORS[name]).ShotDetector
+
+
+def timed_run(detector_cls, video, **kwargs):
+    # ShotDetector runs the whole video from __init__, so time the constructor
+    start = time.perf_counter()
+    detector = detector_cls(video, **kwargs)
+    elapsed = time.perf_counter() - start
+    fps = detector.frame_count / elapsed if elapsed > 0 else 0.0
+    return detector, elapsed, fps
+
+
+def report(name, detector, elapsed, fps):
+    print(f"{name:<24} {detector.frame_count:>7} frames  {elapsed:8.2f} s  {fps:7.2f} fps  "
+          f"{detector.makes} / {detector.attempts}")
+
+
+def check_same(name, detector, base):
+    # Speedups only count if the shot results match the reference run
+    if (detector.makes, detector.attempts) != (base.makes, base.attempts):
+        print(f"  MISMATCH against {name} run: {detector.makes} / {detector.attempts} "
+              f"vs {base.makes} / {base.attempts}")
+        return False
+    return True
+
+
+def bench_batch(args):
+    detector_cls = detector_class(args.detector)
+
+    base, elapsed, fps = timed_run(detector_cls, args.video, batch_size=1)
+    report("per-frame", base, elapsed, fps)
+
+    for batch_size in args.batch_sizes:
+        detector, elapsed, batch_fps = timed_run(detector_cls, args.video, batch_size=batch_size)
+        report(f"batch_size={batch_size}", detector, elapsed, batch_fps)
+
+        if check_same("per-frame", detector, base) and fps > 0:
+            print(f"  speedup {batch_fps / fps:.2f}x")
+
+
+def bench_pipelined(args):
+    detector_cls = detector_class(args.detector)
+
+    base, elapsed, fps = timed_run(detector_cls, args.video, batch_size=args.batch_size)
+    report("sequential", base, elapsed, fps)
+
+    detector, elapsed, pipe_fps = timed_run(detector_cls, args.video, batch_size=args.batch_size,
+                                            pipelined=True, queue_size=args.queue_size)
+    report("pipelined", detector, elapsed, pipe_fps)
+
+    if check_same("sequential", detector, base) and fps > 0:
+        print(f"  speedup {pipe_fps / fps:.2f}x")
+
+
+def bench_headless(args):
+    detector_cls = detector_class(args.detector)
+
+    base, elapsed, fps = timed_run(detector_cls, args.video, batch_size=args.batch_size)
+    report("annotated", base, elapsed, fps)
+
+    detector, elapsed, headless_fps = timed_run(detector_cls, args.video, batch_size=args.batch_size,
+                                                headless=True)
+    report("headless", detector, elapsed, headless_fps)
+
+    if check_same("annotated", detector, base) and fps > 0:
+        print(f"  +{headless_fps - fps:.2f} fps ({headless_fps / fps:.2f}x)")
+
+
+def bench_hoop_lock(args):
+    from hoop_lock import HoopLock
+
+    detector_cls = detector_class(args.detector)
+
+    base, elapsed, fps = timed_run(detector_cls, args.video, batch_size=args.batch_size, headless=True)
+    report("full-frame", base, elapsed, fps)
+
+    lock = HoopLock(verify_every=args.verify_every)
+    detector, elapsed, lock_fps = timed_run(detector_cls, args.video, batch_size=args.batch_size,
+                                            headless=True, hoop_lock=lock)
+    report("hoop-lock", detector, elapsed, lock_fps)
+    print(f"  {lock.crop_frames} of {lock.crop_frames + lock.full_frames} frames ran on the hoop crop")
+
+    # Crop detections can legitimately find balls the full frame missed, so a mismatch
+    # here needs a look at the events rather than meaning the run is wrong
+    if check_same("full-frame", detector, base) and fps > 0:
+        print(f"  speedup {lock_fps / fps:.2f}x")
+
+
+def bench_motion_gate(args):
+    from motion_gate import MotionGate
+
+    detector_cls = detector_class(args.detector)
+
+    base, elapsed, fps = timed_run(detector_cls, args.video, batch_size=args.batch_size, headless=True)
+    report("every frame", base, elapsed, fps)
+
+    gate = MotionGate(motion_threshold=args.motion_threshold, max_skip=args.max_skip)
+    detector, elapsed, gate_fps = timed_run(detector_cls, args.video, batch_size=args.batch_size,
+                                            headless=True, motion_gate=gate)
+    report("motion gate", detector, elapsed, gate_fps)
+    print(f"  skipped {gate.skipped} of {gate.frames} frames ({100 * gate.skipped / max(1, gate.frames):.1f}%)")
+
+    if check_same("every frame", detector, base) and fps > 0:
+        print(f"  speedup {gate_fps / fps:.2f}x")
+
+
+def bench_ball_tracker(args):
+    from ball_tracker import BallTracker
+
+    detector_cls = detector_class(args.detector)
+
+    base, elapsed, fps = timed_run(detector_cls, args.video, batch_size=args.batch_size, headless=True)
+    report("every frame", base, elapsed, fps)
+
+    tracker = BallTracker(every=args.every)
+    detector, elapsed, track_fps = timed_run(detector_cls, args.video, batch_size=args.batch_size,
+                                             headless=True, ball_tracker=tracker)
+    report(f"ball tracker every={args.every}", detector, elapsed, track_fps)
+    print(f"  skipped {tracker.skipped} of {tracker.frames} frames "
+          f"({100 * tracker.skipped / max(1, tracker.frames):.1f}%)")
+
+    if check_same("every frame", detector, base) and fps > 0:
+        print(f"  speedup {track_fps / fps:.2f}x")
+
+
+def bench_tracker_skip(args):
+    # The tracker only looks at the boxes, so a synthetic video's true boxes are replayed through
+    # it and the shot logic without decoding anything - frame indices stand in for the frames
+    from ball_tracker import BallTracker
+    from shot_state import ShotState
+    from synthetic_video import load_detections
+    from param_sweep import match_shots
+
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split("x"))
+        video, shots = synthetic_video(argparse.Namespace(**dict(vars(args), width=width, height=height)))
+        detections = load_detections(video)
+
+        tracker = BallTracker(every=args.every)
+        state = ShotState("extended")
+        for i in range(len(detections)):
+            for data, _ in tracker.detect(lambda idx: [(detections[j], True) for j in idx], [i], state.hoop_pos):
+                state.step(data, height)
+
+        report = tracker.report()
+        matched, correct, extra = match_shots(state.events, shots, args.tolerance)
+        print(f"{size:<12} {report['frames']:>7} frames  skipped {report['skipped']:>6} "
+              f"({100 * report['skipped_ratio']:5.1f}%)  {state.makes} / {state.attempts}  "
+              f"({correct}/{len(shots)} shots right, {extra} extra)")
+
+
+def read_frames(video, count):
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def bench_backends(args):
+    # Per-frame latency of each backend on the same decoded frames, boxes checked against PyTorch
+    from backends import Backend, match_boxes
+
+    frames = read_frames(args.video, args.frames)
+    reference = None
+
+    for name in ["torch"] + [b for b in args.backends if b != "torch"]:
+        model = Backend(args.weights, name, args.threads, warmup_shape=frames[0].shape)
+        latencies = []
+        boxes = []
+        for frame in frames:
+            start = time.perf_counter()
+            r = next(iter(model([frame], stream=True, device="cpu")))
+            latencies.append(time.perf_counter() - start)
+            boxes.append(r.boxes.data.cpu().numpy())
+
+        ms = np.array(latencies) * 1000
+        line = (f"{name:<12} mean {ms.mean():7.2f} ms  p50 {np.percentile(ms, 50):7.2f} ms  "
+                f"p95 {np.percentile(ms, 95):7.2f} ms  {1000 / ms.mean():6.2f} fps")
+        if reference is None:
+            reference = boxes
+        else:
+            same = sum(match_boxes(a, b, args.box_tol, args.conf_tol) for a, b in zip(reference, boxes))
+            line += f"  {same}/{len(frames)} frames match torch"
+        print(line)
+
+
+def legacy_extract(video, out_dir, stride):
+    # The old extract_frames.py loop - decodes every frame and writes on the decode thread
+    cap = cv2.VideoCapture(video)
+    frame_count = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_count % stride == 0:
+            cv2.imwrite(os.path.join(out_dir, f"frame_{frame_count}.jpg"), frame)
+        frame_count += 1
+    cap.release()
+    return frame_count
+
+
+def bench_extract(args):
+    from extract_frames import extract_video, frame_name
+
+    with tempfile.TemporaryDirectory() as old_dir, tempfile.TemporaryDirectory() as new_dir:
+        start = time.perf_counter()
+        frames = legacy_extract(args.video, old_dir, args.stride)
+        elapsed = time.perf_counter() - start
+        print(f"{'read + imwrite':<24} {frames:>7} frames  {elapsed:8.2f} s  {frames / elapsed:7.2f} fps")
+
+        # The last run finds every frame already there
+        runs = [("grab + writer threads", False, True)]
+        if args.seek:
+            runs.append(("seek + writer threads", True, True))
+        runs.append(("rerun", False, False))
+
+        for name, seek, force in runs:
+            result = extract_video(args.video, new_dir, args.stride, seek=seek, writers=args.writers, force=force)
+            fps = frames / result["seconds"]
+            print(f"{name:<24} {frames:>7} frames  {result['seconds']:8.2f} s  {fps:7.2f} fps  "
+                  f"saved {result['saved']}, skipped {result['skipped']}")
+            print(f"  speedup {elapsed / result['seconds']:.2f}x")
+
+            # Same frames, byte for byte - both encode at OpenCV's default quality of 95
+            old = sorted(os.listdir(old_dir))
+            same = 0
+            for name_old in old:
+                index = int(name_old[len("frame_"):-len(".jpg")])
+                path = os.path.join(new_dir, frame_name(args.video, index))
+                if os.path.exists(path):
+                    with open(os.path.join(old_dir, name_old), "rb") as a, open(path, "rb") as b:
+                        same += a.read() == b.read()
+            if same != len(old):
+                print(f"  MISMATCH: {same}/{len(old)} frames identical to the old script's")
+
+
+def count_images(data):
+    import yaml
+
+    with open(data) as f:
+        config = yaml.safe_load(f)
+    return {split: len(os.listdir(config[split])) for split in ("train", "val")}
+
+
+def bench_train(args):
+    # Same model and settings on each dataset config - the first one is the reference
+    from ultralytics import YOLO
+    from utils import get_device
+
+    device = get_device()
+    reference = None
+    for data in args.configs:
+        images = count_images(data)
+        model = YOLO(args.weights)
+        start = time.perf_counter()
+        model.train(data=data, epochs=args.epochs, imgsz=args.imgsz, batch=args.batch, device=device,
+                    project=args.project, name=os.path.splitext(os.path.basename(data))[0], exist_ok=True)
+        per_epoch = (time.perf_counter() - start) / args.epochs
+        print(f"{data:<32} {images['train']:>6} train  {images['val']:>6} val  {per_epoch:8.1f} s/epoch")
+
+        if reference is None:
+            reference = per_epoch
+        else:
+            print(f"  speedup {reference / per_epoch:.2f}x")
+
+
+# Detector entry points of the suite - all headless, so it runs without a display
+SUITE = {
+    "detector1": ("shot_detector", {"headless": True}),
+    "detector2": ("shot_detector_2", {"headless": True}),
+    "detector2-batch8": ("shot_detector_2", {"headless": True, "batch_size": 8}),
+    "detector2-pipelined": ("shot_detector_2", {"headless": True, "pipelined": True, "batch_size": 8}),
+    "stream": ("shot_stream", {}),
+}
+
+
+def synthetic_video(args):
+    # Generated once per configuration and reused by later runs
+    name = (f"synthetic_{args.width}x{args.height}_{args.fps}fps_{args.makes}m{args.misses}x_"
+            f"{args.players}p_seed{args.seed}.mp4")
+    gap = getattr(args, "gap", 1.0)
+    if gap != 1.0:
+        name = name.replace(".mp4", f"_gap{gap:g}.mp4")
+    ball = getattr(args, "ball", 0.022)
+    if ball != 0.022:
+        name = name.replace(".mp4", f"_ball{ball:g}.mp4")
+    path = os.path.join(args.video_dir, name)
+    if not os.path.exists(path):
+        from synthetic_video import render
+        print(f"Rendering {path}...")
+        render(path, args.width, args.height, args.fps, args.makes, args.misses, args.players, args.seed, gap, ball)
+    with open(os.path.splitext(path)[0] + ".json") as f:
+        shots = json.load(f)["videos"][0]["shots"]
+    return path, shots
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_entry(job):
+    # Runs in a fresh process, so the peak RSS is this entry's alone. The model is built before
+    # the clock starts - "oracle" replays the video's true boxes instead of running the network
+    from backends import Backend
+    from synthetic_video import load_detections, OracleModel
+
+    name, video, weights = job
+    module, kwargs = SUITE[name]
+    module = importlib.import_module(module)
+    model = OracleModel(load_detections(video)) if weights == "oracle" else Backend(weights)
+    metrics = Metrics(interval=float("inf"))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if name == "stream":
+            detector = module.ShotStream(model=model, metrics=metrics, **kwargs)
+            events = list(detector.events(video))
+            metrics.close()
+        else:
+            detector = module.ShotDetector(video, model=model, metrics=metrics, **kwargs)
+            events = detector.events
+    elapsed = time.perf_counter() - start
+
+    stats = detector.stats()
+    return dict(stats, seconds=round(elapsed, 3), fps=round(stats["frames"] / elapsed, 2),
+                stages=metrics.snapshot()["stages"], peak_rss_mb=peak_rss_mb(), events=events)
+
+
+def shot_tracks(video, shots):
+    # Ball and hoop tracks as the shot logic has them when the first shot comes down
+    from shot_state import ShotState
+    from synthetic_video import load_detections
+
+    state = ShotState("basic")
+    for data in load_detections(video)[:shots[0]["frame"] + 1]:
+        state.step(data)
+    return state
+
+
+def time_call(fn, repeat):
+    # Best of `repeat` timings, in nanoseconds per call
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return round(min(timer.repeat(repeat, number)) / number * 1e9, 1)
+
+
+def micro_benchmarks(state, repeat):
+    # The tracks are already clean, so the clean_* calls leave them unchanged between repeats
+    from utils import score, detect_up, detect_down, clean_ball_pos, clean_hoop_pos
+
+    ball, hoop, frame = state.ball_pos, state.hoop_pos, state.frame_count - 1
+    return {
+        "score": time_call(lambda: score(ball, hoop), repeat),
+        "detect_up": time_call(lambda: detect_up(ball, hoop), repeat),
+        "detect_down": time_call(lambda: detect_down(ball, hoop), repeat),
+        "clean_ball_pos": time_call(lambda: clean_ball_pos(ball, frame), repeat),
+        "clean_hoop_pos": time_call(lambda: clean_hoop_pos(hoop), repeat),
+    }
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def compare(result, previous):
+    with open(previous) as f:
+        before = json.load(f)
+    print(f"Against {previous} ({before.get('commit')}):")
+    for name, entry in result["entries"].items():
+        if name in before["entries"]:
+            old = before["entries"][name]
+            print(f"  {name:<22} fps {entry['fps'] / old['fps']:6.2f}x  "
+                  f"peak RSS {entry['peak_rss_mb'] - old['peak_rss_mb']:+8.1f} MB")
+    for name, ns in result["micro"].items():
+        if name in before["micro"]:
+            print(f"  {name:<22} time {ns / before['micro'][name]:6.2f}x")
+
+
+def bench_suite(args):
+    from param_sweep import match_shots
+
+    video, shots = synthetic_video(args)
+    config = {k: getattr(args, k) for k in ("width", "height", "fps", "makes", "misses", "players", "seed",
+                                            "weights", "runs")}
+    result = {"time": datetime.datetime.now().isoformat(timespec="seconds"), "commit": git_commit(),
+              "python": platform.python_version(), "machine": platform.machine(), "config": config,
+              "entries": {}, "micro": {}}
+
+    # One process per run, started clean - the best run of each entry is kept
+    context = multiprocessing.get_context("spawn")
+    for name in args.entries:
+        runs = []
+        for _ in range(args.runs):
+            with context.Pool(1) as pool:
+                runs.append(pool.apply(run_entry, ((name, video, args.weights),)))
+        entry = max(runs, key=lambda r: r["fps"])
+
+        matched, correct, extra = match_shots(entry.pop("events"), shots, args.tolerance)
+        entry.update(shots=len(shots), matched=matched, correct=correct, extra=extra)
+        result["entries"][name] = entry
+        print(f"{name:<22} {entry['frames']:>7} frames  {entry['seconds']:8.2f} s  {entry['fps']:8.2f} fps  "
+              f"{entry['peak_rss_mb']:8.1f} MB  {entry['makes']} / {entry['attempts']}  "
+              f"({correct}/{len(shots)} shots right)")
+
+    result["micro"] = micro_benchmarks(shot_tracks(video, shots), args.repeat)
+    for name, ns in result["micro"].items():
+        print(f"{name:<22} {ns:10.1f} ns/call")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    path = os.path.join(args.out_dir, datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results saved to {path}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+def offscreen_detector():
+    from shot_detector_2 import ShotDetector
+
+    class OffscreenDetector(ShotDetector):
+        # Draws and writes the video like a normal run, without a window
+        def show_frame(self):
+            return True
+
+    return OffscreenDetector
+
+
+def run_offscreen(job):
+    # Runs in a fresh process so the peak RSS is this run's alone - videos are written to a
+    # temporary directory. Highlights settings come as a dict, a Highlights doesn't pickle its way here
+    from highlights import Highlights
+    from synthetic_video import load_detections, OracleModel
+
+    video, kwargs = job
+    model = OracleModel(load_detections(video))
+    video = os.path.abspath(video)
+    if "highlights" in kwargs:
+        kwargs = dict(kwargs, highlights=Highlights("highlights", **kwargs["highlights"]))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as out_dir:
+        os.chdir(out_dir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                detector, elapsed, fps = timed_run(offscreen_detector(), video, model=model, **kwargs)
+            size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(".")
+                       for name in names if name.endswith(".mp4"))
+        finally:
+            os.chdir(cwd)
+
+    pool = detector.pool.report() if detector.pool is not None else None
+    # Without the pool every decoded frame is a new array
+    buffers = pool["buffers"] + pool["allocated"] if pool else detector.frame_count
+    return {"frames": detector.frame_count, "seconds": elapsed, "fps": fps, "peak_rss_mb": peak_rss_mb(),
+            "buffers": buffers, "mb": size / 1024 ** 2, "events": detector.events}
+
+
+def bench_writer(args):
+    video, _ = synthetic_video(args)
+    runs = [("new buffers + OpenCV", {"writer": "opencv", "frame_pool": False}),
+            ("frame pool + OpenCV", {"writer": "opencv"})]
+    if shutil.which("ffmpeg"):
+        runs.append(("frame pool + ffmpeg", {"writer": "ffmpeg", "codec": args.codec, "preset": args.preset,
+                                             "crf": args.crf}))
+    else:
+        print("ffmpeg is not on the PATH - only timing the OpenCV writer")
+
+    context = multiprocessing.get_context("spawn")
+    base = None
+    for name, kwargs in runs:
+        kwargs.update(batch_size=args.batch_size, pipelined=args.pipelined)
+        with context.Pool(1) as pool:
+            result = pool.apply(run_offscreen, ((video, kwargs),))
+        print(f"{name:<24} {result['frames']:>7} frames  {result['seconds']:8.2f} s  {result['fps']:7.2f} fps  "
+              f"{result['peak_rss_mb']:8.1f} MB peak  {result['buffers'] / result['frames']:6.3f} buffers/frame  "
+              f"{result['mb']:7.1f} MB video")
+
+        if base is None:
+            base = result
+            continue
+        print(f"  speedup {base['seconds'] / result['seconds']:.2f}x")
+        if [e["made"] for e in result["events"]] != [e["made"] for e in base["events"]]:
+            print(f"  MISMATCH against the {runs[0][0]} run: shot events differ")
+
+
+def bench_highlights(args):
+    video, _ = synthetic_video(args)
+    options = {"before": args.before, "after": args.after, "made_only": args.made_only}
+    runs = [("full video", {}),
+            ("highlights", {"highlights": options}),
+            ("highlights + overlays", {"highlights": dict(options, overlays=True)})]
+
+    context = multiprocessing.get_context("spawn")
+    base = None
+    for name, kwargs in runs:
+        with context.Pool(1) as pool:
+            result = pool.apply(run_offscreen, ((video, kwargs),))
+        print(f"{name:<24} {result['frames']:>7} frames  {result['seconds']:8.2f} s  {result['fps']:7.2f} fps  "
+              f"{result['mb']:7.1f} MB written")
+        if base is None:
+            base = result
+        else:
+            print(f"  speedup {base['seconds'] / result['seconds']:.2f}x")
+
+
+async def read_sse(port, latencies, delay):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /stream HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await reader.readuntil(b"\r\n\r\n")
+    while True:
+        block = await reader.readuntil(b"\n\n")
+        data = json.loads(block.split(b"data: ", 1)[1])
+        latencies.append((data["type"], time.time() - data["time"]))
+        await asyncio.sleep(delay)
+
+
+async def read_ws(port, latencies, delay):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(f"GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+    await reader.readuntil(b"\r\n\r\n")
+    while True:
+        head = await reader.readexactly(2)
+        n = head[1] & 0x7F
+        if n == 126:
+            n = int.from_bytes(await reader.readexactly(2), "big")
+        data = json.loads(await reader.readexactly(n))
+        latencies.append((data["type"], time.time() - data["time"]))
+        await asyncio.sleep(delay)
+
+
+def scoreboard_clients(port, clients, slow, seconds):
+    # Runs in its own process, so parsing on the clients' side doesn't slow the server down. Half the
+    # clients use SSE, half WebSocket - the slow ones read one message every 50 ms
+    async def run():
+        fast = [[] for _ in range(clients)]
+        lagging = [[] for _ in range(slow)]
+        tasks = [(read_sse if i % 2 else read_ws)(port, latencies, 0) for i, latencies in enumerate(fast)]
+        tasks += [read_sse(port, latencies, 0.05) for latencies in lagging]
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks), seconds)
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        return fast, lagging
+    return asyncio.run(run())
+
+
+def bench_scoreboard(args):
+    from scoreboard import Scoreboard
+
+    board = Scoreboard(0)
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        pending = pool.apply_async(scoreboard_clients, (board.port, args.clients, args.slow, args.seconds + 2))
+        time.sleep(1.5)
+
+        # A fake run at --fps - a shot every --shot-every frames, stats every frame
+        frames = int(args.seconds * args.fps)
+        publish = []
+        start = time.perf_counter()
+        for i in range(frames):
+            t = time.perf_counter()
+            if i % args.shot_every == 0:
+                board.shot({"frame": i, "made": True, "makes": 0, "attempts": 0, "up_frame": i, "down_frame": i})
+            board.update({"frames": i, "makes": 0, "attempts": 0, "overlay": ""})
+            publish.append(time.perf_counter() - t)
+            time.sleep(max(0.0, start + (i + 1) / args.fps - time.perf_counter()))
+        fast, lagging = pending.get()
+    board.close()
+
+    def quantiles(values):
+        values = sorted(values)
+        return " ".join(f"p{q} {1000 * values[min(len(values) - 1, int(q / 100 * len(values)))]:6.2f} ms"
+                        for q in (50, 95, 99)) if values else "no messages"
+
+    shots = [latency for latencies in fast for kind, latency in latencies if kind == "shot"]
+    stats = [latency for latencies in fast for kind, latency in latencies if kind == "stats"]
+    print(f"{args.clients} clients, {frames} frames at {args.fps:g} fps, {frames // args.shot_every} shots")
+    print(f"{'publish (frame loop)':<24} {1e6 * sum(publish) / len(publish):8.1f} us/frame")
+    print(f"{'shot delivery':<24} {quantiles(shots)}")
+    print(f"{'stats delivery':<24} {quantiles(stats)}")
+    print(f"{'stats received':<24} {len(stats) / max(1, args.clients):8.0f} per client ({frames} frames)")
+    # Slow clients fall behind by whatever the socket buffers hold, past that stats are coalesced
+    for i, latencies in enumerate(lagging):
+        received = [kind for kind, _ in latencies]
+        print(f"{'slow client ' + str(i + 1):<24} {received.count('shot'):>5} shots  {received.count('stats'):>5} stats  "
+              f"last one {latencies[-1][1] if latencies else 0:.1f} s behind")
+
+
+def run_resolution(job):
+    # Runs in a fresh process like run_entry. sizes is None for the model's own full-frame
+    # letterbox, or the (low, high) input sizes - equal for a fixed tier
+    from adaptive_res import AdaptiveResolution
+    from backends import Backend
+    from shot_detector_2 import ShotDetector
+    from synthetic_video import load_detections, OracleModel
+
+    video, sizes, weights, min_ball = job
+    if weights == "oracle":
+        cap = cv2.VideoCapture(video)
+        model = OracleModel(load_detections(video), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), min_ball)
+        cap.release()
+    else:
+        model = Backend(weights)
+    adaptive = AdaptiveResolution(*sizes) if sizes else None
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        detector, elapsed, fps = timed_run(ShotDetector, video, model=model, headless=True,
+                                           adaptive_res=adaptive)
+    return {"frames": detector.frame_count, "seconds": elapsed, "fps": fps, "makes": detector.makes,
+            "attempts": detector.attempts, "tiers": adaptive.report() if adaptive else None,
+            "events": detector.events}
+
+
+def bench_resolution(args):
+    from param_sweep import match_shots
+
+    video, shots = synthetic_video(args)
+    runs = [("full frame", None),
+            (f"fixed {args.low}", (args.low, args.low)),
+            (f"fixed {args.high}", (args.high, args.high)),
+            (f"adaptive {args.low}/{args.high}", (args.low, args.high))]
+
+    context = multiprocessing.get_context("spawn")
+    for name, sizes in runs:
+        with context.Pool(1) as pool:
+            result = pool.apply(run_resolution, ((video, sizes, args.weights, args.min_ball),))
+        matched, correct, extra = match_shots(result["events"], shots, args.tolerance)
+        high = ""
+        if result["tiers"] is not None and sizes[0] != sizes[1]:
+            high = f"  {100 * result['tiers']['high'] / max(1, result['frames']):5.1f}% high"
+        print(f"{name:<24} {result['frames']:>7} frames  {result['seconds']:8.2f} s  {result['fps']:7.2f} fps  "
+              f"{result['makes']} / {result['attempts']}  ({correct}/{len(shots)} shots right, {extra} extra){high}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch = subparsers.add_parser("batch", help="per-frame vs batched inference throughput")
+    batch.add_argument("video")
+    batch.add_argument("--detector", choices=DETECTORS, default="1")
+    batch.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 8, 16])
+    batch.set_defaults(func=bench_batch)
+
+    pipelined = subparsers.add_parser("pipelined", help="sequential vs pipelined run loop")
+    pipelined.add_argument("video")
+    pipelined.add_argument("--detector", choices=DETECTORS, default="1")
+    pipelined.add_argument("--batch-size", type=int, default=1)
+    pipelined.add_argument("--queue-size", type=int, default=8)
+    pipelined.set_defaults(func=bench_pipelined)
+
+    headless = subparsers.add_parser("headless", help="annotated vs headless analytics run")
+    headless.add_argument("video")
+    headless.add_argument("--detector", choices=DETECTORS, default="1")
+    headless.add_argument("--batch-size", type=int, default=1)
+    headless.set_defaults(func=bench_headless)
+
+    hoop_lock = subparsers.add_parser("hoop-lock", help="full-frame vs hoop-locked crop inference")
+    hoop_lock.add_argument("video")
+    hoop_lock.add_argument("--detector", choices=DETECTORS, default="2")
+    hoop_lock.add_argument("--batch-size", type=int, default=1)
+    hoop_lock.add_argument("--verify-every", type=int, default=30)
+    hoop_lock.set_defaults(func=bench_hoop_lock)
+
+    motion_gate = subparsers.add_parser("motion-gate", help="every frame vs motion-gated inference")
+    motion_gate.add_argument("video")
+    motion_gate.add_argument("--detector", choices=DETECTORS, default="2")
+    motion_gate.add_argument("--batch-size", type=int, default=1)
+    motion_gate.add_argument("--motion-threshold", type=float, default=0.01)
+    motion_gate.add_argument("--max-skip", type=int, default=15)
+    motion_gate.set_defaults(func=bench_motion_gate)
+
+    ball_tracker = subparsers.add_parser("ball-tracker", help="every frame vs Kalman-predicted ball in flight")
+    ball_tracker.add_argument("video")
+    ball_tracker.add_argument("--detector", choices=DETECTORS, default="2")
+    ball_tracker.add_argument("--batch-size", type=int, default=1)
+    ball_tracker.add_argument("--every", type=int, default=2)
+    ball_tracker.set_defaults(func=bench_ball_tracker)
+
+    tracker_skip = subparsers.add_parser("tracker-skip", help="ball tracker skip rate at its default settings, on "
+                                                              "synthetic videos at several resolutions")
+    tracker_skip.add_argument("--sizes", nargs="+", default=["640x360", "1280x720", "1920x1080"])
+    tracker_skip.add_argument("--every", type=int, default=2)
+    tracker_skip.add_argument("--fps", type=int, default=30)
+    tracker_skip.add_argument("--makes", type=int, default=5)
+    tracker_skip.add_argument("--misses", type=int, default=5)
+    tracker_skip.add_argument("--players", type=int, default=4)
+    tracker_skip.add_argument("--seed", type=int, default=0)
+    tracker_skip.add_argument("--tolerance", type=int, default=5, help="frames between a shot and its detected attempt")
+    tracker_skip.add_argument("--video-dir", default="benchmarks/videos")
+    tracker_skip.set_defaults(func=bench_tracker_skip)
+
+    backends = subparsers.add_parser("backends", help="CPU latency and box agreement of exported backends")
+    backends.add_argument("video")
+    backends.add_argument("--weights", default="best.pt")
+    backends.add_argument("--backends", nargs="+", default=["onnx", "openvino", "torchscript"],
+                          help="any of torch, onnx, openvino, torchscript")
+    backends.add_argument("--threads", type=int)
+    backends.add_argument("--frames", type=int, default=200)
+    backends.add_argument("--box-tol", type=float, default=2.0, help="max box corner difference in pixels")
+    backends.add_argument("--conf-tol", type=float, default=0.02)
+    backends.set_defaults(func=bench_backends)
+
+    extract = subparsers.add_parser("extract", help="old extract_frames.py loop vs the parallel extractor")
+    extract.add_argument("video")
+    extract.add_argument("--stride", type=int, default=5)
+    extract.add_argument("--writers", type=int, default=4)
+    extract.add_argument("--seek", action="store_true", help="also time seeking between frames")
+    extract.set_defaults(func=bench_extract)
+
+    train = subparsers.add_parser("train", help="training time per epoch, e.g. before and after dedup.py")
+    train.add_argument("configs", nargs="+", help="dataset configs, the first one is the reference")
+    train.add_argument("--weights", default="yolov8n.pt")
+    train.add_argument("--epochs", type=int, default=1)
+    train.add_argument("--imgsz", type=int, default=640)
+    train.add_argument("--batch", type=int, default=16)
+    train.add_argument("--project", default="runs/benchmark")
+    train.set_defaults(func=bench_train)
+
+    writer = subparsers.add_parser("writer", help="a new buffer per frame and OpenCV's writer vs the frame pool "
+                                                   "and the ffmpeg pipe, on a synthetic video")
+    writer.add_argument("--width", type=int, default=1920)
+    writer.add_argument("--height", type=int, default=1080)
+    writer.add_argument("--fps", type=int, default=30)
+    writer.add_argument("--makes", type=int, default=3)
+    writer.add_argument("--misses", type=int, default=3)
+    writer.add_argument("--players", type=int, default=6)
+    writer.add_argument("--seed", type=int, default=0)
+    writer.add_argument("--batch-size", type=int, default=1)
+    writer.add_argument("--pipelined", action="store_true")
+    writer.add_argument("--codec", default="libx264")
+    writer.add_argument("--preset", default="veryfast")
+    writer.add_argument("--crf", type=int, default=23)
+    writer.add_argument("--video-dir", default="benchmarks/videos")
+    writer.set_defaults(func=bench_writer)
+
+    highlights = subparsers.add_parser("highlights", help="full annotated video vs highlight clips, on a synthetic "
+                                                           "video")
+    highlights.add_argument("--width", type=int, default=1920)
+    highlights.add_argument("--height", type=int, default=1080)
+    highlights.add_argument("--fps", type=int, default=30)
+    highlights.add_argument("--makes", type=int, default=3)
+    highlights.add_argument("--misses", type=int, default=3)
+    highlights.add_argument("--players", type=int, default=6)
+    highlights.add_argument("--seed", type=int, default=0)
+    highlights.add_argument("--gap", type=float, default=10.0, help="seconds between shots")
+    highlights.add_argument("--before", type=float, default=2.0)
+    highlights.add_argument("--after", type=float, default=1.0)
+    highlights.add_argument("--made-only", action="store_true")
+    highlights.add_argument("--video-dir", default="benchmarks/videos")
+    highlights.set_defaults(func=bench_highlights)
+
+    resolution = subparsers.add_parser("resolution", help="fps and shot accuracy at fixed and adaptive model "
+                                                          "input sizes, on a synthetic video")
+    resolution.add_argument("--weights", default="oracle",
+                            help="model weights, or 'oracle' to replay the true boxes, missing the small balls")
+    resolution.add_argument("--min-ball", type=float, default=8.0,
+                            help="oracle only - balls narrower than this in the model input are missed")
+    resolution.add_argument("--low", type=int, default=640)
+    resolution.add_argument("--high", type=int, default=1280)
+    resolution.add_argument("--width", type=int, default=3840)
+    resolution.add_argument("--height", type=int, default=2160)
+    resolution.add_argument("--fps", type=int, default=30)
+    resolution.add_argument("--makes", type=int, default=5)
+    resolution.add_argument("--misses", type=int, default=5)
+    resolution.add_argument("--players", type=int, default=6)
+    resolution.add_argument("--seed", type=int, default=0)
+    resolution.add_argument("--gap", type=float, default=3.0, help="seconds between shots")
+    resolution.add_argument("--ball", type=float, default=0.008, help="ball diameter as a share of the width")
+    resolution.add_argument("--tolerance", type=int, default=5, help="frames between a shot and its detected attempt")
+    resolution.add_argument("--video-dir", default="benchmarks/videos")
+    resolution.set_defaults(func=bench_resolution)
+
+    scoreboard = subparsers.add_parser("scoreboard", help="event delivery latency to many local scoreboard clients")
+    scoreboard.add_argument("--clients", type=int, default=50, help="fast clients, half SSE and half WebSocket")
+    scoreboard.add_argument("--slow", type=int, default=2, help="clients that read one message every 50 ms")
+    scoreboard.add_argument("--fps", type=float, default=30.0)
+    scoreboard.add_argument("--seconds", type=float, default=10.0)
+    scoreboard.add_argument("--shot-every", type=int, default=60, help="frames between shots")
+    scoreboard.set_defaults(func=bench_scoreboard)
+
+    suite = subparsers.add_parser("suite", help="fps, stage latency, peak RSS and micro-benchmarks on a synthetic "
+                                                 "video, saved as JSON")
+    suite.add_argument("--weights", default="oracle",
+                       help="model weights, or 'oracle' to replay the video's true boxes without a network")
+    suite.add_argument("--entries", nargs="+", choices=SUITE, default=list(SUITE))
+    suite.add_argument("--runs", type=int, default=1, help="runs per entry, the fastest is kept")
+    suite.add_argument("--repeat", type=int, default=5, help="timing repeats per micro-benchmark")
+    suite.add_argument("--width", type=int, default=1280)
+    suite.add_argument("--height", type=int, default=720)
+    suite.add_argument("--fps", type=int, default=30)
+    suite.add_argument("--makes", type=int, default=10)
+    suite.add_argument("--misses", type=int, default=10)
+    suite.add_argument("--players", type=int, default=6)
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--tolerance", type=int, default=5, help="frames between a shot and its detected attempt")
+    suite.add_argument("--video-dir", default="benchmarks/videos")
+    suite.add_argument("--out-dir", default="benchmarks")
+    suite.add_argument("--compare", help="earlier results file to compare against")
+    suite.set_defaults(func=bench_suite)
+
+    args = parser.parse_args()
+    args.func(args)
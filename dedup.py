@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+import yaml
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# <video>_frame_<n> from extract_frames.py, or the older frame_<n>
+FRAME_NAME = re.compile(r"^(?:(.*)_)?frame_(\d+)$")
+
+
+def phash(gray):
+    # 64-bit perceptual hash - signs of the lowest 8x8 DCT frequencies against their median
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hash_image(path):
+    # JPEGs are decoded straight to a quarter-size grayscale image, which is all the hash needs
+    gray = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    return None if gray is None else phash(gray)
+
+
+def frame_key(name):
+    # (video, frame number) so frames sort in time order within their video
+    stem = os.path.splitext(name)[0]
+    match = FRAME_NAME.match(stem)
+    if match is None:
+        return stem, 0
+    return match.group(1) or "", int(match.group(2))
+
+
+class HashIndex:
+    """Multi-index hashing - finds stored hashes within `threshold` bits without comparing to all
+
+    The 64 bits are cut into threshold + 1 chunks. Two hashes that differ in at most threshold bits
+    must agree exactly on at least one chunk, so only hashes sharing a chunk value are compared.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        bounds = np.linspace(0, 64, threshold + 2).astype(int)
+        self.chunks = [(int(lo), (1 << int(hi - lo)) - 1) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        self.tables = [{} for _ in self.chunks]
+        self.hashes = []
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def keys(self, h):
+        return [(h >> shift) & mask for shift, mask in self.chunks]
+
+    def nearest(self, h):
+        # Closest stored hash within threshold bits as (index, distance), or None
+        candidates = set()
+        for table, key in zip(self.tables, self.keys(h)):
+            candidates.update(table.get(key, ()))
+
+        best = None
+        for i in candidates:
+            distance = bin(h ^ self.hashes[i]).count("1")
+            if distance <= self.threshold and (best is None or distance < best[1]):
+                best = (i, distance)
+        return best
+
+    def add(self, h):
+        i = len(self.hashes)
+        self.hashes.append(h)
+        for table, key in zip(self.tables, self.keys(h)):
+            table.setdefault(key, []).append(i)
+        return i
+
+
+def select(names, hashes, threshold):
+    # Walks frames in time order and keeps one that has no kept frame within threshold bits
+    index = HashIndex(threshold)
+    kept = []
+    for name in sorted(names, key=frame_key):
+        if index.nearest(hashes[name]) is None:
+            index.add(hashes[name])
+            kept.append(name)
+    return kept
+
+
+def split(kept, val_fraction, block):
+    # Neighbouring frames still look alike after dedup, so val gets whole blocks of consecutive
+    # frames of a video rather than single frames that have a near twin in train
+    blocks = []
+    for name in kept:
+        video = frame_key(name)[0]
+        if not blocks or len(blocks[-1]) == block or frame_key(blocks[-1][0])[0] != video:
+            blocks.append([])
+        blocks[-1].append(name)
+
+    train, val = [], []
+    period = max(2, round(1 / val_fraction)) if val_fraction > 0 else 0
+    for i, names in enumerate(blocks):
+        (val if period and i % period == period - 1 else train).extend(names)
+    # Too few frames for a whole block - val gets the last ones
+    if period and not val and len(kept) > 1:
+        count = max(1, round(val_fraction * len(kept)))
+        train, val = kept[:-count], kept[-count:]
+    return train, val
+
+
+def link(src, dst):
+    # Hard links keep the output free on disk - copies across filesystems
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def write_split(names, image_dir, label_dir, out, subset):
+    os.makedirs(os.path.join(out, "images", subset))
+    os.makedirs(os.path.join(out, "labels", subset))
+    labels = 0
+    for name in names:
+        link(os.path.join(image_dir, name), os.path.join(out, "images", subset, name))
+        label = os.path.splitext(name)[0] + ".txt"
+        if label_dir and os.path.exists(os.path.join(label_dir, label)):
+            link(os.path.join(label_dir, label), os.path.join(out, "labels", subset, label))
+            labels += 1
+    return labels
+
+
+def dedup(image_dir="auto_dataset/images/train", label_dir="auto_dataset/labels/train", out="auto_dataset_dedup",
+          config="config.yaml", threshold=6, val_fraction=0.2, block=10, workers=8):
+    """Builds a deduplicated train / val dataset in out and returns a report dict
+
+    Frames within threshold bits of an already kept frame (perceptual hash, 64 bits) are dropped.
+    Images and their labels, when there are any, are hard-linked into out/images/{train,val} and
+    out/labels/{train,val}, and out/data.yaml points YOLO at them with config's class names.
+    """
+    start = time.perf_counter()
+    names = sorted(name for name in os.listdir(image_dir) if name.lower().endswith(IMAGE_EXTENSIONS))
+    with ThreadPoolExecutor(workers) as pool:
+        hashes = dict(zip(names, pool.map(hash_image, [os.path.join(image_dir, name) for name in names])))
+    unreadable = [name for name, h in hashes.items() if h is None]
+    names = [name for name in names if hashes[name] is not None]
+
+    kept = select(names, hashes, threshold)
+    train, val = split(kept, val_fraction, block)
+
+    # Rebuilt from scratch, so a rerun with other settings leaves no stale frames behind
+    for subdir in ("images", "labels"):
+        shutil.rmtree(os.path.join(out, subdir), ignore_errors=True)
+    labels = write_split(train, image_dir, label_dir, out, "train")
+    labels += write_split(val, image_dir, label_dir, out, "val")
+
+    with open(config) as f:
+        class_names = yaml.safe_load(f)["names"]
+    with open(os.path.join(out, "data.yaml"), "w") as f:
+        f.write(f"train: {os.path.join(out, 'images', 'train')}\nval: {os.path.join(out, 'images', 'val')}\n\n"
+                f"nc: {len(class_names)}\nnames: {class_names}\n")
+
+    report = {"images": len(names) + len(unreadable), "unreadable": len(unreadable), "kept": len(kept),
+              "dropped": len(names) - len(kept), "shrink": round(1 - len(kept) / len(names), 3) if names else 0.0,
+              "train": len(train), "val": len(val), "labels": labels, "threshold": threshold,
+              "seconds": round(time.perf_counter() - start, 2)}
+    with open(os.path.join(out, "dedup_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", default="auto_dataset/images/train")
+    parser.add_argument("--labels", default="auto_dataset/labels/train", help="linked along when present")
+    parser.add_argument("--out", default="auto_dataset_dedup")
+    parser.add_argument("--config", default="config.yaml", help="dataset config to take the class names from")
+    parser.add_argument("--threshold", type=int, default=6,
+                        help="frames within this many bits (of 64) of a kept frame are duplicates")
+    parser.add_argument("--val-fraction", type=float, default=0.2)
+    parser.add_argument("--block", type=int, default=10, help="consecutive frames that go to the same split")
+    parser.add_argument("--workers", type=int, default=8, help="image decoding threads")
+    args = parser.parse_args()
+    if not 0 <= args.threshold < 64:
+        parser.error("--threshold must be between 0 and 63")
+
+    report = dedup(args.images, args.labels, args.out, args.config, args.threshold, args.val_fraction,
+                   args.block, args.workers)
+    print(f"Kept {report['kept']} of {report['images']} images ({100 * report['shrink']:.1f}% smaller): "
+          f"{report['train']} train, {report['val']} val, {report['labels']} label files "
+          f"in {report['seconds']:.1f} s")
+    print(f"Dataset config saved to {os.path.join(args.out, 'data.yaml')}")
@@ -0,0 +1,239 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+
+
+# Bump when the on-disk layout changes - old entries then simply stop matching
+CACHE_VERSION = 1
+
+# Content hashes of videos and weights, one small file per path/size/mtime stamp
+HASH_DIR = "hashes"
+
+# Half-written entries older than this are left over from a crashed run
+STALE_TMP_SECONDS = 3600
+
+
+def file_hash(path, chunk_size=1 << 20):
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class CachedDetections:
+    """Per-frame detections of one video, memory-mapped from disk"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+
+        # Columns are stored separately - offsets[i]:offsets[i + 1] are the rows of frame i
+        self.xyxy = np.load(os.path.join(path, "xyxy.npy"), mmap_mode="r")
+        self.conf = np.load(os.path.join(path, "conf.npy"), mmap_mode="r")
+        self.cls = np.load(os.path.join(path, "cls.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+
+        self.width = self.meta["width"]
+        self.height = self.meta["height"]
+        self.fps = self.meta["fps"]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        # Same (x1, y1, x2, y2, conf, cls) rows as boxes.data
+        a, b = self.offsets[i], self.offsets[i + 1]
+        return np.column_stack([self.xyxy[a:b], self.conf[a:b], self.cls[a:b]])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class DetectionRecorder:
+    """Collects boxes.data per frame and writes them as one cache entry"""
+
+    def __init__(self, cache, key, meta):
+        self.cache = cache
+        self.key = key
+        self.meta = meta
+        self.frames = []
+
+    def add(self, data):
+        self.frames.append(np.asarray(data, dtype=np.float32).reshape(-1, 6))
+
+    def commit(self):
+        data = np.concatenate(self.frames) if self.frames else np.zeros((0, 6), dtype=np.float32)
+        offsets = np.zeros(len(self.frames) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(d) for d in self.frames])
+
+        # Write next to the final location and rename, so a crash never leaves a half entry
+        final = self.cache.entry_path(self.key)
+        tmp = f"{final}.tmp-{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        np.save(os.path.join(tmp, "xyxy.npy"), data[:, :4])
+        np.save(os.path.join(tmp, "conf.npy"), data[:, 4])
+        np.save(os.path.join(tmp, "cls.npy"), data[:, 5].astype(np.uint8))
+        np.save(os.path.join(tmp, "offsets.npy"), offsets)
+
+        meta = dict(self.meta, version=CACHE_VERSION, frames=len(self.frames), created=time.time())
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        # An entry without meta.json is a leftover and gets replaced. A complete one was committed by
+        # another process working on the same video - it holds the same detections, so ours is dropped
+        if not os.path.exists(os.path.join(final, "meta.json")):
+            shutil.rmtree(final, ignore_errors=True)
+        try:
+            os.replace(tmp, final)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.cache.touch(self.key)
+        self.cache.evict(keep=self.key)
+
+
+class DetectionCache:
+    """Size-bounded on-disk cache of raw YOLO detections, keyed by video and weights content
+
+    Entries also depend on the backend and the model input size, since exports and other input
+    sizes give slightly different boxes. Several processes can share one root.
+    """
+
+    def __init__(self, root="cache/detections", max_bytes=2 * 1024 ** 3):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, HASH_DIR), exist_ok=True)
+
+    def key(self, video_path, weights_path, backend="torch", imgsz=640):
+        raw = (f"{CACHE_VERSION}:{self.content_hash(video_path)}:{self.content_hash(weights_path)}:"
+               f"{backend}:{imgsz}")
+        return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+    def content_hash(self, path):
+        # Hashing a multi-GB recording is slow, so remember hashes by path, size and mtime. Each
+        # stamp has its own file, written under a unique name and renamed into place, so processes
+        # sharing the cache never overwrite each other's hashes
+        st = os.stat(path)
+        stamp = f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+        hash_path = os.path.join(self.root, HASH_DIR, hashlib.sha1(stamp.encode()).hexdigest())
+        try:
+            with open(hash_path) as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+
+        digest = file_hash(path)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(hash_path), prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            f.write(digest)
+        os.replace(tmp, hash_path)
+        return digest
+
+    def entry_path(self, key):
+        return os.path.join(self.root, key)
+
+    def load(self, key):
+        path = self.entry_path(key)
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+
+        # Another process may evict the entry at any point - that's a miss like any other
+        try:
+            with open(meta_path) as f:
+                if json.load(f).get("version") != CACHE_VERSION:
+                    self.invalidate(key)
+                    return None
+
+            self.touch(key)
+            return CachedDetections(path)
+        except FileNotFoundError:
+            return None
+
+    def recorder(self, key, **meta):
+        return DetectionRecorder(self, key, meta)
+
+    def touch(self, key):
+        # Entry mtime doubles as last-used time for eviction
+        try:
+            os.utime(self.entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def invalidate(self, key):
+        shutil.rmtree(self.entry_path(key), ignore_errors=True)
+
+    def clear(self):
+        for key, _, _ in self.entries():
+            self.invalidate(key)
+        shutil.rmtree(os.path.join(self.root, HASH_DIR), ignore_errors=True)
+        os.makedirs(os.path.join(self.root, HASH_DIR), exist_ok=True)
+
+    def entries(self):
+        # (key, bytes, last used) of every complete entry
+        entries = []
+        for name in os.listdir(self.root):
+            path = self.entry_path(name)
+            if not os.path.isdir(path) or ".tmp-" in name or name == HASH_DIR:
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                entries.append((name, size, os.path.getmtime(path)))
+            except FileNotFoundError:
+                # Evicted by another process while we looked
+                continue
+        return entries
+
+    def remove_stale_tmp(self):
+        # Entries a crashed run never finished - recent ones may still be written by another process
+        cutoff = time.time() - STALE_TMP_SECONDS
+        for name in os.listdir(self.root):
+            path = self.entry_path(name)
+            try:
+                if ".tmp-" in name and os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                continue
+
+    def evict(self, keep=None):
+        # Drop least recently used entries until the cache fits in max_bytes
+        self.remove_stale_tmp()
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.invalidate(key)
+            total -= size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default="cache/detections")
+    parser.add_argument("--max-mb", type=int, default=2048)
+    parser.add_argument("--clear", action="store_true", help="remove every entry")
+    args = parser.parse_args()
+
+    cache = DetectionCache(args.root, args.max_mb * 1024 ** 2)
+    if args.clear:
+        cache.clear()
+    else:
+        cache.evict()
+
+    for key, size, used in sorted(cache.entries(), key=lambda e: -e[2]):
+        with open(os.path.join(cache.entry_path(key), "meta.json")) as f:
+            meta = json.load(f)
+        print(f"{key}  {size / 1024 ** 2:8.1f} MB  {meta['frames']:>7} frames  "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(used))}  {meta['video']}")
@@ -1,30 +1,188 @@
-import cv2
+import argparse
+import math
 import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+import cv2
+import numpy as np
+
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv")
+
+
+def find_videos(paths):
+    # Video files, and the videos inside any directories
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            videos += sorted(os.path.join(path, name) for name in os.listdir(path)
+                             if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    return videos
+
+
+def frame_name(video, index):
+    # Prefixed with the video's name so frames of several videos can share a directory
+    name = os.path.splitext(os.path.basename(video))[0]
+    return f"{name}_frame_{index}.jpg"
+
+
+def candidates(fps, stride, seconds):
+    # Indices of the frames worth looking at - every stride-th frame, or the first frame of every
+    # `seconds` long window
+    index = 0
+    window = 0
+    while True:
+        yield index
+        if seconds:
+            window += 1
+            index = max(index + 1, math.ceil(window * fps * seconds))
+        else:
+            index += stride
+
+
+def thumbnail(frame):
+    return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (64, 36), interpolation=cv2.INTER_AREA)
+
+
+def write_jpeg(path, frame, quality):
+    # Encoded off the decode thread (cv2 releases the GIL) and renamed into place, so a killed run
+    # never leaves a half-written frame that a rerun would skip
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError(f"Could not encode {path}")
+    buf.tofile(path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def extract_video(video, out_dir, stride=5, seconds=None, scene=None, seek=False, writers=4, quality=95,
+                  force=False):
+    """Saves the sampled frames of one video as JPEGs in out_dir and returns a stats dict
+
+    Candidates are every stride-th frame, or one frame per `seconds`. With scene set, a candidate is
+    only saved when its mean absolute difference from the last saved frame (on a 64x36 grayscale
+    thumbnail, 0-255) is above scene. Frames in between are grabbed but never decoded to pixels, or
+    skipped with a seek when seek is set. Frames already in out_dir are not written again.
+    """
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    existing = set(os.listdir(out_dir)) if not force else set()
+
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open {video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    position = 0
+    saved = 0
+    skipped = 0
+    last = None
+    pending = deque()
+
+    with ThreadPoolExecutor(writers) as pool:
+        for index in candidates(fps, stride, seconds):
+            if seek and total and index >= total:
+                break
+
+            name = frame_name(video, index)
+            # Pixels are only needed for frames to save, or to compare scenes
+            needed = scene is not None or name not in existing
+
+            if seek and index != position:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                position = index
+            while position < index and cap.grab():
+                position += 1
+            if position < index:
+                break
+
+            if needed:
+                ret, frame = cap.read()
+            else:
+                ret, frame = cap.grab(), None
+            if not ret:
+                break
+            position += 1
+
+            if scene is not None:
+                thumb = thumbnail(frame)
+                if last is not None and np.abs(thumb.astype(np.int16) - last).mean() <= scene:
+                    continue
+                last = thumb
+
+            if name in existing:
+                skipped += 1
+                continue
+
+            # Bounded so a slow disk can't pile up decoded frames in memory
+            if len(pending) >= 2 * writers:
+                pending.popleft().result()
+            pending.append(pool.submit(write_jpeg, os.path.join(out_dir, name), frame, quality))
+            saved += 1
+
+        for future in pending:
+            future.result()
+
+    cap.release()
+    return {"video": video, "frames": position, "saved": saved, "skipped": skipped,
+            "seconds": time.perf_counter() - start}
+
 
-# Paths
-video_path = "video/basket5.mp4"
-output_dir = "auto_dataset/images/train"
+def _extract_job(job):
+    video, out_dir, options = job
+    try:
+        return extract_video(video, out_dir, **options)
+    except Exception as e:
+        return {"video": video, "error": f"{type(e).__name__}: {e}"}
 
-# Ensure output directory exists
-os.makedirs(output_dir, exist_ok=True)
 
-# Load video
-cap = cv2.VideoCapture(video_path)
-frame_count = 0
+def extract_all(videos, out_dir, workers=1, **options):
+    # Several videos decode in parallel, one per worker process
+    jobs = [(video, out_dir, options) for video in videos]
+    if workers <= 1 or len(jobs) <= 1:
+        yield from map(_extract_job, jobs)
+        return
+    with Pool(min(workers, len(jobs))) as pool:
+        yield from pool.imap_unordered(_extract_job, jobs)
 
-print("Extracting frames...")
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("videos", nargs="*", default=["video/basket5.mp4"], help="video files or directories")
+    parser.add_argument("--out", default="auto_dataset/images/train")
+    parser.add_argument("--stride", type=int, default=5, help="save every Nth frame")
+    parser.add_argument("--every-seconds", type=float, help="save one frame per this many seconds instead")
+    parser.add_argument("--scene", type=float,
+                        help="only save frames that differ from the last saved one by more than this (0-255)")
+    parser.add_argument("--seek", action="store_true", help="seek between frames instead of grabbing through them")
+    parser.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                        help="videos decoded in parallel")
+    parser.add_argument("--writers", type=int, default=4, help="JPEG encoding threads per video")
+    parser.add_argument("--quality", type=int, default=95)
+    parser.add_argument("--force", action="store_true", help="rewrite frames that already exist")
+    args = parser.parse_args()
+    if args.stride < 1:
+        parser.error("--stride must be at least 1")
 
-    # Save every 5th frame
-    if frame_count % 5 == 0:
-        filename = f"frame_{frame_count}.jpg"
-        cv2.imwrite(os.path.join(output_dir, filename), frame)
+    videos = find_videos(args.videos)
+    print(f"Extracting frames from {len(videos)} videos on {args.workers} workers...")
 
-    frame_count += 1
+    start = time.perf_counter()
+    frames = saved = 0
+    for result in extract_all(videos, args.out, args.workers, stride=args.stride, seconds=args.every_seconds,
+                              scene=args.scene, seek=args.seek, writers=args.writers, quality=args.quality,
+                              force=args.force):
+        if "error" in result:
+            print(f"{result['video']}: FAILED {result['error']}")
+            continue
+        frames += result["frames"]
+        saved += result["saved"]
+        print(f"{result['video']}: saved {result['saved']}, {result['skipped']} already there "
+              f"({result['frames']} frames, {result['seconds']:.1f} s)")
 
-cap.release()
-print("Done! Frames saved to auto_dataset/images/train/")
+    elapsed = time.perf_counter() - start
+    print(f"Done! {saved} frames saved to {args.out}/ ({frames / elapsed if elapsed > 0 else 0:.0f} video fps)")
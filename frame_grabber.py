@@ -0,0 +1,86 @@
+import collections
+import os
+import threading
+import time
+import cv2
+
+
+class FrameGrabber:
+    """Reads a live source on its own thread so the detector always gets fresh frames
+
+    Every frame is stamped with its source index and capture time. get() hands out frames in
+    order, but drops the ones that have waited longer than max_latency seconds - the newest
+    frame is always kept, so max_latency=0 means "freshest frame only". Files are replayed at
+    their own frame rate (realtime) so they can stand in for a camera.
+    """
+
+    def __init__(self, cap, max_latency=0.1, realtime=False, metrics=None, buffer=64):
+        self.cap = cap
+        self.max_latency = max_latency
+        self.realtime = realtime
+        self.metrics = metrics
+        self.frames = collections.deque(maxlen=buffer)
+        self.cond = threading.Condition()
+        self.done = False
+        self.stopped = False
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._grab, name="frame_grabber", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _grab(self):
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        start = time.monotonic()
+        index = 0
+        try:
+            while not self.stopped:
+                if self.realtime:
+                    # Wait until the frame would have come off the camera
+                    delay = start + index / fps - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+
+                with self.cond:
+                    if len(self.frames) == self.frames.maxlen:
+                        self._drop(1)
+                    self.frames.append((index, time.monotonic(), frame))
+                    self.cond.notify()
+                index += 1
+        finally:
+            with self.cond:
+                self.done = True
+                self.cond.notify()
+
+    def _drop(self, count):
+        self.dropped += count
+        if self.metrics is not None:
+            self.metrics.drop(count)
+
+    def get(self):
+        # Next (index, capture time, frame) within the latency budget - None at the end of the stream
+        with self.cond:
+            while not self.frames and not self.done:
+                self.cond.wait()
+            if not self.frames:
+                return None
+
+            now = time.monotonic()
+            while len(self.frames) > 1 and now - self.frames[0][1] > self.max_latency:
+                self.frames.popleft()
+                self._drop(1)
+            return self.frames.popleft()
+
+    def stop(self):
+        self.stopped = True
+        self.thread.join()
+
+
+def is_file(source):
+    # Webcams are given as an index, streams as URLs
+    return isinstance(source, str) and os.path.isfile(source)
@@ -0,0 +1,56 @@
+import queue
+import numpy as np
+
+
+class FramePool:
+    """Recycled frame buffers that the decoder reads into in place
+
+    read() decodes straight into a free buffer (cap.read(buffer) reuses it when the size matches),
+    and release() hands the buffer back once the frame has been shown and encoded. Buffers are
+    only allocated while fewer than `size` frames are in flight, so a run allocates a handful of
+    frames up front instead of one per frame. When all of them are in use, read() waits for one
+    to come back, which also bounds how many frames can pile up.
+    """
+
+    def __init__(self, shape, size):
+        self.shape = shape
+        self.size = size
+        self.buffers = []
+        self.free = queue.Queue()
+        self.reads = 0
+        self.allocated = 0
+
+    def acquire(self, stop=None):
+        if self.free.empty() and len(self.buffers) < self.size:
+            buf = np.empty(self.shape, dtype=np.uint8)
+            self.buffers.append(buf)
+            return buf
+
+        # Pipeline stages pass their stop event so a stopped run doesn't wait forever
+        while True:
+            try:
+                return self.free.get(timeout=0.1)
+            except queue.Empty:
+                if stop is not None and stop.is_set():
+                    return None
+
+    def read(self, cap, stop=None):
+        # (ret, frame) like cap.read(), with the frame in a pooled buffer
+        buf = self.acquire(stop)
+        if buf is None:
+            return False, None
+        ret, frame = cap.read(buf)
+        self.reads += 1
+        if frame is not buf:
+            # End of the video, or a frame of another size that OpenCV had to allocate
+            self.free.put(buf)
+            self.allocated += ret
+        return ret, frame
+
+    def release(self, frame):
+        # Frames that didn't come from the pool are left to the garbage collector
+        if frame is not None and any(frame is buf for buf in self.buffers):
+            self.free.put(frame)
+
+    def report(self):
+        return {"reads": self.reads, "buffers": len(self.buffers), "allocated": self.allocated}
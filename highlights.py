@@ -0,0 +1,201 @@
+import argparse
+import bisect
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from video_writer import VideoWriter
+from annotate import ReplayAnnotator, stitch, concat_videos
+from shot_events import read_events
+
+
+def shot_ranges(events, fps, total_frames, before=2.0, after=1.0, made_only=False):
+    # [start, end] frames of each attempt, up_frame - before to down_frame + after seconds
+    ranges = []
+    for event in events:
+        if made_only and not event["made"]:
+            continue
+        start = max(0, event["up_frame"] - round(before * fps))
+        end = event["down_frame"] + round(after * fps)
+        if total_frames:
+            end = min(end, total_frames - 1)
+        ranges.append((start, end, event))
+    return ranges
+
+
+def keyframe_times(video):
+    # Timestamps of the video's keyframes - only keyframes are decoded, the rest is skipped unread
+    result = subprocess.run(["ffmpeg", "-hide_banner", "-skip_frame", "nokey", "-i", video, "-an", "-vf", "showinfo",
+                             "-f", "null", "-"], capture_output=True, text=True)
+    return sorted(float(t) for t in re.findall(r"pts_time:\s*([-\d.]+)", result.stderr))
+
+
+def snap(start, fps, keyframes):
+    # Stream copy can only start on a keyframe - the clip really starts at the one before start
+    if not keyframes:
+        return start
+    i = bisect.bisect_right(keyframes, start / fps + 0.5 / fps) - 1
+    return round(keyframes[max(i, 0)] * fps)
+
+
+def merge_ranges(ranges, fps, keyframes):
+    # Overlapping ranges become one clip. A copied clip may still start up to one keyframe interval
+    # inside the clip before it - cut_start is the frame it really starts on
+    clips = []
+    for start, end, event in sorted(ranges, key=lambda r: r[0]):
+        if clips and start <= clips[-1]["end"] + 1:
+            clips[-1]["end"] = max(clips[-1]["end"], end)
+            clips[-1]["shots"].append(event)
+        else:
+            clips.append({"start": start, "cut_start": snap(start, fps, keyframes), "end": end, "shots": [event]})
+    return clips
+
+
+def clip_name(video, clip):
+    stem = os.path.splitext(os.path.basename(video))[0]
+    shots = [event["attempts"] for event in clip["shots"]]
+    if len(shots) == 1:
+        return f"{stem}_shot{shots[0]:02d}_{'made' if clip['shots'][0]['made'] else 'miss'}.mp4"
+    return f"{stem}_shots{shots[0]:02d}-{shots[-1]:02d}.mp4"
+
+
+def copy_clip(video, start, end, fps, out_path):
+    # Packets are copied as they are - nothing is decoded or encoded. ffmpeg keeps everything from
+    # the keyframe before -ss, which is start, so seek half a frame in to stay clear of the one before
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-ss", f"{(start + 0.5) / fps:.6f}", "-i", video,
+                    "-t", f"{(end + 0.5 - start) / fps:.6f}", "-c", "copy", "-avoid_negative_ts", "make_zero",
+                    out_path], check=True)
+
+
+def encode_clip(video, start, end, fps, out_path, writer="opencv"):
+    # Without ffmpeg the frames of the range are decoded and written again
+    cap = cv2.VideoCapture(video)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    out = VideoWriter(out_path, fps, size, writer)
+    for _ in range(start, end + 1):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        out.write(frame)
+    cap.release()
+    out.release()
+
+
+def annotate_clips(video, clips, detections, params, paths):
+    # The shot logic is replayed over the stored detections to get its state at each clip's first
+    # frame, then only the clip's frames are decoded, drawn and encoded again
+    cap = cv2.VideoCapture(video)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+
+    bounds = sorted({0} | {clip["start"] for clip in clips}) + [len(detections)]
+    segments = [(a, detections[a:b]) for a, b in zip(bounds, bounds[1:])]
+    _, snapshots = stitch(segments, width, height, params)
+    snapshot_at = {start: snapshot for (start, _), snapshot in zip(segments, snapshots)}
+
+    for clip, path in zip(clips, paths):
+        ReplayAnnotator(video, clip["start"], detections[clip["start"]:clip["end"] + 1], snapshot_at[clip["start"]],
+                        path).run()
+
+
+class Highlights:
+    """Cuts each attempt out of the source video instead of encoding the whole session
+
+    add() is called as the shot logic records each attempt. After the run, cut() takes up_frame -
+    before to down_frame + after seconds of every attempt (overlapping ranges become one clip) and
+    writes a clip per shot plus a reel of all of them. With ffmpeg installed clips are stream
+    copied from the keyframe before their start, so nothing is decoded or encoded. With overlays
+    the clips are drawn like shot_detector_2.py's output, and only their frames are encoded.
+    """
+
+    def __init__(self, out_dir="highlights", before=2.0, after=1.0, made_only=False, overlays=False, reel=True,
+                 workers=4):
+        self.out_dir = out_dir
+        self.before = before
+        self.after = after
+        self.made_only = made_only
+        self.overlays = overlays
+        self.reel = reel
+        self.workers = workers
+        self.events = []
+        # Per-frame boxes for redrawing the overlays - a few hundred bytes a frame
+        self.detections = []
+
+    def add(self, event):
+        self.events.append(event)
+
+    def record(self, data):
+        if self.overlays:
+            self.detections.append(data)
+
+    def cut(self, video, params=None):
+        # Writes the clips, the reel and <video>_highlights.json, and returns that summary
+        start_time = time.perf_counter()
+        cap = cv2.VideoCapture(video)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if self.overlays:
+            # A run stopped early has no boxes past its last frame
+            total_frames = len(self.detections)
+
+        ranges = shot_ranges(self.events, fps, total_frames, self.before, self.after, self.made_only)
+        if not ranges:
+            return {"video": video, "clips": [], "copied": False, "seconds": 0.0}
+
+        # Overlays are drawn on exactly the requested frames, copies start on a keyframe
+        ffmpeg = shutil.which("ffmpeg") is not None
+        copy = ffmpeg and not self.overlays
+        clips = merge_ranges(ranges, fps, keyframe_times(video) if copy else [])
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        paths = [os.path.join(self.out_dir, clip_name(video, clip)) for clip in clips]
+        if self.overlays:
+            annotate_clips(video, clips, self.detections, params, paths)
+        else:
+            # Each clip is its own ffmpeg process (or decoder), so they run side by side
+            cut = copy_clip if copy else encode_clip
+            with ThreadPoolExecutor(self.workers) as pool:
+                list(pool.map(lambda job: cut(video, *job), [(clip["cut_start"], clip["end"], fps, path)
+                                                            for clip, path in zip(clips, paths)]))
+
+        for clip, path in zip(clips, paths):
+            clip.update(path=path, seconds=round((clip["end"] + 1 - clip["cut_start"]) / fps, 2))
+
+        summary = {"video": video, "clips": clips, "copied": copy, "seconds": 0.0}
+        if self.reel and len(paths) > 1:
+            stem = os.path.splitext(os.path.basename(video))[0]
+            summary["reel"] = os.path.join(self.out_dir, f"{stem}_reel.mp4")
+            concat_videos(paths, summary["reel"])
+
+        summary["seconds"] = round(time.perf_counter() - start_time, 2)
+        stem = os.path.splitext(os.path.basename(video))[0]
+        with open(os.path.join(self.out_dir, f"{stem}_highlights.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("video")
+    parser.add_argument("events", help="output of `shot_detector_2.py --headless` for the same video")
+    parser.add_argument("--out", default="highlights")
+    parser.add_argument("--before", type=float, default=2.0, help="seconds kept before the ball goes up")
+    parser.add_argument("--after", type=float, default=1.0, help="seconds kept after it comes down")
+    parser.add_argument("--made-only", action="store_true")
+    parser.add_argument("--no-reel", action="store_true")
+    args = parser.parse_args()
+
+    # Overlays need the run's boxes, so they are only available through shot_detector_2.py --highlights
+    highlights = Highlights(args.out, args.before, args.after, args.made_only, reel=not args.no_reel)
+    for event in read_events(args.events):
+        highlights.add(event)
+    summary = highlights.cut(args.video)
+    print(f"{len(summary['clips'])} clips saved to {args.out}/ in {summary['seconds']:.1f} s"
+          + (f", reel {summary['reel']}" if "reel" in summary else ""))
@@ -0,0 +1,161 @@
+import lap
+import numpy as np
+from utils import X, Y, W, H, CONF
+from shot_state import CLASS_NAMES
+
+
+BALL = CLASS_NAMES.index("Basketball")
+HOOP = CLASS_NAMES.index("Basketball Hoop")
+PERSON = CLASS_NAMES.index("Person")
+
+
+class HoopLock:
+    """Freezes the hoop of a static camera and runs ball detection on a crop around it
+
+    Until the hoop is locked every frame runs full-frame detection. Once the last
+    stable_frames hoop points stay within tolerance (a fraction of the hoop width), the hoop
+    is frozen and only every verify_every-th frame runs on the full frame to check it is still
+    there. The other frames run on the region detect_up and detect_down look at, cropped at
+    native resolution, so the ball is bigger in the model's input than in a downscaled full frame.
+    Players outside the crop are carried over from the last full frame, moved at the speed each
+    one had between the last two full frames, so their tracks and IDs survive until the next one.
+    """
+
+    def __init__(self, stable_frames=15, tolerance=0.15, verify_every=30, max_misses=2,
+                 hoop_conf=0.5, x_factor=4, y_factor=2, person_speed=0.2):
+        self.stable_frames = stable_frames
+        self.tolerance = tolerance
+        self.verify_every = verify_every
+        self.max_misses = max_misses
+        self.hoop_conf = hoop_conf
+        self.x_factor = x_factor
+        self.y_factor = y_factor
+        # Most a player is expected to move per frame, in box widths
+        self.person_speed = person_speed
+
+        # Locked hoop as one (x1, y1, x2, y2, conf, cls) detection row
+        self.locked = None
+        self.misses = 0
+        # Players of the last full frame, its frame number and their centers' motion per frame
+        self.people = np.zeros((0, 6), dtype=np.float32)
+        self.people_frame = 0
+        self.velocity = np.zeros((0, 2))
+        self.crop_frames = 0
+        self.full_frames = 0
+
+    def region(self, frame_shape):
+        # detect_up area above the hoop plus room below it for detect_down and score
+        x1, y1, x2, y2 = self.locked[:4]
+        w, h = x2 - x1, y2 - y1
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        left = int(max(0, cx - (self.x_factor + 1) * w))
+        right = int(min(frame_shape[1], cx + (self.x_factor + 1) * w))
+        top = int(max(0, cy - (self.y_factor + 1) * h))
+        bottom = int(min(frame_shape[0], cy + 3 * h))
+        return left, top, right, bottom
+
+    def track_people(self, people, frame):
+        # Pairs each player with the nearest one of the last full frame for their speed - players
+        # without a partner within person_speed widths per frame stand still
+        gap = max(1, frame - self.people_frame)
+        velocity = np.zeros((len(people), 2))
+        if len(people) > 0 and len(self.people) > 0:
+            centers = (people[:, :2] + people[:, 2:4]) / 2
+            before = (self.people[:, :2] + self.people[:, 2:4]) / 2
+            widths = np.maximum(people[:, 2] - people[:, 0], 1)
+            cost = np.linalg.norm(centers[:, None] - before[None], axis=2) / (widths[:, None] * gap)
+            _, match, _ = lap.lapjv(cost, extend_cost=True, cost_limit=self.person_speed)
+            matched = match >= 0
+            velocity[matched] = (centers[matched] - before[match[matched]]) / gap
+        self.people, self.people_frame, self.velocity = people, frame, velocity
+
+    def carried_people(self, frame):
+        rows = self.people.copy()
+        shift = self.velocity * (frame - self.people_frame)
+        rows[:, [0, 2]] += shift[:, :1]
+        rows[:, [1, 3]] += shift[:, 1:]
+        return rows
+
+    def inside(self, rows, left, top, right, bottom):
+        # Rows whose center lies in the crop
+        cx = (rows[:, 0] + rows[:, 2]) / 2
+        cy = (rows[:, 1] + rows[:, 3]) / 2
+        return (cx >= left) & (cx < right) & (cy >= top) & (cy < bottom)
+
+    def detect(self, model, frames, device, frame_count):
+        # Detections for a batch of frames in full-frame coordinates, plus whether each frame
+        # ran on the full frame
+        full = [self.locked is None or (frame_count + i) % self.verify_every == 0 for i in range(len(frames))]
+        datas = [None] * len(frames)
+
+        full_idx = [i for i, f in enumerate(full) if f]
+        if full_idx:
+            results = model([frames[i] for i in full_idx], stream=True, device=device)
+            for i, r in zip(full_idx, results):
+                datas[i] = r.boxes.data.cpu().numpy()
+
+        crop_idx = [i for i, f in enumerate(full) if not f]
+        if crop_idx:
+            left, top, right, bottom = self.region(frames[0].shape)
+            crops = [frames[i][top:bottom, left:right] for i in crop_idx]
+            results = model(crops, stream=True, device=device)
+            for i, r in zip(crop_idx, results):
+                data = r.boxes.data.cpu().numpy()
+
+                # Balls and players come from the crop - map them back
+                data = data[(data[:, 5] == BALL) | (data[:, 5] == PERSON)].copy()
+                data[:, [0, 2]] += left
+                data[:, [1, 3]] += top
+                datas[i] = data
+
+        # Crop frames get the frozen hoop, and the players outside the crop where the last full
+        # frame's would be by now, so player tracks don't expire between verify frames
+        for i, f in enumerate(full):
+            if f:
+                self.track_people(datas[i][datas[i][:, 5] == PERSON], frame_count + i)
+            else:
+                dtype = datas[i].dtype
+                carried = self.carried_people(frame_count + i)
+                carried = carried[~self.inside(carried, left, top, right, bottom)]
+                datas[i] = np.vstack([datas[i], self.locked[None].astype(dtype), carried.astype(dtype)])
+
+        self.full_frames += len(full_idx)
+        self.crop_frames += len(crop_idx)
+        return list(zip(datas, full))
+
+    def update(self, data, full, hoop_pos):
+        # Called after the frame went through the shot logic
+        if not full:
+            return
+
+        if self.locked is None:
+            self.try_lock(hoop_pos)
+            return
+
+        # Verification frame - the hoop has to be found near the locked one
+        hoops = data[(data[:, 5] == HOOP) & (data[:, 4] > self.hoop_conf)]
+        locked_center = (self.locked[:2] + self.locked[2:4]) / 2
+        width = self.locked[2] - self.locked[0]
+        centers = (hoops[:, :2] + hoops[:, 2:4]) / 2
+        if len(hoops) > 0 and (np.abs(centers - locked_center).max(axis=1) <= self.tolerance * width).any():
+            self.misses = 0
+            return
+
+        self.misses += 1
+        if self.misses >= self.max_misses:
+            self.locked = None
+            self.misses = 0
+
+    def try_lock(self, hoop_pos):
+        if len(hoop_pos) < self.stable_frames:
+            return
+
+        rows = hoop_pos.view()[-self.stable_frames:]
+        width = np.median(rows[:, W])
+        spread = np.ptp(rows[:, [X, Y]], axis=0)
+        if (spread > self.tolerance * width).any():
+            return
+
+        x, y, w, h, conf = np.median(rows[:, [X, Y, W, H, CONF]], axis=0)
+        self.locked = np.array([x - w / 2, y - h / 2, x + w / 2, y + h / 2, conf, HOOP])
+        self.misses = 0
@@ -1,7 +1,12 @@
+import argparse
 from ultralytics import YOLO
 from utils import get_device
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="config.yaml", help="dataset config, e.g. auto_dataset_dedup/data.yaml")
+    parser.add_argument("--epochs", type=int, default=100)
+    args = parser.parse_args()
 
     # 0. There are a lot of requirements to create/use OpenCV projects. I used the following video to get started
     # https://youtu.be/WgPbbWmnXJ8
@@ -24,4 +29,4 @@ if __name__ == "__main__":
     model = YOLO(PRE_TRAINED_MODEL)
 
     # Train the model
-    results = model.train(data='config.yaml', epochs=100, imgsz=640, device=device)
+    results = model.train(data=args.data, epochs=args.epochs, imgsz=640, device=device)
@@ -0,0 +1,212 @@
+import bisect
+import contextlib
+import cProfile
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Histogram bucket upper bounds in seconds, Prometheus style
+BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation, capped at the largest one seen
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {"count": self.count, "mean_ms": round(1000 * self.sum / self.count, 3) if self.count else 0.0,
+                "p50_ms": 1000 * self.quantile(0.5), "p95_ms": 1000 * self.quantile(0.95),
+                "max_ms": round(1000 * self.max, 3)}
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+
+class Metrics:
+    """Per-stage latency histograms, frame rate, queue depths and dropped frames
+
+    Cheap enough to leave on: a timed stage costs two perf_counter calls and a bucket
+    lookup. Snapshots go to a JSON lines file every `interval` seconds and to a Prometheus
+    text endpoint on localhost:port. With profile set, the run is wrapped in cProfile and the
+    stats are dumped there at the end.
+    """
+
+    def __init__(self, log_path=None, interval=10.0, port=None, profile=None):
+        self.stages = {}
+        self.queues = {}
+        self.frames = 0
+        self.dropped = 0
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+        self.interval = interval
+        self.log = open(log_path, "a") if log_path else None
+        self.last_report = self.started
+        self.last_frames = 0
+        self.fps = 0.0
+
+        self.profile_path = profile
+        self.server = None
+        if port is not None:
+            self.serve(port)
+
+    def time(self, stage):
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram()
+            self.stages[stage].observe(seconds)
+
+    def watch_queue(self, name, q):
+        self.queues[name] = q
+
+    def drop(self, count=1):
+        with self.lock:
+            self.dropped += count
+
+    def frame(self):
+        # Called once per finished frame - also writes the periodic JSON line
+        self.frames += 1
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.fps = (self.frames - self.last_frames) / (now - self.last_report)
+            self.last_report = now
+            self.last_frames = self.frames
+            if self.log is not None:
+                self.write(self.snapshot())
+
+    def snapshot(self):
+        with self.lock:
+            stages = {name: h.summary() for name, h in self.stages.items()}
+        return {"time": time.time(), "frames": self.frames, "fps": round(self.fps, 2), "dropped": self.dropped,
+                "stages": stages, "queues": {name: q.qsize() for name, q in self.queues.items()}}
+
+    def write(self, snapshot):
+        self.log.write(json.dumps(snapshot) + "\n")
+        self.log.flush()
+
+    def prometheus(self):
+        lines = ["# TYPE basketshot_stage_seconds histogram"]
+        with self.lock:
+            for name, h in self.stages.items():
+                total = 0
+                for bound, n in zip(BUCKETS + ("+Inf",), h.counts):
+                    total += n
+                    lines.append(f'basketshot_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {total}')
+                lines.append(f'basketshot_stage_seconds_sum{{stage="{name}"}} {h.sum}')
+                lines.append(f'basketshot_stage_seconds_count{{stage="{name}"}} {h.count}')
+
+        lines += ["# TYPE basketshot_frames_total counter", f"basketshot_frames_total {self.frames}",
+                  "# TYPE basketshot_dropped_frames_total counter", f"basketshot_dropped_frames_total {self.dropped}",
+                  "# TYPE basketshot_fps gauge", f"basketshot_fps {self.fps}",
+                  "# TYPE basketshot_queue_depth gauge"]
+        lines += [f'basketshot_queue_depth{{queue="{name}"}} {q.qsize()}' for name, q in self.queues.items()]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+
+    @contextlib.contextmanager
+    def profiled(self):
+        # Wraps the hot loop - load the dump with pstats or snakeviz
+        if self.profile_path is None:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(self.profile_path)
+
+    def close(self):
+        elapsed = time.perf_counter() - self.started
+        self.fps = self.frames / elapsed if elapsed > 0 else 0.0
+        if self.log is not None:
+            self.write(self.snapshot())
+            self.log.close()
+        if self.server is not None:
+            # shutdown() only stops the serve loop - server_close() releases the port
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class NullMetrics:
+    """Stands in when metrics are off - every hook is a no-op"""
+
+    _timer = contextlib.nullcontext()
+
+    def time(self, stage):
+        return self._timer
+
+    def observe(self, stage, seconds):
+        pass
+
+    def watch_queue(self, name, q):
+        pass
+
+    def drop(self, count=1):
+        pass
+
+    def frame(self):
+        pass
+
+    def profiled(self):
+        return contextlib.nullcontext()
+
+    def close(self):
+        pass
@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+from utils import X, Y, W, H
+
+
+class MotionGate:
+    """Skips YOLO on frames where nothing moved and reuses the last detections
+
+    Each frame is shrunk to a small blurred grayscale image and compared with the last frame
+    the model actually ran on. Inference is forced when the changed pixel share passes
+    motion_threshold over the whole frame or zone_threshold in the shot zone (the detect_up
+    area plus the space under the rim), while there is no hoop yet, while a shot is in the
+    air, and at least every max_skip frames.
+    """
+
+    def __init__(self, width=160, pixel_threshold=25, motion_threshold=0.01, zone_threshold=0.002,
+                 max_skip=15, x_factor=4, y_factor=2):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.motion_threshold = motion_threshold
+        self.zone_threshold = zone_threshold
+        self.max_skip = max_skip
+        self.x_factor = x_factor
+        self.y_factor = y_factor
+
+        self.reference = None
+        self.last = None
+        self.since_inference = 0
+        self.frames = 0
+        self.skipped = 0
+
+    def small(self, frame):
+        scale = self.width / frame.shape[1]
+        small = cv2.resize(frame, (self.width, max(1, int(frame.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0), scale
+
+    def zone(self, hoop_pos, scale, shape):
+        # Shot zone of the latest hoop in small-frame pixels
+        x, y, w, h = (hoop_pos[-1, c] * scale for c in (X, Y, W, H))
+        x1 = int(np.clip(x - self.x_factor * w, 0, shape[1]))
+        x2 = int(np.clip(x + self.x_factor * w, 0, shape[1]))
+        y1 = int(np.clip(y - self.y_factor * h, 0, shape[0]))
+        y2 = int(np.clip(y + 2 * h, 0, shape[0]))
+        return slice(y1, y2), slice(x1, x2)
+
+    def needs_inference(self, small, scale, hoop_pos, shot_in_air):
+        if self.reference is None or len(hoop_pos) == 0 or shot_in_air or self.since_inference >= self.max_skip:
+            return True
+
+        moved = cv2.absdiff(small, self.reference) > self.pixel_threshold
+        if moved.mean() > self.motion_threshold:
+            return True
+
+        zone = moved[self.zone(hoop_pos, scale, moved.shape)]
+        return zone.size > 0 and zone.mean() > self.zone_threshold
+
+    def detect(self, infer, frames, hoop_pos, shot_in_air):
+        # Same (boxes.data, ran on the full frame) pairs as infer, which only sees the frames
+        # that need it. Decisions use the shot state at the start of the batch
+        smalls = [self.small(frame) for frame in frames]
+        run = []
+        for i, (small, scale) in enumerate(smalls):
+            # Every frame the model runs on becomes the reference for the frames after it
+            if self.needs_inference(small, scale, hoop_pos, shot_in_air):
+                self.reference = small
+                self.since_inference = 0
+                run.append(i)
+            else:
+                self.since_inference += 1
+
+        results = dict(zip(run, infer([frames[i] for i in run]))) if run else {}
+        detections = []
+        for i in range(len(frames)):
+            if i in results:
+                self.last = results[i][0]
+                detections.append(results[i])
+            else:
+                # Nothing moved since the last inference - carry its boxes forward
+                detections.append((self.last, False))
+
+        self.frames += len(frames)
+        self.skipped += len(frames) - len(run)
+        return detections
+
+    def report(self):
+        return {"frames": self.frames, "inferred": self.frames - self.skipped, "skipped": self.skipped,
+                "skipped_ratio": round(self.skipped / self.frames, 3) if self.frames else 0.0}
@@ -0,0 +1,141 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from multiprocessing import Pool
+import numpy as np
+from detection_cache import DetectionCache
+from shot_state import ShotState, DEFAULT_PARAMS, CLASS_NAMES
+
+
+# Labels file layout:
+# {"videos": [{"video": "input/game1.mp4", "shots": [{"frame": 812, "made": true}, ...]}, ...]}
+# "frame" is roughly when the ball drops below the rim - matched against each attempt's down_frame
+
+# Per-worker detections, loaded once by the pool initializer
+_videos = []
+
+
+def load_videos(labels_path, cache_root, weights, min_conf=0.0, backend="torch"):
+    cache = DetectionCache(cache_root)
+    with open(labels_path) as f:
+        labels = json.load(f)
+
+    videos = []
+    for entry in labels["videos"]:
+        cached = cache.load(cache.key(entry["video"], weights, backend))
+        if cached is None:
+            raise SystemExit(f"No cached detections for {entry['video']} - run a detector with --cache first")
+
+        # Unpack the memory map once so every configuration replays from RAM, dropping people and
+        # boxes no configuration would keep (0.01 margin for the rounded confidences of "basic")
+        frames = []
+        for data in cached:
+            keep = (data[:, 5] != CLASS_NAMES.index("Person")) & (data[:, 4] > min_conf - 0.01)
+            frames.append(np.array(data[keep]))
+        videos.append((entry["video"], frames, cached.height, entry["shots"]))
+    return videos
+
+
+def init_worker(labels_path, cache_root, weights, min_conf, backend):
+    global _videos
+    _videos = load_videos(labels_path, cache_root, weights, min_conf, backend)
+
+
+def match_shots(events, shots, tolerance):
+    # Pairs each labelled shot with the nearest unused attempt within tolerance frames
+    used = set()
+    matched = correct = 0
+    for shot in sorted(shots, key=lambda s: s["frame"]):
+        best = None
+        for i, event in enumerate(events):
+            gap = abs(event["down_frame"] - shot["frame"])
+            if i not in used and gap <= tolerance and (best is None or gap < best[1]):
+                best = (i, gap)
+        if best is not None:
+            used.add(best[0])
+            matched += 1
+            correct += events[best[0]]["made"] == shot["made"]
+    return matched, correct, len(events) - len(used)
+
+
+def evaluate(job):
+    variant, params, tolerance = job
+    labelled = matched = correct = false_attempts = 0
+
+    for _, frames, height, shots in _videos:
+        state = ShotState(variant, params)
+        for data in frames:
+            state.step(data, height)
+
+        m, c, fp = match_shots(state.events, shots, tolerance)
+        labelled += len(shots)
+        matched += m
+        correct += c
+        false_attempts += fp
+
+    # Every labelled shot and every made-up attempt counts against the configuration
+    total = labelled + false_attempts
+    return {
+        "params": params,
+        "accuracy": correct / total if total else 0.0,
+        "attempt_recall": matched / labelled if labelled else 0.0,
+        "correct": correct,
+        "labelled": labelled,
+        "false_attempts": false_attempts,
+    }
+
+
+def parse_grid(specs):
+    # "rim_factor=0.3,0.4,0.5" -> {"rim_factor": [0.3, 0.4, 0.5]}
+    grid = {}
+    for spec in specs:
+        name, values = spec.split("=", 1)
+        if name not in DEFAULT_PARAMS:
+            raise SystemExit(f"Unknown parameter {name} - expected one of {', '.join(DEFAULT_PARAMS)}")
+        grid[name] = [int(float(v)) if float(v).is_integer() else float(v) for v in values.split(",")]
+    return grid
+
+
+def configurations(grid):
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield dict(DEFAULT_PARAMS, **dict(zip(names, values)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("labels", help="ground truth make/miss labels (JSON)")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help=f"values to try, repeatable - parameters: {', '.join(DEFAULT_PARAMS)}")
+    parser.add_argument("--variant", choices=["basic", "extended"], default="extended",
+                        help="shot logic of shot_detector.py (basic) or shot_detector_2.py (extended)")
+    parser.add_argument("--cache", default="cache/detections")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--backend", default="torch", help="backend the detections were cached with")
+    parser.add_argument("--tolerance", type=int, default=30, help="max frames between label and attempt")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--out", default="sweep_results.json")
+    args = parser.parse_args()
+
+    jobs = [(args.variant, params, args.tolerance) for params in configurations(parse_grid(args.grid))]
+    min_conf = min(min(p["ball_conf"], p["ball_near_hoop_conf"], p["hoop_conf"]) for _, p, _ in jobs)
+    print(f"Evaluating {len(jobs)} configurations on {args.workers} workers...")
+
+    start = time.perf_counter()
+    initargs = (args.labels, args.cache, args.weights, min_conf, args.backend)
+    with Pool(args.workers, initializer=init_worker, initargs=initargs) as pool:
+        results = pool.map(evaluate, jobs, chunksize=max(1, len(jobs) // (args.workers * 4)))
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda r: (-r["accuracy"], -r["attempt_recall"]))
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"Done in {elapsed:.1f} s ({len(jobs) / elapsed:.1f} configs/s), results saved to {args.out}")
+    for r in results[:args.top]:
+        changed = {k: v for k, v in r["params"].items() if v != DEFAULT_PARAMS[k]}
+        print(f"accuracy {r['accuracy']:.3f}  recall {r['attempt_recall']:.3f}  "
+              f"{r['correct']}/{r['labelled']} correct  {r['false_attempts']} false  {changed or 'defaults'}")
@@ -0,0 +1,84 @@
+import lap
+import numpy as np
+
+
+ZONES = ("LEFT", "MIDDLE", "RIGHT")
+
+
+def iou_matrix(a, b):
+    # Pairwise IoU of (x1, y1, x2, y2) boxes
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+class PersonTracker:
+    """SORT-style player tracker - IoU matching by linear assignment, stable IDs, bounded store
+
+    Tracks not matched for max_age frames expire and at most max_tracks are kept (the least
+    recently seen go first), so memory stays flat however long the session runs. Each track
+    keeps an exponential moving average of its center x, and its LEFT / MIDDLE / RIGHT zone
+    comes from that, so a player standing on a zone border doesn't flicker between labels.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=30, max_tracks=32, smoothing=0.3):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.max_tracks = max_tracks
+        self.smoothing = smoothing
+
+        # Track columns, one row per live track
+        self.ids = np.zeros(0, dtype=int)
+        self.boxes = np.zeros((0, 4))
+        self.smooth_x = np.zeros(0)
+        self.last_seen = np.zeros(0, dtype=int)
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self.ids)
+
+    def update(self, boxes, frame_count, frame_width):
+        # boxes: (N, 4) person boxes of this frame. Returns (track id, zone) per box, in order
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        track_of = np.full(len(boxes), -1)
+
+        if len(boxes) > 0 and len(self.ids) > 0:
+            cost = 1 - iou_matrix(boxes, self.boxes)
+            _, track_of, _ = lap.lapjv(cost, extend_cost=True, cost_limit=1 - self.iou_threshold)
+
+        matched = track_of >= 0
+        rows = track_of[matched]
+        centers = (boxes[:, 0] + boxes[:, 2]) / 2
+        self.boxes[rows] = boxes[matched]
+        self.smooth_x[rows] += self.smoothing * (centers[matched] - self.smooth_x[rows])
+        self.last_seen[rows] = frame_count
+
+        # Unmatched boxes start new tracks
+        new = np.flatnonzero(~matched)
+        track_of[new] = len(self.ids) + np.arange(len(new))
+        self.ids = np.concatenate([self.ids, self.next_id + np.arange(len(new))])
+        self.boxes = np.vstack([self.boxes, boxes[new]])
+        self.smooth_x = np.concatenate([self.smooth_x, centers[new]])
+        self.last_seen = np.concatenate([self.last_seen, np.full(len(new), frame_count)])
+        self.next_id += len(new)
+
+        zones = np.minimum((3 * self.smooth_x[track_of] / frame_width).astype(int), 2)
+        result = [(int(self.ids[t]), ZONES[z]) for t, z in zip(track_of, zones)]
+
+        self.expire(frame_count)
+        return result
+
+    def expire(self, frame_count):
+        keep = np.flatnonzero(frame_count - self.last_seen <= self.max_age)
+        # Over the cap, the least recently seen go first
+        keep = np.sort(keep[np.argsort(-self.last_seen[keep], kind="stable")[:self.max_tracks]])
+
+        self.ids = self.ids[keep]
+        self.boxes = self.boxes[keep]
+        self.smooth_x = self.smooth_x[keep]
+        self.last_seen = self.last_seen[keep]
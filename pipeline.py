@@ -0,0 +1,107 @@
+import queue
+import threading
+from metrics import NullMetrics
+
+
+# Marks the end of the stream between two stages
+END = object()
+
+
+class Pipeline:
+    """Runs stages on their own threads, connected by bounded queues"""
+
+    def __init__(self, queue_size=8, metrics=None):
+        self.queue_size = queue_size
+        self.metrics = metrics or NullMetrics()
+        self.stop = threading.Event()
+        self.threads = []
+        self.errors = []
+
+    def queue(self, name=None):
+        # Bounded so a fast stage blocks instead of buffering the whole video
+        q = queue.Queue(maxsize=self.queue_size)
+        if name is not None:
+            self.metrics.watch_queue(name, q)
+        return q
+
+    def start(self, stage, *args):
+        # Named after the stage so profilers like py-spy show which stage a thread is
+        thread = threading.Thread(target=self._run_stage, args=(stage, args), name=stage.__name__, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _run_stage(self, stage, args):
+        try:
+            stage(self, *args)
+        except BaseException as e:
+            self.errors.append(e)
+            self.stop.set()
+
+    def put(self, q, item):
+        # Wait for room (backpressure) but give up once the pipeline is stopped
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def drain(self, q):
+        # Yield items in order until the upstream stage finishes, or the pipeline
+        # is stopped and nothing is left queued
+        while True:
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                if self.stop.is_set():
+                    return
+                continue
+            if item is END:
+                return
+            yield item
+
+    def close(self):
+        # Stages still flush whatever is already queued before they exit
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
+        if self.errors:
+            raise self.errors[0]
+
+
+def decode_stage(pipe, cap, batch_size, out_q, pool=None):
+    # Reads batches of frames - the last batch may be short. With a FramePool frames are decoded
+    # into its buffers, and whoever consumes them hands them back
+    while not pipe.stop.is_set():
+        frames = []
+        with pipe.metrics.time("decode"):
+            while len(frames) < batch_size:
+                ret, frame = pool.read(cap, pipe.stop) if pool is not None else cap.read()
+                if not ret:
+                    break
+                frames.append(frame)
+
+        if frames and not pipe.put(out_q, frames):
+            return
+        if len(frames) < batch_size:
+            break
+    pipe.put(out_q, END)
+
+
+def infer_stage(pipe, model, device, in_q, out_q):
+    # One model call per batch, then hands frames on one at a time in order
+    for frames in pipe.drain(in_q):
+        with pipe.metrics.time("inference"):
+            results = list(model(frames, stream=True, device=device))
+        for frame, r in zip(frames, results):
+            if not pipe.put(out_q, (frame, r)):
+                return
+    pipe.put(out_q, END)
+
+
+def encode_stage(pipe, writer, in_q, done=None):
+    # A VideoWriter encodes on its own thread and calls done(frame) once the frame is written
+    for frame in pipe.drain(in_q):
+        with pipe.metrics.time("encode"):
+            writer.write(frame, done)
@@ -0,0 +1,320 @@
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import itertools
+import json
+import struct
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
+from shot_events import read_events
+
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+PAGE = b"""<!doctype html>
+<html><head><meta name="viewport" content="width=device-width"><title>Scoreboard</title></head>
+<body style="font-family:sans-serif;text-align:center;background:#111;color:#eee">
+<div id="score" style="font-size:30vw">0 / 0</div><div id="last" style="font-size:6vw">Waiting...</div>
+<script>
+const source = new EventSource("/stream");
+source.addEventListener("stats", e => {
+  const s = JSON.parse(e.data);
+  document.getElementById("score").textContent = s.makes + " / " + s.attempts;
+  document.getElementById("last").textContent = s.overlay || "";
+});
+</script></body></html>
+"""
+
+
+def ws_frame(payload, opcode=0x1):
+    # Server frames are never masked - FIN set, one frame per message
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+class _Message:
+    # Encoded once per protocol, however many clients it goes to
+    def __init__(self, kind, data, seq=None):
+        self.seq = seq
+        body = dict(data, type=kind, time=time.time())
+        if seq is not None:
+            body["seq"] = seq
+        self.json = json.dumps(body)
+        sse = (f"id: {seq}\n" if seq is not None else "") + f"event: {kind}\ndata: {self.json}\n\n"
+        self.sse = sse.encode()
+        self.ws = ws_frame(self.json.encode())
+
+
+class _Client:
+    def __init__(self, writer, protocol):
+        self.writer = writer
+        self.protocol = protocol
+        # Shots are all delivered in order, stats only the newest - a slow client skips the rest
+        self.shots = collections.deque()
+        self.stats = None
+        self.wake = asyncio.Event()
+        self.closing = False
+        self.coalesced = 0
+
+    def write(self, message):
+        self.writer.write(message.ws if self.protocol == "ws" else message.sse)
+
+
+class Scoreboard:
+    """Serves shot events and running stats to WebSocket and server-sent events clients
+
+    The asyncio server runs on its own thread. shot() and update() only hand the message over to
+    it, so the frame loop never waits on a client. Every shot gets a sequence number and is kept,
+    so clients can start from an offset: GET /events?from=N returns them as JSON, /stream (SSE,
+    which also resumes from Last-Event-ID) and /ws (WebSocket) replay them and then stay live.
+    Stats go out at most every `interval` seconds and are coalesced - a client that can't keep up
+    only gets the newest - and a client that falls more than max_backlog shots behind is
+    disconnected to reconnect from its last seq.
+    """
+
+    def __init__(self, port=8765, host="127.0.0.1", interval=0.05, history=10000, max_backlog=1000):
+        self.host = host
+        self.history = collections.deque(maxlen=history)
+        self.max_backlog = max_backlog
+        self.next_seq = 0
+        self.latest = None
+        self.clients = set()
+
+        # update() is called every frame - only the newest stats wait for the loop
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.pending = None
+        self.scheduled = False
+        self.flushed = 0.0
+
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        self.error = None
+        started = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(port, started), name="scoreboard", daemon=True)
+        self.thread.start()
+        started.wait()
+        if self.error is not None:
+            raise self.error
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def _run(self, port, started):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, self.host, port))
+        except OSError as e:
+            self.error = e
+            started.set()
+            return
+        started.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    # Called from the frame loop
+
+    def shot(self, event):
+        self.loop.call_soon_threadsafe(self._add_shot, event)
+        # The stats after a shot go out right away
+        with self.lock:
+            self.flushed = 0.0
+
+    def update(self, stats):
+        now = time.monotonic()
+        with self.lock:
+            self.pending = stats
+            if self.scheduled or now - self.flushed < self.interval:
+                return
+            self.scheduled = True
+            self.flushed = now
+        self.loop.call_soon_threadsafe(self._flush_stats)
+
+    def close(self, timeout=1.0):
+        # Clients get what is already queued, for up to timeout seconds
+        if not self.loop.is_closed() and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(timeout), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    # On the server's loop
+
+    def _add_shot(self, event):
+        message = _Message("shot", event, self.next_seq)
+        self.next_seq += 1
+        self.history.append(message)
+        for client in list(self.clients):
+            client.shots.append(message)
+            if len(client.shots) > self.max_backlog:
+                client.writer.close()
+            else:
+                client.wake.set()
+
+    def _flush_stats(self):
+        with self.lock:
+            stats, self.pending = self.pending, None
+            self.scheduled = False
+        if stats is None:
+            return
+        self.latest = _Message("stats", stats)
+        for client in self.clients:
+            if client.stats is not None:
+                client.coalesced += 1
+            client.stats = self.latest
+            client.wake.set()
+
+    def replay(self, offset):
+        # Shots from seq offset on - or from the oldest one kept
+        if not self.history:
+            return []
+        start = max(0, offset - self.history[0].seq)
+        return list(itertools.islice(self.history, start, None))
+
+    async def _shutdown(self, timeout):
+        # Stats held back by the interval still go out
+        self._flush_stats()
+        for client in self.clients:
+            client.closing = True
+            client.wake.set()
+        deadline = time.monotonic() + timeout
+        while self.clients and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        for client in list(self.clients):
+            client.writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+            headers = {key.strip().lower(): value.strip()
+                       for key, value in (line.split(":", 1) for line in lines[1:] if ":" in line)}
+            url = urlsplit(target)
+            query = parse_qs(url.query)
+
+            # Streams start live unless given an offset, /events starts at the first shot
+            offset = None
+            if "from" in query:
+                offset = int(query["from"][0])
+            elif "last-event-id" in headers:
+                offset = int(headers["last-event-id"]) + 1
+
+            if method != "GET":
+                self._respond(writer, "405 Method Not Allowed", "text/plain", b"GET only\n")
+            elif url.path == "/events":
+                body = "[" + ",".join(m.json for m in self.replay(offset or 0)) + "]"
+                self._respond(writer, "200 OK", "application/json", body.encode())
+            elif url.path == "/stats":
+                body = self.latest.json.encode() if self.latest is not None else b"{}"
+                self._respond(writer, "200 OK", "application/json", body)
+            elif url.path == "/stream":
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                             b"Access-Control-Allow-Origin: *\r\n\r\n")
+                await self._stream(reader, writer, "sse", offset)
+            elif url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest())
+                writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                             b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+                await self._stream(reader, writer, "ws", offset)
+            elif url.path == "/":
+                self._respond(writer, "200 OK", "text/html", PAGE)
+            else:
+                self._respond(writer, "404 Not Found", "text/plain", b"Not found\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, KeyError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, writer, status, content_type, body):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                     f"Access-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n".encode() + body)
+
+    async def _stream(self, reader, writer, protocol, offset):
+        client = _Client(writer, protocol)
+        # Replayed and registered without awaiting in between, so no shot is missed or sent twice
+        client.shots.extend(self.replay(offset if offset is not None else self.next_seq))
+        client.stats = self.latest
+        self.clients.add(client)
+        client.wake.set()
+
+        sender = asyncio.ensure_future(self._send(client))
+        receiver = asyncio.ensure_future(self._receive_ws(reader, client) if protocol == "ws" else reader.read())
+        try:
+            await asyncio.wait([sender, receiver], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.clients.discard(client)
+            for task in (sender, receiver):
+                task.cancel()
+                # A dropped connection ends either task with an error - that's just the client leaving
+                if task.done() and not task.cancelled():
+                    task.exception()
+
+    async def _send(self, client):
+        # Waits on the client's socket only - a slow client holds up nobody else
+        while True:
+            await client.wake.wait()
+            client.wake.clear()
+            while client.shots:
+                client.write(client.shots.popleft())
+                await client.writer.drain()
+            if client.stats is not None:
+                message, client.stats = client.stats, None
+                client.write(message)
+                await client.writer.drain()
+            if client.closing:
+                return
+
+    async def _receive_ws(self, reader, client):
+        # Clients only send pings and the close handshake - anything else is read and ignored
+        while True:
+            head = await reader.readexactly(2)
+            opcode = head[0] & 0x0F
+            n = head[1] & 0x7F
+            if n == 126:
+                n = struct.unpack("!H", await reader.readexactly(2))[0]
+            elif n == 127:
+                n = struct.unpack("!Q", await reader.readexactly(8))[0]
+            mask = await reader.readexactly(4) if head[1] & 0x80 else b"\0\0\0\0"
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(n)))
+            if opcode == 0x8:
+                client.writer.write(ws_frame(payload[:2], 0x8))
+                return
+            if opcode == 0x9:
+                client.writer.write(ws_frame(payload, 0xA))
+
+
+if __name__ == "__main__":
+    # Replays a --headless run's output at its original pace, e.g. to try out a scoreboard page
+    parser = argparse.ArgumentParser()
+    parser.add_argument("events", help="output of `shot_detector_2.py --headless`")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate the shots are replayed at")
+    args = parser.parse_args()
+
+    events = read_events(args.events)
+    board = Scoreboard(args.port, args.host)
+    print(f"Scoreboard on http://{args.host}:{board.port}/ - Ctrl+C to stop")
+    board.update({"frames": 0, "makes": 0, "attempts": 0, "overlay": "Waiting..."})
+    start = time.monotonic()
+    try:
+        for event in events:
+            time.sleep(max(0.0, start + event["frame"] / args.fps - time.monotonic()))
+            board.shot(event)
+            board.update({"frames": event["frame"], "makes": event["makes"], "attempts": event["attempts"],
+                          "overlay": "basket made" if event["made"] else "basket miss"})
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    board.close()
@@ -0,0 +1,150 @@
+import argparse
+import datetime
+import json
+import os
+import shutil
+import time
+from multiprocessing import Pool
+import cv2
+import numpy as np
+import torch
+from utils import get_device
+from detection_cache import DetectionCache
+from backends import Backend, BACKENDS, ensure_exported
+from annotate import ReplayAnnotator, open_at, stitch, concat_videos
+
+
+# One long video is split by frame index. Decoding and inference - nearly all of the work - run
+# per segment on a process pool, then the shot logic runs once over the stitched detections, so
+# up/down state and ball/hoop tracks carry across segment boundaries exactly as in a single run.
+# Annotated output is drawn per segment again, each worker starting from the shot state and
+# player tracks the stitched run had at its segment's first frame.
+
+# Per-worker state, set up once by the pool initializer
+_worker = {}
+
+
+def plan_segments(total_frames, segments):
+    # [start, end) frame ranges - the last one runs to the end of the file, since
+    # CAP_PROP_FRAME_COUNT is only an estimate for some containers
+    size = max(1, -(-total_frames // segments))
+    starts = list(range(0, max(total_frames, 1), size))
+    return [(start, starts[i + 1] if i + 1 < len(starts) else None) for i, start in enumerate(starts)]
+
+
+def init_worker(weights, backend, torch_threads, batch_size):
+    # Several workers share the machine - keep each one's torch thread pool small
+    torch.set_num_threads(torch_threads)
+
+    _worker["model"] = Backend(weights, backend, torch_threads) if weights else None
+    _worker["device"] = get_device()
+    _worker["batch_size"] = batch_size
+
+
+def detect_segment(job):
+    # Runs the model over one segment, returns its per-frame boxes.data rows
+    video, start, end = job
+    cap = open_at(video, start)
+    model = _worker["model"]
+
+    detections = []
+    while end is None or start + len(detections) < end:
+        frames = []
+        while len(frames) < _worker["batch_size"] and (end is None or start + len(detections) + len(frames) < end):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        if not frames:
+            break
+
+        for r in model(frames, stream=True, device=_worker["device"]):
+            detections.append(r.boxes.data.cpu().numpy())
+
+    cap.release()
+    return start, detections
+
+
+def annotate_segment(job):
+    video, start, detections, snapshot, out_path = job
+    return ReplayAnnotator(video, start, detections, snapshot, out_path).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("video")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4))
+    parser.add_argument("--segments", type=int, help="number of segments (default: one per worker)")
+    parser.add_argument("--torch-threads", type=int, default=4, help="inference threads per worker")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--cache", help="detection cache directory - stitched detections are stored there")
+    parser.add_argument("--annotate", action="store_true", help="also write the annotated video")
+    parser.add_argument("--out", default="output")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.video)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    plan = plan_segments(total_frames, args.segments or args.workers)
+    cache = DetectionCache(args.cache) if args.cache else None
+    key = cache.key(args.video, args.weights, args.backend) if cache else None
+    cached = cache.load(key) if cache else None
+
+    start_time = time.perf_counter()
+    if cached is not None:
+        # Cut the stored detections at the same boundaries
+        print(f"Replaying {len(cached)} cached frames...")
+        bounds = [min(start, len(cached)) for start, _ in plan] + [len(cached)]
+        segments = [(a, [np.array(cached[i]) for i in range(a, b)]) for a, b in zip(bounds, bounds[1:])]
+    else:
+        print(f"{total_frames} frames in {len(plan)} segments on {args.workers} workers...")
+        jobs = [(args.video, start, end) for start, end in plan]
+        # Export once up front rather than racing in every worker
+        if args.backend != "torch":
+            ensure_exported(args.weights, args.backend)
+
+        initargs = (args.weights, args.backend, args.torch_threads, args.batch_size)
+        with Pool(args.workers, initializer=init_worker, initargs=initargs) as pool:
+            segments = pool.map(detect_segment, jobs, chunksize=1)
+
+        # A short segment means the seek or the frame count was off - stitching would shift frames
+        for (start, end), (_, detections) in zip(plan, segments):
+            if end is not None and len(detections) != end - start:
+                print(f"Warning: segment at frame {start} decoded {len(detections)} of {end - start} frames")
+
+        if cache is not None:
+            recorder = cache.recorder(key, video=args.video, weights=args.weights, backend=args.backend,
+                                      imgsz=640, width=width, height=height, fps=fps)
+            for _, detections in segments:
+                for data in detections:
+                    recorder.add(data)
+            recorder.commit()
+    detect_time = time.perf_counter() - start_time
+
+    state, snapshots = stitch(segments, width, height)
+    for event in state.events:
+        print(json.dumps(event))
+    print(json.dumps(dict(state.stats(), seconds=round(detect_time, 2),
+                          fps=round(state.frame_count / detect_time, 2) if detect_time > 0 else 0.0)))
+
+    if args.annotate:
+        os.makedirs(args.out, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        parts_dir = os.path.join(args.out, f"segments_{timestamp}")
+        os.makedirs(parts_dir, exist_ok=True)
+
+        jobs = [(args.video, start, detections, snapshot, os.path.join(parts_dir, f"{i:04d}.mp4"))
+                for i, ((start, detections), snapshot) in enumerate(zip(segments, snapshots))]
+        with Pool(args.workers, initializer=init_worker, initargs=(None, None, args.torch_threads, 1)) as pool:
+            parts = pool.map(annotate_segment, jobs, chunksize=1)
+
+        out_path = os.path.join(args.out, f"result_{timestamp}.mp4")
+        concat_videos(parts, out_path)
+        shutil.rmtree(parts_dir)
+        print(f"Annotated video saved to {out_path}")
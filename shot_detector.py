@@ -1,161 +1,28 @@
+import argparse
+from base_detector import BaseShotDetector, add_arguments, run_cli
+from annotate import draw_boxes, draw_hoop
 
-from ultralytics import YOLO
-import cv2
-import cvzone
-import math
-import numpy as np
-from utils import score, detect_down, detect_up, in_hoop_region, clean_hoop_pos, clean_ball_pos, get_device
 
+class ShotDetector(BaseShotDetector):
+    # Run loops, caching and reporting live in BaseShotDetector - this one only draws
+    variant = "basic"
+    # Use video - replace text with your video path, or a webcam index ("0") with live=True
+    default_video = "input/basket.mp4"
 
-class ShotDetector:
-    def __init__(self):
-        # Load the YOLO model created from main.py - change text to your relative path
-        self.overlay_text = "Waiting..."
-        self.model = YOLO("best.pt")
-        
-        self.class_names = ['Basketball', 'Basketball Hoop', 'Person']
-        self.device = get_device()
-        # self.cap = cv2.VideoCapture(0) -to use webcam
-
-        # Use video - replace text with your video path
-        self.cap = cv2.VideoCapture("input/basket.mp4")
-
-        self.ball_pos = [] 
-        self.hoop_pos = []  
-        self.frame_count = 0
-        self.frame = None
-
-        self.makes = 0
-        self.attempts = 0
-
-        # Used to detect shots (upper and lower region)
-        self.up = False
-        self.down = False
-        self.up_frame = 0
-        self.down_frame = 0
-
-        # Used for green and red colors after make/miss
-        self.fade_frames = 20
-        self.fade_counter = 0
-        self.overlay_color = (0, 0, 0)
-
-        self.run()
-
-    def run(self):
-        while True:
-            ret, self.frame = self.cap.read()
-
-            if not ret:
-                # eov or error
-                break
-
-            results = self.model(self.frame, stream=True, device=self.device)
-
-            for r in results:
-                boxes = r.boxes
-                for box in boxes:
-                    # Bounding box
-                    x1, y1, x2, y2 = box.xyxy[0]
-                    x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                    w, h = x2 - x1, y2 - y1
-
-                    # Confidence
-                    conf = math.ceil((box.conf[0] * 100)) / 100
-
-                    # Class Name
-                    cls = int(box.cls[0])
-                    current_class = self.class_names[cls]
-
-                    center = (int(x1 + w / 2), int(y1 + h / 2))
-
-                    # Only create ball points if high confidence or near hoop
-                    if (conf > .3 or (in_hoop_region(center, self.hoop_pos) and conf > 0.15)) and current_class == "Basketball":
-                        self.ball_pos.append((center, self.frame_count, w, h, conf))
-                        cvzone.cornerRect(self.frame, (x1, y1, w, h))
-
-                    # Create hoop points if high confidence
-                    if conf > .5 and current_class == "Basketball Hoop":
-                        self.hoop_pos.append((center, self.frame_count, w, h, conf))
-                        cvzone.cornerRect(self.frame, (x1, y1, w, h))
-
-                    if current_class == "Person" and conf > 0.4:
-                        cvzone.cornerRect(self.frame, (x1, y1, w, h), colorC=(255, 255, 0))
-
-            self.clean_motion()
-            self.shot_detection()
-            self.display_score()
-            self.frame_count += 1
-
-            cv2.imshow('Frame', self.frame)
-
-            # Close if 'q' is clicked
-            if cv2.waitKey(1) & 0xFF == ord('q'):  # higher waitKey slows video down, use 1 for webcam
-                break
-
-        self.cap.release()
-        cv2.destroyAllWindows()
+    def draw_detections(self, x1, y1, w, h, balls, hoops, people):
+        if not self.headless:
+            draw_boxes(self.frame, x1, y1, w, h, balls, hoops, people)
 
     def clean_motion(self):
-        # Clean/track ball motion
-        self.ball_pos = clean_ball_pos(self.ball_pos, self.frame_count)
-
-        # Clean hoop motion and display current hoop center
-        if len(self.hoop_pos) > 1:
-            self.hoop_pos = clean_hoop_pos(self.hoop_pos)
-            cv2.circle(self.frame, self.hoop_pos[-1][0], 2, (128, 128, 0), 2)
-
-    def shot_detection(self):
-        if len(self.hoop_pos) > 0 and len(self.ball_pos) > 0:
-            # Detecting when ball is in 'up' and 'down' area - ball can only be in 'down' area after it is in 'up'
-            if not self.up:
-                self.up = detect_up(self.ball_pos, self.hoop_pos)
-                if self.up:
-                    self.up_frame = self.ball_pos[-1][1]
+        had_hoop = len(self.hoop_pos) > 1
+        super().clean_motion()
 
-            if self.up and not self.down:
-                self.down = detect_down(self.ball_pos, self.hoop_pos)
-                if self.down:
-                    self.down_frame = self.ball_pos[-1][1]
-
-            # If ball goes from 'up' area to 'down' area in that order, increase attempt and reset
-            if self.frame_count % 10 == 0:
-                if self.up and self.down and self.up_frame < self.down_frame:
-                    self.attempts += 1
-                    self.up = False
-                    self.down = False
-
-                    # If it is a make, put a green overlay and display "basket made"
-                    if score(self.ball_pos, self.hoop_pos):
-                        self.makes += 1
-                        self.overlay_color = (0, 255, 0)  # Green
-                        self.overlay_text = "basket made"
-                        # self.fade_counter = self.fade_frames
-
-                    else:
-                        self.overlay_color = (255, 0, 0)  # Red
-                        self.overlay_text = "basket miss"
-                        # self.fade_counter = self.fade_frames
-
-    def display_score(self):
-        # Add text
-        text = str(self.makes) + " / " + str(self.attempts)
-        cv2.putText(self.frame, text, (50, 125), cv2.FONT_HERSHEY_SIMPLEX, 3, (255, 255, 255), 6)
-        cv2.putText(self.frame, text, (50, 125), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 3)
-
-        # Add overlay text for shot result if it exists
-        if hasattr(self, 'overlay_text'):
-            font_scale = 0.5
-            thickness = 2
-            font_scale = 1.2
-            thickness = 2
-            (text_width, text_height), _ = cv2.getTextSize(self.overlay_text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
-            text_x = (self.frame.shape[1] - text_width) // 2  # horizontal center
-            text_y = 50  # top padding
-
-            cv2.putText(self.frame, self.overlay_text, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
-            self.overlay_color, thickness)
+        # Display current hoop center
+        if had_hoop and len(self.hoop_pos) > 0 and not self.headless:
+            draw_hoop(self.frame, self.hoop_pos)
 
 
 if __name__ == "__main__":
-    ShotDetector()
-
+    parser = argparse.ArgumentParser()
+    add_arguments(parser, ShotDetector.default_video)
+    run_cli(ShotDetector, parser, parser.parse_args())
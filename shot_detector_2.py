@@ -1,179 +1,108 @@
-from ultralytics import YOLO
-import cv2
-import cvzone
-import math
-import numpy as np
-from utils import score, detect_down, detect_up, in_hoop_region, clean_ball_pos, get_device
-import os
+import argparse
 import datetime
+import os
+import cv2
+from base_detector import BaseShotDetector, OptionError, add_arguments, run_cli
+from person_tracker import PersonTracker
+from video_writer import VideoWriter, WRITERS
+from highlights import Highlights
+from annotate import draw_boxes, draw_hoop, track_people
 
 
-class ShotDetector:
-    def __init__(self):
-        self.overlay_text = "Waiting..."
-        self.model = YOLO("best.pt")
-        self.class_names = ['Basketball', 'Basketball Hoop', 'Person']
-        self.device = get_device()
+class ShotDetector(BaseShotDetector):
+    """Player track IDs and zones on top of the basic drawing, and the annotated video saved to output/
 
-        self.cap = cv2.VideoCapture("input/basket4.mp4")
+    With highlights set, only a clip per attempt is cut from the source once the run ends.
+    """
 
-        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = int(self.cap.get(cv2.CAP_PROP_FPS))
+    variant = "extended"
+    default_video = "input/basket4.mp4"
+
+    def __init__(self, video_path=None, writer="opencv", codec="libx264", preset="veryfast", crf=23, highlights=None,
+                 **kwargs):
+        self.writer = writer
+        self.codec = codec
+        self.preset = preset
+        self.crf = crf
+        self.highlights = highlights
+
+        # Bounded player tracks with stable IDs - replaces the ever-growing list of person points
+        self.people = PersonTracker()
+        super().__init__(video_path, **kwargs)
+
+    def check_options(self, options):
+        if self.highlights is not None and options["live"]:
+            raise OptionError("highlights cuts clips from the source file and can't be combined with live")
+        super().check_options(options)
+
+    def open_output(self, width, height):
+        # Headless runs write no video, highlights runs only cut the attempts out afterwards
+        if self.headless or self.highlights is not None:
+            return None
 
+        fps = int(self.cap.get(cv2.CAP_PROP_FPS))
         os.makedirs("output", exist_ok=True)
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"output/result_{timestamp}.mp4"
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        self.out = cv2.VideoWriter(filename, fourcc, fps, (width, height))
-
-        self.ball_pos = []
-        self.hoop_pos = []
-        self.person_pos = []
-
-        self.frame_count = 0
-        self.frame = None
-
-        self.makes = 0
-        self.attempts = 0
-        self.up = False
-        self.down = False
-        self.up_frame = 0
-        self.down_frame = 0
-
-        self.fade_frames = 20
-        self.fade_counter = 0
-        self.overlay_color = (0, 0, 0)
-
-        self.run()
-
-    def run(self):
-        while True:
-            ret, self.frame = self.cap.read()
-            if not ret:
-                break
-
-            # best_hoop = None
-            # best_hoop_conf = 0.5  # only keep best hoop per frame
-            valid_hoops = []
-
-
-            results = self.model(self.frame, stream=True, device=self.device)
-            for r in results:
-                boxes = r.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    w, h = x2 - x1, y2 - y1
-                    conf = float(box.conf[0])
-                    cls = int(box.cls[0])
-                    current_class = self.class_names[cls]
-                    center = (int(x1 + w / 2), int(y1 + h / 2))
-
-                    if current_class == "Basketball" and (conf > 0.3 or (in_hoop_region(center, self.hoop_pos) and conf > 0.15)):
-                        self.ball_pos.append((center, self.frame_count, w, h, conf))
-                        cvzone.cornerRect(self.frame, (x1, y1, w, h))
-
-                    elif current_class == "Basketball Hoop":
-                        if conf > 0.5 and center[1] < self.frame.shape[0] * 0.7:
-                            valid_hoops.append((center, self.frame_count, w, h, conf))
-                            cvzone.cornerRect(self.frame, (x1, y1, w, h))
-
-                    elif current_class == "Person" and conf > 0.4:
-                        self.person_pos.append((center, self.frame_count, w, h, conf))
-                        cvzone.cornerRect(self.frame, (x1, y1, w, h), colorC=(255, 255, 0))
-
-                        # Label person as LEFT / MIDDLE / RIGHT
-                        frame_width = self.frame.shape[1]
-                        if center[0] < frame_width / 3:
-                            position = "LEFT"
-                        elif center[0] < 2 * frame_width / 3:
-                            position = "MIDDLE"
-                        else:
-                            position = "RIGHT"
-
-                        cv2.putText(self.frame, position, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                                    0.9, (255, 255, 0), 2)
-
-            if valid_hoops and self.ball_pos:
-                ball_center = self.ball_pos[-1][0]
-                closest_hoop = min(valid_hoops, key=lambda hoop: math.dist(ball_center, hoop[0]))
-                self.hoop_pos.append(closest_hoop)
-            # Add the best hoop of the frame
-            # if best_hoop:
-            #     self.hoop_pos.append(best_hoop)
-            #     cvzone.cornerRect(self.frame, (best_hoop[0][0] - best_hoop[2] // 2,
-            #                                    best_hoop[0][1] - best_hoop[3] // 2,
-            #                                    best_hoop[2], best_hoop[3]))
-
-            self.clean_motion()
-            self.shot_detection()
-            self.display_score()
-            self.frame_count += 1
-
-            self.out.write(self.frame)
-            cv2.imshow('Frame', self.frame)
-
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-
-        self.cap.release()
-        self.out.release()
-        cv2.destroyAllWindows()
+        return VideoWriter(filename, fps, (width, height), self.writer, self.codec, self.preset, self.crf)
+
+    def process_frame(self, frame, data):
+        if self.highlights is not None:
+            self.highlights.record(data)
+        super().process_frame(frame, data)
+
+    def draw_detections(self, x1, y1, w, h, balls, hoops, people):
+        # Players get a track ID and a smoothed LEFT / MIDDLE / RIGHT zone
+        tracks = track_people(self.people, x1, y1, w, h, people, self.frame_count, self.frame_size()[1])
+
+        if not self.headless:
+            draw_boxes(self.frame, x1, y1, w, h, balls, hoops, people, tracks)
 
     def clean_motion(self):
-        self.ball_pos = clean_ball_pos(self.ball_pos, self.frame_count)
-
-        if len(self.hoop_pos) == 0:
-            print(f"[Frame {self.frame_count}] No hoop to draw.")
-            return
-
-        if len(self.hoop_pos) > 1:
-            # Optional cleaning logic can go here if needed
-            pass
-
-        cv2.circle(self.frame, self.hoop_pos[-1][0], 2, (128, 128, 0), 2)
-
-    def shot_detection(self):
-        if len(self.hoop_pos) > 0 and len(self.ball_pos) > 0:
-            if not self.up:
-                self.up = detect_up(self.ball_pos, self.hoop_pos)
-                if self.up:
-                    self.up_frame = self.ball_pos[-1][1]
-
-            if self.up and not self.down:
-                self.down = detect_down(self.ball_pos, self.hoop_pos)
-                if self.down:
-                    self.down_frame = self.ball_pos[-1][1]
-
-            if self.frame_count % 10 == 0:
-                if self.up and self.down and self.up_frame < self.down_frame:
-                    self.attempts += 1
-                    self.up = False
-                    self.down = False
-
-                    if score(self.ball_pos, self.hoop_pos):
-                        self.makes += 1
-                        self.overlay_color = (0, 255, 0)
-                        self.overlay_text = "basket made"
-                    else:
-                        self.overlay_color = (255, 0, 0)
-                        self.overlay_text = "basket miss"
-
-    def display_score(self):
-        text = f"{self.makes} / {self.attempts}"
-        cv2.putText(self.frame, text, (50, 125), cv2.FONT_HERSHEY_SIMPLEX, 3, (255, 255, 255), 6)
-        cv2.putText(self.frame, text, (50, 125), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 3)
-
-        if hasattr(self, 'overlay_text'):
-            font_scale = 1.2
-            thickness = 2
-            (text_width, _), _ = cv2.getTextSize(self.overlay_text, cv2.FONT_HERSHEY_SIMPLEX,
-                                                 font_scale, thickness)
-            text_x = (self.frame.shape[1] - text_width) // 2
-            text_y = 50
-            cv2.putText(self.frame, self.overlay_text, (text_x, text_y),
-                        cv2.FONT_HERSHEY_SIMPLEX, font_scale, self.overlay_color, thickness)
+        super().clean_motion()
+
+        # Nothing to draw before the first hoop is found
+        if not self.headless and len(self.hoop_pos) > 0:
+            draw_hoop(self.frame, self.hoop_pos)
+
+    def record_shot(self, made):
+        event = super().record_shot(made)
+        if self.highlights is not None:
+            self.highlights.add(event)
+        return event
+
+    def report(self):
+        report = super().report()
+        if self.highlights is not None:
+            self.clips = self.highlights.cut(self.video_path, self.params)
+            report["clips"] = [clip["path"] for clip in self.clips["clips"]]
+        return report
+
+    def print_report(self, report):
+        super().print_report(report)
+        if self.highlights is not None:
+            print(f"Saved {len(self.clips['clips'])} highlight clips to {self.highlights.out_dir}/ "
+                  f"in {self.clips['seconds']:.1f} s")
 
 
 if __name__ == "__main__":
-    ShotDetector()
+    parser = argparse.ArgumentParser()
+    add_arguments(parser, ShotDetector.default_video)
+    parser.add_argument("--writer", choices=WRITERS, default="opencv",
+                        help="encode the output video with OpenCV's mp4v or ffmpeg (auto: ffmpeg when on the PATH)")
+    parser.add_argument("--codec", default="libx264", help="ffmpeg video codec, e.g. libx264, libx265, h264_nvenc")
+    parser.add_argument("--preset", default="veryfast", help="ffmpeg encoder preset")
+    parser.add_argument("--crf", type=int, default=23, help="ffmpeg quality, lower is better")
+    parser.add_argument("--highlights", metavar="DIR",
+                        help="instead of the full video, save a clip per attempt and a reel of them in DIR")
+    parser.add_argument("--clip-before", type=float, default=2.0, help="seconds kept before the ball goes up")
+    parser.add_argument("--clip-after", type=float, default=1.0, help="seconds kept after it comes down")
+    parser.add_argument("--made-only", action="store_true", help="only clip made shots")
+    parser.add_argument("--overlays", action="store_true",
+                        help="draw boxes and score on the clips (re-encodes them instead of a stream copy)")
+    parser.add_argument("--no-reel", action="store_true")
+    args = parser.parse_args()
+
+    run_cli(ShotDetector, parser, args, writer=args.writer, codec=args.codec, preset=args.preset, crf=args.crf,
+            highlights=Highlights(args.highlights, args.clip_before, args.clip_after, args.made_only,
+                                  args.overlays, not args.no_reel) if args.highlights else None)
@@ -0,0 +1,8 @@
+import json
+
+
+def read_events(path):
+    # Shot events from a --headless run's JSON lines - the final stats line has no up_frame
+    with open(path) as f:
+        lines = [json.loads(line) for line in f if line.startswith("{")]
+    return [line for line in lines if "up_frame" in line]
@@ -0,0 +1,168 @@
+import numpy as np
+from utils import score, detect_down, detect_up, in_hoop_region_batch, hoop_row, unpack_boxes, clean_hoop_pos, \
+    clean_ball_pos, TrackBuffer, FRAME
+
+
+CLASS_NAMES = ['Basketball', 'Basketball Hoop', 'Person']
+
+# Thresholds of the make/miss logic - param_sweep.py tunes these
+DEFAULT_PARAMS = {
+    "ball_conf": 0.3,            # ball points are kept above this confidence...
+    "ball_near_hoop_conf": 0.15,  # ...or above this one when near the hoop
+    "hoop_conf": 0.5,
+    "person_conf": 0.4,
+    "max_jump": 4,               # ball can't move more than this many diameters within 5 frames
+    "up_x_factor": 4,            # 'up' area is this many hoop widths to each side...
+    "up_y_factor": 2,            # ...and this many hoop heights above the hoop
+    "rim_factor": 0.4,           # make if the ball path crosses within this fraction of the hoop width
+    "rebound_zone": 10,          # plus this many pixels on each side
+    "check_every": 10,           # frames between attempt checks
+}
+
+
+class ShotState:
+    """Ball/hoop tracks and the up/down shot state machine, without any drawing
+
+    variant "basic" follows shot_detector.py: confidences rounded up to 2 decimals, every
+    confident hoop is tracked and cleaned with clean_hoop_pos. "extended" follows
+    shot_detector_2.py: one hoop per frame, the one closest to the ball in the upper 70% of the
+    frame, so it needs the frame height. events keeps every shot of the run, or only the last
+    max_events for sources without an end.
+    """
+
+    def __init__(self, variant="basic", params=None, max_events=None):
+        if variant not in ("basic", "extended"):
+            raise ValueError(f"Unknown variant {variant} - expected basic or extended")
+        self.class_names = CLASS_NAMES
+        self.variant = variant
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        self.max_events = max_events
+        self.reset()
+
+    def reset(self):
+        # Fixed-size tracks - old points are evicted so memory stays flat on long videos
+        self.ball_pos = TrackBuffer(128)
+        self.hoop_pos = TrackBuffer(32)
+        self.frame_count = 0
+
+        self.makes = 0
+        self.attempts = 0
+        self.events = []
+
+        # Used to detect shots (upper and lower region)
+        self.up = False
+        self.down = False
+        self.up_frame = 0
+        self.down_frame = 0
+
+        # check_every window of the last attempt check - live runs can skip frame numbers
+        self.check_window = -1
+
+    def step(self, data, frame_height=None):
+        # Runs one frame of detections through the shot logic, returns the shot event if one fired
+        self.add_detections(data, frame_height)
+        self.clean_motion()
+        event = self.shot_detection()
+        self.frame_count += 1
+        return event
+
+    def add_detections(self, data, frame_height=None):
+        # data is the frame's boxes.data - one (x1, y1, x2, y2, conf, cls) row per box.
+        # Returns the unpacked boxes and the ball/hoop/person masks for drawing
+        p = self.params
+        x1, y1, w, h, centers, conf, cls = unpack_boxes(data)
+
+        balls = cls == self.class_names.index("Basketball")
+        hoops = cls == self.class_names.index("Basketball Hoop")
+        people = cls == self.class_names.index("Person")
+
+        if self.variant == "basic":
+            conf = np.ceil(conf * 100).astype(float) / 100
+            hoops &= conf > p["hoop_conf"]
+
+            # Ball near hoop uses the latest hoop seen before it - hoops earlier in this frame
+            # replace the stored one, same as appending box by box
+            hoop_idx = np.flatnonzero(hoops)
+            hoop_rows = np.vstack([hoop_row(self.hoop_pos),
+                                   np.column_stack([centers[hoop_idx], w[hoop_idx], h[hoop_idx]])])
+            near_hoop = in_hoop_region_batch(centers, hoop_rows[np.searchsorted(hoop_idx, np.arange(len(cls)))])
+        else:
+            if frame_height is None:
+                raise ValueError("the extended variant needs frame_height to ignore hoops low in the frame")
+            conf = conf.astype(float)
+            hoops &= (conf > p["hoop_conf"]) & (centers[:, 1] < frame_height * 0.7)
+            near_hoop = in_hoop_region_batch(centers, hoop_row(self.hoop_pos))
+
+        # Only create ball points if high confidence or near hoop
+        balls &= (conf > p["ball_conf"]) | (near_hoop & (conf > p["ball_near_hoop_conf"]))
+        people &= conf > p["person_conf"]
+
+        for i in np.flatnonzero(balls).tolist():
+            self.ball_pos.add(centers[i, 0], centers[i, 1], self.frame_count, w[i], h[i], conf[i])
+
+        hoop_idx = np.flatnonzero(hoops)
+        if self.variant == "extended":
+            # Keep only the hoop closest to the ball - squared pixel distance avoids the sqrt
+            if len(hoop_idx) > 0 and len(self.ball_pos) > 0:
+                dists = ((centers[hoop_idx] - np.array(self.ball_pos.center())) ** 2).sum(axis=1)
+                hoop_idx = hoop_idx[[np.argmin(dists)]]
+            else:
+                hoop_idx = hoop_idx[:0]
+
+        for i in hoop_idx.tolist():
+            self.hoop_pos.add(centers[i, 0], centers[i, 1], self.frame_count, w[i], h[i], conf[i])
+
+        return x1, y1, w, h, centers, conf, balls, hoops, people
+
+    def clean_motion(self):
+        # Clean/track ball motion
+        self.ball_pos = clean_ball_pos(self.ball_pos, self.frame_count, max_jump=self.params["max_jump"])
+
+        # Clean hoop motion
+        if self.variant == "basic" and len(self.hoop_pos) > 1:
+            self.hoop_pos = clean_hoop_pos(self.hoop_pos)
+
+    def shot_detection(self):
+        p = self.params
+
+        # First frame of each check_every window - same as frame_count % check_every == 0 on
+        # consecutive frames, but still fires when dropped frames skip that exact number
+        window = self.frame_count // p["check_every"]
+        check = window != self.check_window
+        self.check_window = window
+
+        if len(self.hoop_pos) > 0 and len(self.ball_pos) > 0:
+            # Detecting when ball is in 'up' and 'down' area - ball can only be in 'down' area after it is in 'up'
+            if not self.up:
+                self.up = detect_up(self.ball_pos, self.hoop_pos, p["up_x_factor"], p["up_y_factor"])
+                if self.up:
+                    self.up_frame = int(self.ball_pos[-1, FRAME])
+
+            if self.up and not self.down:
+                self.down = detect_down(self.ball_pos, self.hoop_pos)
+                if self.down:
+                    self.down_frame = int(self.ball_pos[-1, FRAME])
+
+            # If ball goes from 'up' area to 'down' area in that order, increase attempt and reset
+            if check:
+                if self.up and self.down and self.up_frame < self.down_frame:
+                    self.attempts += 1
+                    self.up = False
+                    self.down = False
+
+                    made = score(self.ball_pos, self.hoop_pos, p["rim_factor"], p["rebound_zone"])
+                    if made:
+                        self.makes += 1
+                    return self.record_shot(made)
+        return None
+
+    def record_shot(self, made):
+        event = {"frame": self.frame_count, "up_frame": self.up_frame, "down_frame": self.down_frame,
+                 "made": bool(made), "makes": self.makes, "attempts": self.attempts}
+        self.events.append(event)
+        if self.max_events is not None and len(self.events) > self.max_events:
+            del self.events[0]
+        return event
+
+    def stats(self):
+        return {"frames": self.frame_count, "makes": self.makes, "attempts": self.attempts}
@@ -0,0 +1,101 @@
+import argparse
+import itertools
+import json
+import cv2
+from backends import Backend, BACKENDS
+from metrics import NullMetrics
+from shot_state import ShotState
+from utils import get_device
+
+
+def read_frames(source):
+    # Frames of a video file, stream URL or webcam index - any other iterable of frames passes through
+    if not isinstance(source, (str, int)):
+        yield from source
+        return
+
+    cap = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open {source}")
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            yield frame
+    finally:
+        cap.release()
+
+
+class ShotStream:
+    """Shot events from any stream of frames, with the model loaded once
+
+    events() takes a video path, a webcam index or an iterable of BGR frames and yields each shot
+    event as soon as the frame that completes it has been processed. The model stays loaded
+    between calls and reset() only clears the shot state, so one instance can serve any number of
+    videos or cameras. variant and params are those of ShotState, which keeps the last max_events
+    events in state.events - the rest were already yielded.
+    """
+
+    def __init__(self, weights="best.pt", variant="extended", params=None, model=None, backend="torch",
+                 threads=None, batch_size=1, metrics=None, max_events=1000):
+        self.state = ShotState(variant, params, max_events)
+        self.model = model if model is not None else Backend(weights, backend, threads)
+        self.device = get_device()
+        self.batch_size = max(1, batch_size)
+        self.metrics = metrics or NullMetrics()
+
+    def reset(self):
+        self.state.reset()
+
+    def events(self, source, reset=True):
+        # Frames are only read as the caller asks for events - reset=False carries the shot state on
+        # from the previous source, e.g. for a stream that reconnected
+        if reset:
+            self.reset()
+
+        frames = read_frames(source)
+        try:
+            while True:
+                with self.metrics.time("decode"):
+                    batch = list(itertools.islice(frames, self.batch_size))
+                if not batch:
+                    return
+
+                for frame, data in zip(batch, self.detect(batch)):
+                    with self.metrics.time("shot_detection"):
+                        event = self.state.step(data, frame.shape[0])
+                    self.metrics.frame()
+                    if event is not None:
+                        yield event
+        finally:
+            frames.close()
+
+    def detect(self, frames):
+        # boxes.data per frame - one model call per batch
+        with self.metrics.time("inference"):
+            results = list(self.model(frames, stream=True, device=self.device))
+        return [r.boxes.data.cpu().numpy() for r in results]
+
+    def stats(self):
+        return self.state.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("videos", nargs="+", help="video files, stream URLs or webcam indexes")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--threads", type=int)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--variant", choices=["basic", "extended"], default="extended",
+                        help="shot logic of shot_detector.py (basic) or shot_detector_2.py (extended)")
+    args = parser.parse_args()
+
+    # One model for every video - each one starts from a fresh shot state
+    stream = ShotStream(args.weights, args.variant, backend=args.backend, threads=args.threads,
+                        batch_size=args.batch_size)
+    for video in args.videos:
+        for event in stream.events(video):
+            print(json.dumps(dict(event, video=video)))
+        print(json.dumps(dict(stream.stats(), video=video)))
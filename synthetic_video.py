@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+from types import SimpleNamespace
+import cv2
+import numpy as np
+import torch
+from shot_state import CLASS_NAMES
+
+
+BALL, HOOP, PERSON = (CLASS_NAMES.index(name) for name in ("Basketball", "Basketball Hoop", "Person"))
+
+
+def plan_shots(makes, misses, rng):
+    made = [True] * makes + [False] * misses
+    rng.shuffle(made)
+    return made
+
+
+def shot_path(made, width, height, hoop, ball, rng, flight):
+    # Ball centers of one shot, release to floor. The arc peaks above the hoop three quarters into
+    # the flight and reaches rim height at `flight` frames - on the rim for makes, beside it for misses
+    hx, hy, hw, hh = hoop
+    x0 = hx + rng.choice([-1, 1]) * rng.uniform(0.15, 0.35) * width
+    y0 = 0.75 * height
+    tx = hx if made else hx + np.sign(x0 - hx) * rng.uniform(1.2, 1.6) * hw
+    ty = hy - 0.5 * hh
+
+    t_apex = 0.75 * flight
+    ratio = ((flight - t_apex) / t_apex) ** 2
+    y_apex = (ty - ratio * y0) / (1 - ratio)
+    curve = (y0 - y_apex) / t_apex ** 2
+    vx = (tx - x0) / flight
+
+    points = []
+    t = 0
+    while True:
+        y = y_apex + curve * (t - t_apex) ** 2
+        # Through the net makes nearly drop straight down, misses keep their arc
+        x = x0 + vx * t if not made or t < flight else x0 + vx * (flight + 0.2 * (t - flight))
+        if y > 0.9 * height or not -ball < x < width + ball:
+            return points
+        points.append((x, y))
+        t += 1
+
+
+def draw_court(width, height):
+    court = np.full((height, width, 3), (60, 120, 170), np.uint8)
+    court[:int(0.45 * height)] = (90, 90, 90)
+    cv2.line(court, (0, int(0.45 * height)), (width, int(0.45 * height)), (230, 230, 230), 3)
+    cv2.ellipse(court, (width // 2, height), (width // 4, height // 4), 0, 180, 360, (230, 230, 230), 3)
+    return court
+
+
+def draw_hoop(frame, hoop):
+    hx, hy, hw, hh = (int(v) for v in hoop)
+    cv2.rectangle(frame, (hx - hw, hy - 2 * hh), (hx + hw, hy), (245, 245, 245), -1)
+    cv2.rectangle(frame, (hx - hw // 3, hy - hh), (hx + hw // 3, hy - hh // 3), (40, 40, 200), 3)
+    cv2.ellipse(frame, (hx, hy - hh // 2), (hw // 2, hh // 6), 0, 0, 360, (0, 90, 255), 4)
+    for i in range(-2, 3):
+        cv2.line(frame, (hx + i * hw // 5, hy - hh // 2), (hx + i * hw // 8, hy + hh // 2), (250, 250, 250), 1)
+
+
+def draw_player(frame, box, color):
+    x1, y1, x2, y2 = (int(v) for v in box)
+    head = (x2 - x1) // 3
+    cv2.circle(frame, ((x1 + x2) // 2, y1 + head), head, (150, 190, 230), -1)
+    cv2.rectangle(frame, (x1, y1 + 2 * head), (x2, y2), color, -1)
+
+
+def render(path, width=1280, height=720, fps=30, makes=3, misses=3, players=4, seed=0, gap=1.0, ball=0.022):
+    """Writes a synthetic practice video and returns its ground truth
+
+    A fixed hoop, a ball `ball` frame widths across on a parabolic arc per shot (made or missed,
+    in random order, `gap` seconds apart) and `players` distractor players walking across the
+    court. Alongside the video go <name>.json with the shots in param_sweep.py's labels format
+    and <name>.npz with the exact boxes of every frame, laid out like a detection cache entry.
+    """
+    rng = np.random.default_rng(seed)
+    hoop = (width / 2, 0.3 * height, 0.05 * width, 0.05 * width)
+    ball = ball * width
+    flight = int(1.3 * fps)
+
+    # Each shot is its own arc, with a pause before it
+    frames = [None] * int(gap * fps)
+    shots = []
+    for made in plan_shots(makes, misses, rng):
+        path_points = shot_path(made, width, height, hoop, ball, rng, flight)
+        # Ground truth is the first frame under the hoop on the way down, as param_sweep.py expects
+        below = next(i for i, (_, y) in enumerate(path_points) if i > flight and y > hoop[1] + 0.5 * hoop[3])
+        shots.append({"frame": len(frames) + below, "made": made})
+        frames += path_points + [None] * int(gap * fps)
+
+    # Players walk back and forth along the bottom of the court
+    walkers = [(rng.uniform(0, width), rng.uniform(0.6, 0.8) * height, rng.uniform(-4, 4),
+                tuple(int(c) for c in rng.integers(0, 255, 3))) for _ in range(players)]
+    pw, ph = 0.05 * width, 0.25 * height
+
+    court = draw_court(width, height)
+    draw_hoop(court, hoop)
+    hx, hy, hw, hh = hoop
+    hoop_row = [hx - hw / 2, hy - hh / 2, hx + hw / 2, hy + hh / 2, 0.9, HOOP]
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    detections = []
+    for i, center in enumerate(frames):
+        frame = court.copy()
+        rows = [hoop_row]
+        for x, y, vx, color in walkers:
+            x = (x + vx * i) % (2 * width)
+            x = 2 * width - x if x > width else x
+            box = (x - pw / 2, y - ph / 2, x + pw / 2, y + ph / 2)
+            draw_player(frame, box, color)
+            rows.append([*box, 0.8, PERSON])
+        if center is not None:
+            x, y = center
+            cv2.circle(frame, (int(x), int(y)), int(ball / 2), (20, 110, 230), -1)
+            cv2.circle(frame, (int(x), int(y)), int(ball / 2), (0, 0, 0), 1)
+            rows.append([x - ball / 2, y - ball / 2, x + ball / 2, y + ball / 2, 0.9, BALL])
+        out.write(frame)
+        detections.append(np.array(rows, dtype=np.float32))
+    out.release()
+
+    stem = os.path.splitext(path)[0]
+    labels = {"videos": [{"video": path, "shots": shots}]}
+    with open(stem + ".json", "w") as f:
+        json.dump(labels, f, indent=2)
+    offsets = np.zeros(len(detections) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(d) for d in detections])
+    np.savez(stem + ".npz", data=np.concatenate(detections), offsets=offsets)
+    return labels
+
+
+def load_detections(path):
+    # Per-frame boxes.data rows that render() saved next to the video
+    stored = np.load(os.path.splitext(path)[0] + ".npz")
+    data, offsets = stored["data"], stored["offsets"]
+    return [data[a:b] for a, b in zip(offsets, offsets[1:])]
+
+
+class OracleModel:
+    """Stands in for YOLO on a synthetic video - returns the exact boxes of each frame in order
+
+    Lets the benchmarks time everything but the network without weights or a GPU. Frames must
+    come in order and each instance serves one pass over the video. Given the video's width,
+    frames shrunk before the call get their boxes in the shrunk frame's pixels, and balls
+    narrower than min_ball pixels in the model's imgsz input are missed, like a real model does.
+    """
+
+    def __init__(self, detections, width=None, min_ball=0):
+        self.detections = detections
+        self.width = width
+        self.min_ball = min_ball
+        self.index = 0
+
+    def __call__(self, frames, stream=True, device=None, imgsz=640):
+        results = []
+        for frame in frames:
+            data = self.detections[self.index]
+            if self.width:
+                data = data.copy()
+                data[:, :4] *= frame.shape[1] / self.width
+                # The letterbox scales the frame's long side to imgsz
+                width = (data[:, 2] - data[:, 0]) * imgsz / max(frame.shape[:2])
+                data = data[(data[:, 5] != BALL) | (width >= self.min_ball)]
+            data = torch.from_numpy(data)
+            results.append(SimpleNamespace(boxes=SimpleNamespace(data=data)))
+            self.index += 1
+        return iter(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("out", help="video path, e.g. bench/synthetic.mp4")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--makes", type=int, default=3)
+    parser.add_argument("--misses", type=int, default=3)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--gap", type=float, default=1.0, help="seconds between shots")
+    parser.add_argument("--ball", type=float, default=0.022, help="ball diameter as a share of the width")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    labels = render(args.out, args.width, args.height, args.fps, args.makes, args.misses, args.players,
+                    args.seed, args.gap, args.ball)
+    shots = labels["videos"][0]["shots"]
+    print(f"Saved {args.out} with {sum(s['made'] for s in shots)} makes / {len(shots)} shots")
@@ -0,0 +1,58 @@
+import os
+import numpy as np
+import pytest
+from backends import Backend, ensure_exported, export_path, match_boxes
+
+
+def boxes(*rows):
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+REFERENCE = boxes([100, 100, 130, 130, 0.8, 0], [600, 180, 670, 250, 0.9, 1], [200, 400, 260, 560, 0.7, 2])
+
+
+def test_match_ignores_order_and_small_differences():
+    shifted = REFERENCE[::-1].copy()
+    shifted[:, :4] += 1.5
+    shifted[:, 4] -= 0.01
+    assert match_boxes(REFERENCE, shifted)
+    assert match_boxes(boxes(), boxes())
+
+
+@pytest.mark.parametrize("change", ["box", "conf", "class", "missing"])
+def test_match_rejects(change):
+    other = REFERENCE.copy()
+    if change == "box":
+        other[0, 2] += 3
+    elif change == "conf":
+        other[1, 4] -= 0.05
+    elif change == "class":
+        other[2, 5] = 0
+    else:
+        other = other[:2]
+    assert not match_boxes(REFERENCE, other)
+
+
+def test_match_pairs_each_box_once():
+    # Both balls of a are near b's first one - the second has to match b's other ball, which is far off
+    a = boxes([100, 100, 130, 130, 0.8, 0], [101, 100, 131, 130, 0.8, 0])
+    b = boxes([100, 100, 130, 130, 0.8, 0], [400, 100, 430, 130, 0.8, 0])
+    assert not match_boxes(a, b)
+    assert match_boxes(a, boxes([100, 100, 130, 130, 0.8, 0], [102, 100, 132, 130, 0.8, 0]))
+
+
+def test_export_newer_than_the_weights_is_reused(tmp_path):
+    weights = tmp_path / "best.pt"
+    weights.write_bytes(b"weights")
+    path = export_path(str(weights), "onnx")
+    assert path == str(tmp_path / "best.onnx")
+
+    with open(path, "wb") as f:
+        f.write(b"onnx")
+    os.utime(weights, (1000, 1000))
+    assert ensure_exported(str(weights), "onnx") == path
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="tflite"):
+        Backend("best.pt", "tflite")
@@ -0,0 +1,56 @@
+import os
+from multiprocessing import Pool
+import numpy as np
+from batch_processor import result_path
+from detection_cache import DetectionCache, HASH_DIR
+from test_detection_cache import frames, record
+
+
+def test_same_name_gets_its_own_result(tmp_path):
+    a = result_path("out", str(tmp_path / "day1" / "cam1.mp4"))
+    b = result_path("out", str(tmp_path / "day2" / "cam1.mp4"))
+    assert a != b
+    assert a == result_path("out", str(tmp_path / "day1" / "cam1.mp4"))
+
+
+def use_cache(job):
+    # One pool worker: hash the shared videos, record the keys it misses and check every hit, with a budget
+    # small enough that the others keep evicting entries under it
+    root, videos, max_bytes = job
+    cache = DetectionCache(root, max_bytes)
+    hits = 0
+    for _ in range(10):
+        for i, video in enumerate(videos):
+            key = cache.key(video, videos[0])
+            cached = cache.load(key)
+            if cached is None:
+                record(cache, key, frames(20 + i))
+                continue
+            for stored, original in zip(cached, frames(20 + i)):
+                np.testing.assert_array_equal(stored, original)
+            hits += 1
+    return hits
+
+
+def test_workers_share_one_cache(tmp_path):
+    videos = []
+    for i in range(4):
+        path = tmp_path / f"v{i}.mp4"
+        path.write_bytes(bytes([i]) * 1000)
+        videos.append(str(path))
+
+    root = str(tmp_path / "cache")
+    cache = DetectionCache(root)
+    record(cache, "probe", frames(21))
+    max_bytes = int(max(s for _, s, _ in cache.entries()) * 2.5)
+    cache.clear()
+
+    with Pool(4) as pool:
+        hits = pool.map(use_cache, [(root, videos, max_bytes)] * 4)
+    assert sum(hits) > 0
+
+    # Whatever survived is complete, and each video got one hash file
+    for key, _, _ in cache.entries():
+        assert cache.load(key) is not None
+    assert len(os.listdir(os.path.join(root, HASH_DIR))) == len(videos)
+    assert not any(".tmp-" in name for name in os.listdir(root))
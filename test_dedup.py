@@ -0,0 +1,68 @@
+import random
+import pytest
+from dedup import HashIndex, frame_key, select, split
+
+
+def flip(h, bits):
+    for bit in bits:
+        h ^= 1 << bit
+    return h
+
+
+@pytest.mark.parametrize("threshold", [0, 3, 6, 10])
+def test_nearest_matches_brute_force(threshold):
+    rng = random.Random(threshold)
+    stored = [rng.getrandbits(64) for _ in range(200)]
+    # Near twins of stored hashes at every distance around the threshold, and unrelated hashes
+    queries = [flip(rng.choice(stored), rng.sample(range(64), rng.randint(0, threshold + 2))) for _ in range(300)]
+    queries += [rng.getrandbits(64) for _ in range(100)]
+
+    index = HashIndex(threshold)
+    for h in stored:
+        index.add(h)
+    assert len(index) == len(stored)
+
+    for q in queries:
+        distances = [bin(q ^ h).count("1") for h in stored]
+        best = min(distances)
+        found = index.nearest(q)
+        if best > threshold:
+            assert found is None
+        else:
+            assert found is not None and found[1] == best and distances[found[0]] == best
+
+
+def test_select_keeps_the_first_of_near_duplicates():
+    base = random.Random(0).getrandbits(64)
+    other = base ^ ((1 << 64) - 1)
+    hashes = {"cam_frame_0.jpg": base, "cam_frame_5.jpg": flip(base, [1, 2]), "cam_frame_10.jpg": other,
+              "cam_frame_15.jpg": flip(other, [3])}
+
+    assert select(list(hashes)[::-1], hashes, 6) == ["cam_frame_0.jpg", "cam_frame_10.jpg"]
+    assert select(hashes, hashes, 0) == ["cam_frame_0.jpg", "cam_frame_5.jpg", "cam_frame_10.jpg",
+                                          "cam_frame_15.jpg"]
+
+
+def test_frame_key_sorts_in_time_order():
+    names = ["b_frame_2.jpg", "a_frame_10.jpg", "a_frame_9.jpg", "frame_3.jpg"]
+    assert sorted(names, key=frame_key) == ["frame_3.jpg", "a_frame_9.jpg", "a_frame_10.jpg", "b_frame_2.jpg"]
+
+
+def test_split_gives_val_whole_blocks():
+    kept = [f"a_frame_{i}.jpg" for i in range(25)] + [f"b_frame_{i}.jpg" for i in range(12)]
+    train, val = split(kept, 0.2, 5)
+
+    assert sorted(train + val) == sorted(kept)
+    assert not set(train) & set(val)
+    # Blocks are up to 5 consecutive frames of one video, every 5th block goes to val
+    assert val == [f"a_frame_{i}.jpg" for i in range(20, 25)]
+    # Every other block - b's frames start blocks of their own
+    _, val = split(kept, 0.5, 5)
+    assert val == ([f"a_frame_{i}.jpg" for i in (*range(5, 10), *range(15, 20))]
+                   + [f"b_frame_{i}.jpg" for i in (*range(5), 10, 11)])
+
+
+def test_split_too_few_frames_for_a_block():
+    kept = [f"frame_{i}.jpg" for i in range(4)]
+    assert split(kept, 0.25, 10) == (kept[:3], kept[3:])
+    assert split(kept, 0, 10) == (kept, [])
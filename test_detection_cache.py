@@ -0,0 +1,91 @@
+import json
+import os
+import time
+import numpy as np
+from detection_cache import DetectionCache, STALE_TMP_SECONDS
+
+
+def frames(count, rows=3):
+    rng = np.random.default_rng(count)
+    return [np.column_stack([rng.uniform(0, 600, (rows, 4)), rng.uniform(0, 1, rows), rng.integers(0, 3, rows)])
+            .astype(np.float32) for _ in range(count)]
+
+
+def record(cache, key, data):
+    recorder = cache.recorder(key, video="v.mp4", weights="best.pt", width=640, height=360, fps=30.0)
+    for d in data:
+        recorder.add(d)
+    recorder.commit()
+
+
+def write_files(tmp_path):
+    video, weights = tmp_path / "v.mp4", tmp_path / "best.pt"
+    video.write_bytes(b"video")
+    weights.write_bytes(b"weights")
+    return str(video), str(weights)
+
+
+def test_round_trip(tmp_path):
+    cache = DetectionCache(str(tmp_path / "cache"))
+    data = frames(5) + [np.zeros((0, 6), dtype=np.float32)]
+    record(cache, "k", data)
+
+    cached = cache.load("k")
+    assert len(cached) == len(data)
+    assert (cached.width, cached.height) == (640, 360)
+    for stored, original in zip(cached, data):
+        np.testing.assert_array_equal(stored, original)
+
+
+def test_key_follows_content_backend_and_imgsz(tmp_path):
+    video, weights = write_files(tmp_path)
+    cache = DetectionCache(str(tmp_path / "cache"))
+    key = cache.key(video, weights)
+
+    assert cache.key(video, weights) == key
+    assert cache.key(video, weights, "onnx") != key
+    assert cache.key(video, weights, "torch", 1280) != key
+
+    # Same size, new content and mtime
+    with open(video, "wb") as f:
+        f.write(b"VIDEO")
+    os.utime(video, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    assert cache.key(video, weights) != key
+
+
+def test_version_mismatch_invalidates(tmp_path):
+    cache = DetectionCache(str(tmp_path / "cache"))
+    record(cache, "k", frames(2))
+    meta_path = os.path.join(cache.entry_path("k"), "meta.json")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    with open(meta_path, "w") as f:
+        json.dump(dict(meta, version=-1), f)
+
+    assert cache.load("k") is None
+    assert not os.path.exists(cache.entry_path("k"))
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DetectionCache(str(tmp_path / "cache"))
+    record(cache, "a", frames(50))
+    record(cache, "b", frames(50))
+    size = max(s for _, s, _ in cache.entries())
+    os.utime(cache.entry_path("a"), (time.time() - 100, time.time() - 100))
+
+    cache.max_bytes = int(size * 2.5)
+    record(cache, "c", frames(50))
+    assert sorted(k for k, _, _ in cache.entries()) == ["b", "c"]
+
+
+def test_evict_removes_stale_tmp_entries(tmp_path):
+    cache = DetectionCache(str(tmp_path / "cache"))
+    stale, fresh = cache.entry_path("x.tmp-111"), cache.entry_path("y.tmp-222")
+    os.makedirs(stale)
+    os.makedirs(fresh)
+    old = time.time() - STALE_TMP_SECONDS - 60
+    os.utime(stale, (old, old))
+
+    cache.evict()
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
@@ -0,0 +1,73 @@
+import itertools
+import time
+from frame_grabber import FrameGrabber
+from metrics import Metrics
+
+
+class FakeCap:
+    # count=None is a camera that never ends
+    def __init__(self, count=None, fps=100.0):
+        self.indices = itertools.count() if count is None else iter(range(count))
+        self.fps = fps
+
+    def get(self, prop):
+        return self.fps
+
+    def read(self):
+        frame = next(self.indices, None)
+        return frame is not None, frame
+
+
+def drain(grabber):
+    frames = []
+    while (item := grabber.get()) is not None:
+        frames.append(item)
+    return frames
+
+
+def test_keeps_up_without_drops():
+    grabber = FrameGrabber(FakeCap(50), max_latency=60, buffer=64).start()
+    frames = drain(grabber)
+    assert [index for index, _, frame in frames] == list(range(50))
+    assert [frame for _, _, frame in frames] == list(range(50))
+    assert grabber.dropped == 0
+
+
+def test_stale_frames_are_dropped_but_the_newest_is_kept():
+    metrics = Metrics()
+    grabber = FrameGrabber(FakeCap(10), max_latency=0.05, metrics=metrics).start()
+    grabber.thread.join()
+    time.sleep(0.1)
+
+    assert [index for index, _, _ in drain(grabber)] == [9]
+    assert grabber.dropped == 9
+    assert metrics.dropped == 9
+
+
+def test_full_buffer_drops_the_oldest():
+    grabber = FrameGrabber(FakeCap(10), max_latency=60, buffer=4).start()
+    grabber.thread.join()
+
+    assert [index for index, _, _ in drain(grabber)] == [6, 7, 8, 9]
+    assert grabber.dropped == 6
+
+
+def test_realtime_replays_at_the_source_rate():
+    start = time.monotonic()
+    grabber = FrameGrabber(FakeCap(10, fps=100.0), max_latency=60, realtime=True).start()
+    frames = drain(grabber)
+    assert len(frames) == 10
+    assert time.monotonic() - start >= 0.09
+    assert frames[-1][1] - frames[0][1] >= 0.08
+
+
+def test_stop_ends_a_live_source():
+    grabber = FrameGrabber(FakeCap(), max_latency=0).start()
+    first = grabber.get()
+    grabber.stop()
+    assert not grabber.thread.is_alive()
+
+    # What's left is at most the newest frame, then the end of the stream
+    rest = drain(grabber)
+    assert len(rest) <= 1
+    assert all(index > first[0] for index, _, _ in rest)
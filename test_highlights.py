@@ -0,0 +1,47 @@
+from highlights import clip_name, merge_ranges, shot_ranges, snap
+
+
+FPS = 30
+
+
+def shot(attempts, up, down, made=True):
+    return {"attempts": attempts, "up_frame": up, "down_frame": down, "made": made}
+
+
+EVENTS = [shot(1, 100, 130), shot(2, 150, 180, made=False), shot(3, 600, 630), shot(4, 900, 925, made=False)]
+
+
+def test_shot_ranges_pad_and_clamp():
+    ranges = shot_ranges([shot(1, 20, 50)] + EVENTS, FPS, 950)
+    assert [(start, end) for start, end, _ in ranges] == [(0, 80), (40, 160), (90, 210), (540, 660), (840, 949)]
+    assert [e["attempts"] for _, _, e in shot_ranges(EVENTS, FPS, 950, made_only=True)] == [1, 3]
+
+
+def test_overlapping_and_touching_ranges_merge():
+    ranges = [(540, 660, EVENTS[2]), (40, 160, EVENTS[0]), (161, 210, EVENTS[1])]
+    clips = merge_ranges(ranges, FPS, [])
+    assert [(c["start"], c["cut_start"], c["end"]) for c in clips] == [(40, 40, 210), (540, 540, 660)]
+    assert [[e["attempts"] for e in c["shots"]] for c in clips] == [[1, 2], [3]]
+
+    # One frame of gap keeps them apart
+    clips = merge_ranges([(40, 160, EVENTS[0]), (162, 210, EVENTS[1])], FPS, [])
+    assert len(clips) == 2
+
+
+def test_contained_range_doesnt_shorten_the_clip():
+    clips = merge_ranges([(40, 400, EVENTS[0]), (100, 200, EVENTS[1])], FPS, [])
+    assert [(c["start"], c["end"]) for c in clips] == [(40, 400)]
+
+
+def test_copied_clips_start_on_the_keyframe_before():
+    keyframes = [0.0, 2.0, 4.0, 6.0]
+    assert snap(90, FPS, keyframes) == 60
+    assert snap(120, FPS, keyframes) == 120
+    assert snap(119, FPS, keyframes) == 60
+    clips = merge_ranges([(90, 200, EVENTS[0])], FPS, keyframes)
+    assert (clips[0]["start"], clips[0]["cut_start"]) == (90, 60)
+
+
+def test_clip_names():
+    assert clip_name("input/game.mp4", {"shots": [EVENTS[1]]}) == "game_shot02_miss.mp4"
+    assert clip_name("input/game.mp4", {"shots": EVENTS[:3]}) == "game_shots01-03.mp4"
@@ -0,0 +1,29 @@
+import urllib.request
+from metrics import Metrics
+
+
+def test_endpoint_and_close_release_the_port():
+    metrics = Metrics(port=0)
+    port = metrics.server.server_address[1]
+    metrics.observe("detect", 0.003)
+    metrics.frame()
+
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        body = response.read().decode()
+    assert 'basketshot_stage_seconds_bucket{stage="detect",le="0.005"} 1' in body
+    assert "basketshot_frames_total 1" in body
+
+    metrics.close()
+    metrics.close()
+    Metrics(port=port).close()
+
+
+def test_summary_quantiles():
+    metrics = Metrics()
+    for seconds in (0.001,) * 19 + (0.3,):
+        metrics.observe("detect", seconds)
+    summary = metrics.snapshot()["stages"]["detect"]
+    assert summary["count"] == 20
+    assert summary["p50_ms"] == 1.0
+    assert summary["p95_ms"] == 1.0
+    assert summary["max_ms"] == 300.0
@@ -0,0 +1,52 @@
+from person_tracker import PersonTracker
+
+
+WIDTH = 1200
+
+
+def box(x, y=300, w=60, h=160):
+    return [x, y, x + w, y + h]
+
+
+def test_ids_follow_players_whatever_the_box_order():
+    tracker = PersonTracker()
+    first = tracker.update([box(100), box(700)], 0, WIDTH)
+    assert [track_id for track_id, _ in first] == [1, 2]
+
+    for frame in range(1, 30):
+        boxes = [box(100 + 4 * frame), box(700 - 4 * frame)]
+        if frame % 2:
+            boxes.reverse()
+        ids = [track_id for track_id, _ in tracker.update(boxes, frame, WIDTH)]
+        assert ids == ([2, 1] if frame % 2 else [1, 2])
+    assert len(tracker) == 2
+
+
+def test_missed_frames_up_to_max_age_keep_the_id():
+    tracker = PersonTracker(max_age=5)
+    tracker.update([box(100)], 0, WIDTH)
+
+    # Gone for 5 frames, still the same player
+    assert tracker.update([box(104)], 5, WIDTH)[0][0] == 1
+
+    # Gone for 6, expired - a new ID
+    tracker.update([], 11, WIDTH)
+    assert len(tracker) == 0
+    assert tracker.update([box(108)], 12, WIDTH)[0][0] == 2
+
+
+def test_max_tracks_keeps_the_most_recently_seen():
+    tracker = PersonTracker(max_tracks=3)
+    for frame in range(5):
+        tracker.update([box(200 * frame)], frame, WIDTH)
+    assert len(tracker) == 3
+    assert tracker.ids.tolist() == [3, 4, 5]
+
+
+def test_zone_is_smoothed():
+    tracker = PersonTracker(smoothing=0.3)
+    assert tracker.update([box(240, w=200)], 0, WIDTH) == [(1, "LEFT")]
+
+    # Centered 20 px into the middle third - the smoothed center takes a few frames to get there
+    zones = [tracker.update([box(320, w=200)], frame, WIDTH)[0] for frame in range(1, 6)]
+    assert zones == [(1, "LEFT")] * 3 + [(1, "MIDDLE")] * 2
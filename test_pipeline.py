@@ -0,0 +1,61 @@
+import threading
+import pytest
+from pipeline import Pipeline, decode_stage, infer_stage
+
+
+class FakeCap:
+    def __init__(self, count):
+        self.frames = iter(range(count))
+
+    def read(self):
+        frame = next(self.frames, None)
+        return frame is not None, frame
+
+
+def fake_model(frames, stream, device):
+    return iter([frame * 10 for frame in frames])
+
+
+def run(pipe, count, batch_size, model=fake_model):
+    decoded, results = pipe.queue(), pipe.queue()
+    pipe.start(decode_stage, FakeCap(count), batch_size, decoded)
+    pipe.start(infer_stage, model, "cpu", decoded, results)
+    return results
+
+
+@pytest.mark.parametrize("batch_size", [1, 4, 7])
+def test_frames_come_out_in_order(batch_size):
+    pipe = Pipeline(queue_size=2)
+    out = list(pipe.drain(run(pipe, 30, batch_size)))
+    pipe.close()
+
+    assert out == [(i, i * 10) for i in range(30)]
+    assert not any(thread.is_alive() for thread in pipe.threads)
+
+
+def test_close_stops_stages_blocked_on_a_full_queue():
+    # The consumer stops after a few frames - decode and inference are stuck waiting for room
+    pipe = Pipeline(queue_size=1)
+    results = run(pipe, 10000, 4)
+    for _ in range(3):
+        results.get(timeout=5)
+
+    closer = threading.Thread(target=pipe.close)
+    closer.start()
+    closer.join(timeout=5)
+    assert not closer.is_alive()
+    assert not any(thread.is_alive() for thread in pipe.threads)
+
+
+def test_stage_error_stops_the_pipeline_and_is_raised():
+    def broken_model(frames, stream, device):
+        if frames[0] >= 8:
+            raise RuntimeError("model failed")
+        return fake_model(frames, stream, device)
+
+    pipe = Pipeline(queue_size=2)
+    out = list(pipe.drain(run(pipe, 100, 4, broken_model)))
+
+    assert [frame for frame, _ in out] == list(range(8))
+    with pytest.raises(RuntimeError, match="model failed"):
+        pipe.close()
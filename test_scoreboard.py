@@ -0,0 +1,102 @@
+import base64
+import json
+import os
+import socket
+import time
+import urllib.request
+import pytest
+from scoreboard import Scoreboard
+
+
+def event(frame):
+    return {"frame": frame, "made": frame % 2 == 0, "makes": 0, "attempts": 0}
+
+
+@pytest.fixture
+def board():
+    board = Scoreboard(0, history=5)
+    yield board
+    board.close()
+
+
+def add_shots(board, frames):
+    target = board.next_seq + len(frames)
+    for frame in frames:
+        board.shot(event(frame))
+    # shot() hands the event to the server's loop - wait until it's numbered
+    deadline = time.monotonic() + 5
+    while board.next_seq < target and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def get_events(board, query=""):
+    with urllib.request.urlopen(f"http://127.0.0.1:{board.port}/events{query}", timeout=5) as response:
+        return [(e["seq"], e["frame"]) for e in json.load(response)]
+
+
+def connect(board, path, headers=""):
+    sock = socket.create_connection(("127.0.0.1", board.port), timeout=5)
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n{headers}\r\n".encode())
+    data = b""
+    while b"\r\n\r\n" not in data:
+        data += sock.recv(4096)
+    return sock, data.split(b"\r\n\r\n", 1)[1]
+
+
+def read_sse(sock, data, count):
+    # (id, seq, frame) of the next count shot events
+    shots = []
+    while len(shots) < count:
+        while b"\n\n" not in data:
+            data += sock.recv(4096)
+        block, data = data.split(b"\n\n", 1)
+        fields = dict(line.split(": ", 1) for line in block.decode().split("\n"))
+        body = json.loads(fields["data"])
+        if fields["event"] == "shot":
+            shots.append((int(fields["id"]), body["seq"], body["frame"]))
+    return shots
+
+
+def test_events_from_offset(board):
+    add_shots(board, [10, 20, 30])
+    assert get_events(board) == [(0, 10), (1, 20), (2, 30)]
+    assert get_events(board, "?from=1") == [(1, 20), (2, 30)]
+    assert get_events(board, "?from=3") == []
+
+
+def test_events_start_at_the_oldest_kept(board):
+    add_shots(board, [10 * i for i in range(8)])
+    assert get_events(board, "?from=0") == [(seq, 10 * seq) for seq in range(3, 8)]
+    assert get_events(board, "?from=6") == [(6, 60), (7, 70)]
+
+
+def test_stream_resumes_from_last_event_id(board):
+    add_shots(board, [10, 20, 30])
+    sock, data = connect(board, "/stream", "Last-Event-ID: 0\r\n")
+    with sock:
+        shots = read_sse(sock, data, 2)
+        add_shots(board, [40])
+        shots += read_sse(sock, b"", 1)
+    assert shots == [(1, 1, 20), (2, 2, 30), (3, 3, 40)]
+
+
+def test_stream_from_query_then_live(board):
+    add_shots(board, [10, 20])
+    sock, data = connect(board, "/stream?from=1")
+    with sock:
+        shots = read_sse(sock, data, 1)
+        add_shots(board, [30])
+        shots += read_sse(sock, b"", 1)
+    assert shots == [(1, 1, 20), (2, 2, 30)]
+
+
+def test_websocket_replays_from_offset(board):
+    add_shots(board, [10, 20, 30])
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock, data = connect(board, "/ws?from=2", f"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                                             f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n")
+    with sock:
+        while len(data) < 2 or len(data) < 2 + (data[1] & 0x7F):
+            data += sock.recv(4096)
+        message = json.loads(data[2:2 + (data[1] & 0x7F)])
+    assert (message["type"], message["seq"], message["frame"]) == ("shot", 2, 30)
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from shot_state import ShotState, CLASS_NAMES
+
+
+# Regression test for the shot logic both detectors share: a fixed detection sequence has to give
+# the makes, attempts and shot frames the original per-box list code gave on it
+
+BALL, HOOP, PERSON = (CLASS_NAMES.index(name) for name in ("Basketball", "Basketball Hoop", "Person"))
+
+WIDTH, HEIGHT = 1280, 720
+HOOP_BOX = (608, 184, 672, 248)
+BALL_SIZE = 28
+
+# (made, release x) of each shot, in order
+SHOTS = [(True, 320), (False, 960), (True, 1000), (False, 300), (False, 420), (True, 880)]
+
+
+def shot_path(made, x0, flight=30):
+    # Integer ball centers from release to the floor - the arc reaches rim height at `flight`
+    # frames, on the rim for makes and 1.4 hoop widths beside it for misses
+    hx, hy = (HOOP_BOX[0] + HOOP_BOX[2]) / 2, (HOOP_BOX[1] + HOOP_BOX[3]) / 2
+    hw = HOOP_BOX[2] - HOOP_BOX[0]
+    y0 = 0.75 * HEIGHT
+    tx = hx if made else hx + np.sign(x0 - hx) * 1.4 * hw
+    ty = hy - 0.25 * hw
+
+    t_apex = 0.75 * flight
+    ratio = ((flight - t_apex) / t_apex) ** 2
+    y_apex = (ty - ratio * y0) / (1 - ratio)
+    curve = (y0 - y_apex) / t_apex ** 2
+    vx = (tx - x0) / flight
+
+    points = []
+    for t in range(3 * flight):
+        y = y_apex + curve * (t - t_apex) ** 2
+        x = x0 + vx * t if not made or t < flight else x0 + vx * (flight + 0.2 * (t - flight))
+        if y > 0.9 * HEIGHT:
+            break
+        points.append((round(x), round(y)))
+    return points
+
+
+def detections():
+    # One (x1, y1, x2, y2, conf, cls) array per frame: the hoop, a player, the ball in flight,
+    # a low-confidence ball far from the hoop and a hoop in the lower 30% of the frame
+    hoop = [*HOOP_BOX, 0.9, HOOP]
+    low_hoop = [100, 560, 150, 610, 0.8, HOOP]
+    frames = []
+    for made, x0 in SHOTS:
+        path = [None] * 10 + shot_path(made, x0) + [None] * 20
+        for i, ball in enumerate(path):
+            player = [200 + 2 * i, 400, 260 + 2 * i, 560, 0.85, PERSON]
+            rows = [hoop, player, [1100, 600, 1120, 620, 0.2, BALL]]
+            if ball is not None:
+                x, y = ball
+                rows.insert(0, [x - BALL_SIZE // 2, y - BALL_SIZE // 2, x + BALL_SIZE // 2, y + BALL_SIZE // 2,
+                                0.8, BALL])
+            if i % 7 == 0:
+                rows.append(low_hoop)
+            frames.append(np.array(rows, dtype=np.float32))
+    return frames
+
+
+# Frame each shot was counted at and whether it went in - the same for both variants
+EXPECTED = [(50, True), (130, False), (200, True), (280, False), (360, False), (440, True)]
+
+
+@pytest.mark.parametrize("variant", ["basic", "extended"])
+def test_fixed_sequence(variant):
+    state = ShotState(variant)
+    events = [e for e in (state.step(data, HEIGHT) for data in detections()) if e is not None]
+
+    assert [(e["frame"], e["made"]) for e in events] == EXPECTED
+    assert state.makes == sum(made for _, made in EXPECTED)
+    assert state.attempts == len(EXPECTED)
+    assert state.events == events
+
+
+def test_step_matches_staged_calls():
+    # step() is what the drawing detectors do one stage at a time
+    staged, stepped = ShotState("extended"), ShotState("extended")
+    for data in detections():
+        staged.add_detections(data, HEIGHT)
+        staged.clean_motion()
+        staged.shot_detection()
+        staged.frame_count += 1
+        stepped.step(data, HEIGHT)
+    assert staged.events == stepped.events
+    assert staged.stats() == stepped.stats()
+
+
+
+def test_extended_needs_frame_height():
+    with pytest.raises(ValueError):
+        ShotState("extended").step(detections()[0])
+    ShotState("basic").step(detections()[0])
+
+
+def test_max_events_keeps_the_latest():
+    state = ShotState("basic", max_events=2)
+    for data in detections():
+        state.step(data, HEIGHT)
+    assert [(e["frame"], e["made"]) for e in state.events] == EXPECTED[-2:]
+    assert state.attempts == len(EXPECTED)
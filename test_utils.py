@@ -0,0 +1,21 @@
+from utils import TrackBuffer, X, FRAME
+
+
+def test_track_buffer_evicts_oldest():
+    buf = TrackBuffer(4)
+    for i in range(6):
+        buf.add(10 * i, 0, i, 5, 5, 0.9)
+    assert len(buf) == 4
+    assert buf.view()[:, FRAME].tolist() == [2, 3, 4, 5]
+    assert buf[0][:4] == ((20, 0), 2, 5, 5)
+    assert buf[-1, X] == 50
+
+
+def test_track_buffer_since_and_pop():
+    buf = TrackBuffer(8)
+    for i in range(5):
+        buf.add(i, i, 3 * i, 5, 5, 0.9)
+    assert buf.since(6)[:, FRAME].tolist() == [6, 9, 12]
+    buf.pop()
+    buf.popleft()
+    assert buf.view()[:, FRAME].tolist() == [3, 6, 9]
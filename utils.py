@@ -13,33 +13,112 @@ def get_device():
     return device
 
 
-def score(ball_pos, hoop_pos):
+# Column layout of a TrackBuffer row
+X, Y, FRAME, W, H, CONF = range(6)
+
+
+class TrackBuffer:
+    """Fixed-capacity ring buffer of ((x, y), frame, w, h, conf) track points"""
+
+    __slots__ = ("capacity", "_data", "_start", "_len")
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        # Every row is written twice, at i and i + capacity, so the live points are always one contiguous slice
+        self._data = np.zeros((2 * capacity, 6))
+        self._start = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def add(self, x, y, frame, w, h, conf):
+        # Full buffer drops its oldest point
+        if self._len == self.capacity:
+            self.popleft()
+        i = (self._start + self._len) % self.capacity
+        self._data[i] = self._data[i + self.capacity] = (x, y, frame, w, h, conf)
+        self._len += 1
+
+    def append(self, point):
+        (x, y), frame, w, h, conf = point
+        self.add(x, y, frame, w, h, conf)
+
+    def pop(self):
+        # Removes the newest point
+        if self._len == 0:
+            raise IndexError("pop from empty TrackBuffer")
+        self._len -= 1
+
+    def popleft(self):
+        # Removes the oldest point
+        if self._len == 0:
+            raise IndexError("pop from empty TrackBuffer")
+        self._start = (self._start + 1) % self.capacity
+        self._len -= 1
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
+
+    def view(self):
+        # Oldest to newest rows, no copy
+        return self._data[self._start:self._start + self._len]
+
+    def since(self, frame):
+        # Points from the given frame onwards - frames are appended in order
+        rows = self.view()
+        return rows[np.searchsorted(rows[:, FRAME], frame):]
+
+    def center(self, i=-1):
+        row = self._data[self._row(i)]
+        return int(row[X]), int(row[Y])
+
+    def _row(self, i):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("TrackBuffer index out of range")
+        return self._start + i
+
+    def __getitem__(self, key):
+        # buf[i, col] reads one value, buf[i] gives the ((x, y), frame, w, h, conf) tuple
+        if isinstance(key, tuple):
+            i, col = key
+            return self._data[self._row(i), col]
+        x, y, frame, w, h, conf = self._data[self._row(key)]
+        return (int(x), int(y)), int(frame), int(w), int(h), float(conf)
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+
+
+def score(ball_pos, hoop_pos, rim_factor=0.4, rebound_zone=10):
     x = []
     y = []
-    rim_height = hoop_pos[-1][0][1] - 0.5 * hoop_pos[-1][3]
+    rim_height = hoop_pos[-1, Y] - 0.5 * hoop_pos[-1, H]
 
     # Get first point above rim and first point below rim
-    for i in reversed(range(len(ball_pos))):
-        if ball_pos[i][0][1] < rim_height:
-            x.append(ball_pos[i][0][0])
-            y.append(ball_pos[i][0][1])
-            if i + 1 < len(ball_pos):
-                x.append(ball_pos[i + 1][0][0])
-                y.append(ball_pos[i + 1][0][1])
-            break
+    points = ball_pos.view()
+    above = np.flatnonzero(points[:, Y] < rim_height)
+    if len(above) > 0:
+        i = above[-1]
+        x = points[i:i + 2, X]
+        y = points[i:i + 2, Y]
 
     # Create line from two points
     if len(x) > 1:
         m, b = np.polyfit(x, y, 1)
-        predicted_x = ((hoop_pos[-1][0][1] - 0.5 * hoop_pos[-1][3]) - b) / m
-        rim_x1 = hoop_pos[-1][0][0] - 0.4 * hoop_pos[-1][2]
-        rim_x2 = hoop_pos[-1][0][0] + 0.4 * hoop_pos[-1][2]
+        predicted_x = ((hoop_pos[-1, Y] - 0.5 * hoop_pos[-1, H]) - b) / m
+        rim_x1 = hoop_pos[-1, X] - rim_factor * hoop_pos[-1, W]
+        rim_x2 = hoop_pos[-1, X] + rim_factor * hoop_pos[-1, W]
 
         # Check if predicted path crosses the rim area (including rebound zone)
         if rim_x1 < predicted_x < rim_x2:
             return True
         # Check if ball enters rebound zone near the hoop
-        hoop_rebound_zone = 10  # Define a buffer zone around the hoop
+        hoop_rebound_zone = rebound_zone  # Define a buffer zone around the hoop
         if rim_x1 - hoop_rebound_zone < predicted_x < rim_x2 + hoop_rebound_zone:
             return True
 
@@ -48,20 +127,20 @@ def score(ball_pos, hoop_pos):
 
 # Detects if the ball is below the net - used to detect shot attempts
 def detect_down(ball_pos, hoop_pos):
-    y = hoop_pos[-1][0][1] + 0.5 * hoop_pos[-1][3]
-    if ball_pos[-1][0][1] > y:
+    y = hoop_pos[-1, Y] + 0.5 * hoop_pos[-1, H]
+    if ball_pos[-1, Y] > y:
         return True
     return False
 
 
 # Detects if the ball is around the backboard - used to detect shot attempts
-def detect_up(ball_pos, hoop_pos):
-    x1 = hoop_pos[-1][0][0] - 4 * hoop_pos[-1][2]
-    x2 = hoop_pos[-1][0][0] + 4 * hoop_pos[-1][2]
-    y1 = hoop_pos[-1][0][1] - 2 * hoop_pos[-1][3]
-    y2 = hoop_pos[-1][0][1]
+def detect_up(ball_pos, hoop_pos, x_factor=4, y_factor=2):
+    x1 = hoop_pos[-1, X] - x_factor * hoop_pos[-1, W]
+    x2 = hoop_pos[-1, X] + x_factor * hoop_pos[-1, W]
+    y1 = hoop_pos[-1, Y] - y_factor * hoop_pos[-1, H]
+    y2 = hoop_pos[-1, Y]
 
-    if x1 < ball_pos[-1][0][0] < x2 and y1 < ball_pos[-1][0][1] < y2 - 0.5 * hoop_pos[-1][3]:
+    if x1 < ball_pos[-1, X] < x2 and y1 < ball_pos[-1, Y] < y2 - 0.5 * hoop_pos[-1, H]:
         return True
     return False
 
@@ -73,40 +152,73 @@ def in_hoop_region(center, hoop_pos):
     x = center[0]
     y = center[1]
 
-    x1 = hoop_pos[-1][0][0] - 1 * hoop_pos[-1][2]
-    x2 = hoop_pos[-1][0][0] + 1 * hoop_pos[-1][2]
-    y1 = hoop_pos[-1][0][1] - 1 * hoop_pos[-1][3]
-    y2 = hoop_pos[-1][0][1] + 0.5 * hoop_pos[-1][3]
+    x1 = hoop_pos[-1, X] - 1 * hoop_pos[-1, W]
+    x2 = hoop_pos[-1, X] + 1 * hoop_pos[-1, W]
+    y1 = hoop_pos[-1, Y] - 1 * hoop_pos[-1, H]
+    y2 = hoop_pos[-1, Y] + 0.5 * hoop_pos[-1, H]
 
     if x1 < x < x2 and y1 < y < y2:
         return True
     return False
 
 
+# Vectorized in_hoop_region - checks many centers at once against hoops given as
+# (x, y, w, h) rows, either one row for all centers or one row per center
+def in_hoop_region_batch(centers, hoops):
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    hoops = np.asarray(hoops, dtype=float)
+    x = centers[:, 0]
+    y = centers[:, 1]
+
+    x1 = hoops[..., 0] - 1 * hoops[..., 2]
+    x2 = hoops[..., 0] + 1 * hoops[..., 2]
+    y1 = hoops[..., 1] - 1 * hoops[..., 3]
+    y2 = hoops[..., 1] + 0.5 * hoops[..., 3]
+
+    # NaN rows (no hoop yet) compare False
+    return (x1 < x) & (x < x2) & (y1 < y) & (y < y2)
+
+
+# Latest hoop as an (x, y, w, h) row for in_hoop_region_batch - NaN if there is none
+def hoop_row(hoop_pos):
+    if len(hoop_pos) < 1:
+        return np.full(4, np.nan)
+    return hoop_pos.view()[-1, [X, Y, W, H]]
+
+
+# Splits a frame's boxes.data array (x1, y1, x2, y2, conf, cls per row) into columns
+def unpack_boxes(data):
+    data = np.asarray(data).reshape(-1, 6)
+    x1, y1, x2, y2 = data[:, :4].astype(int).T
+    w, h = x2 - x1, y2 - y1
+    centers = np.stack([(x1 + w / 2).astype(int), (y1 + h / 2).astype(int)], axis=1)
+    return x1, y1, w, h, centers, data[:, 4], data[:, 5].astype(int)
+
+
 # Removes inaccurate data points
-def clean_ball_pos(ball_pos, frame_count):
+def clean_ball_pos(ball_pos, frame_count, max_jump=4):
     # Removes inaccurate ball size to prevent jumping to wrong ball
     if len(ball_pos) > 1:
         # Width and Height
-        w1 = ball_pos[-2][2]
-        h1 = ball_pos[-2][3]
-        w2 = ball_pos[-1][2]
-        h2 = ball_pos[-1][3]
+        w1 = ball_pos[-2, W]
+        h1 = ball_pos[-2, H]
+        w2 = ball_pos[-1, W]
+        h2 = ball_pos[-1, H]
 
         # X and Y coordinates
-        x1 = ball_pos[-2][0][0]
-        y1 = ball_pos[-2][0][1]
-        x2 = ball_pos[-1][0][0]
-        y2 = ball_pos[-1][0][1]
+        x1 = ball_pos[-2, X]
+        y1 = ball_pos[-2, Y]
+        x2 = ball_pos[-1, X]
+        y2 = ball_pos[-1, Y]
 
         # Frame count
-        f1 = ball_pos[-2][1]
-        f2 = ball_pos[-1][1]
+        f1 = ball_pos[-2, FRAME]
+        f2 = ball_pos[-1, FRAME]
         f_dif = f2 - f1
 
         dist = math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
 
-        max_dist = 4 * math.sqrt((w1) ** 2 + (h1) ** 2)
+        max_dist = max_jump * math.sqrt((w1) ** 2 + (h1) ** 2)
 
         # Ball should not move a 4x its diameter within 5 frames
         if (dist > max_dist) and (f_dif < 5):
@@ -118,8 +230,8 @@ def clean_ball_pos(ball_pos, frame_count):
 
     # Remove points older than 30 frames
     if len(ball_pos) > 0:
-        if frame_count - ball_pos[0][1] > 30:
-            ball_pos.pop(0)
+        if frame_count - ball_pos[0, FRAME] > 30:
+            ball_pos.popleft()
 
     return ball_pos
 
@@ -127,18 +239,18 @@ def clean_ball_pos(ball_pos, frame_count):
 def clean_hoop_pos(hoop_pos):
     # Prevents jumping from one hoop to another
     if len(hoop_pos) > 1:
-        x1 = hoop_pos[-2][0][0]
-        y1 = hoop_pos[-2][0][1]
-        x2 = hoop_pos[-1][0][0]
-        y2 = hoop_pos[-1][0][1]
+        x1 = hoop_pos[-2, X]
+        y1 = hoop_pos[-2, Y]
+        x2 = hoop_pos[-1, X]
+        y2 = hoop_pos[-1, Y]
 
-        w1 = hoop_pos[-2][2]
-        h1 = hoop_pos[-2][3]
-        w2 = hoop_pos[-1][2]
-        h2 = hoop_pos[-1][3]
+        w1 = hoop_pos[-2, W]
+        h1 = hoop_pos[-2, H]
+        w2 = hoop_pos[-1, W]
+        h2 = hoop_pos[-1, H]
 
-        f1 = hoop_pos[-2][1]
-        f2 = hoop_pos[-1][1]
+        f1 = hoop_pos[-2, FRAME]
+        f2 = hoop_pos[-1, FRAME]
 
         f_dif = f2-f1
 
@@ -156,6 +268,6 @@ def clean_hoop_pos(hoop_pos):
 
     # Remove old points
     if len(hoop_pos) > 25:
-        hoop_pos.pop(0)
+        hoop_pos.popleft()
 
     return hoop_pos
@@ -0,0 +1,81 @@
+import queue
+import shutil
+import subprocess
+import threading
+import cv2
+import numpy as np
+
+
+WRITERS = ["auto", "ffmpeg", "opencv"]
+
+
+class VideoWriter:
+    """Encodes frames on its own thread, through a local ffmpeg process or cv2.VideoWriter
+
+    write() queues the frame by reference and returns; `done(frame)` is called once it has been
+    written, so pooled buffers can go back to their pool. By default frames go to cv2.VideoWriter
+    with mp4v, as they always have. writer="ffmpeg" pipes raw BGR frames to ffmpeg instead, encoded
+    with codec / preset / crf, and "auto" does so when ffmpeg is on the PATH. Same write() / release()
+    calls as cv2.VideoWriter.
+    """
+
+    def __init__(self, path, fps, size, writer="opencv", codec="libx264", preset="veryfast", crf=23, queue_size=4):
+        if writer not in WRITERS:
+            raise ValueError(f"Unknown writer {writer} - expected one of {', '.join(WRITERS)}")
+        ffmpeg = shutil.which("ffmpeg") if writer != "opencv" else None
+        if writer == "ffmpeg" and ffmpeg is None:
+            raise RuntimeError("ffmpeg was not found on the PATH")
+
+        self.path = path
+        self.proc = None
+        self.out = None
+        if ffmpeg is not None:
+            width, height = size
+            self.proc = subprocess.Popen(
+                [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+                 "-r", str(fps), "-i", "-", "-an", "-c:v", codec, "-preset", preset, "-crf", str(crf),
+                 "-pix_fmt", "yuv420p", path], stdin=subprocess.PIPE)
+        else:
+            self.out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._encode, name="encoder", daemon=True)
+        self.thread.start()
+
+    def _encode(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            frame, done = item
+            try:
+                if self.error is None:
+                    if self.proc is not None:
+                        # The pipe reads straight from the frame's memory
+                        self.proc.stdin.write(memoryview(np.ascontiguousarray(frame)))
+                    else:
+                        self.out.write(frame)
+            except Exception as e:
+                self.error = e
+            finally:
+                if done is not None:
+                    done(frame)
+
+    def write(self, frame, done=None):
+        if self.error is not None:
+            raise self.error
+        self.queue.put((frame, done))
+
+    def release(self):
+        # Flushes the queued frames and waits for the encoder to finish the file
+        self.queue.put(None)
+        self.thread.join()
+        if self.proc is not None:
+            self.proc.stdin.close()
+            if self.proc.wait() != 0 and self.error is None:
+                self.error = RuntimeError(f"ffmpeg exited with code {self.proc.returncode} writing {self.path}")
+        else:
+            self.out.release()
+        if self.error is not None:
+            raise self.error